@@ -27,8 +27,7 @@ def reflections_rect(path):
 
 def recenter(paths, dist):
     # paths_new = Path.list_simplify(paths)
-    paths_new = Path.list_rotate(paths, pi/4)
-    return Path.list_add(paths_new, (dist, dist))
+    return Path.transform(paths, Path.translation((dist, dist)) @ Path.rotation(pi/4))
 
 class MasuBox(Pattern):
 
@@ -80,11 +79,12 @@ class MasuBox(Pattern):
 
         arms_ = [Path.list_create_from_points(points, 'mmvmm', fold_angles = [180, 180, half_fold, 180, 180]),
                  Path.list_create_from_points(points, 'mvvvm', half_fold)]
-        arms = [Path.list_rotate(arms_[i % 2], i * pi / 2) for i in range(4)]
+        rotations = [Path.transform(arms_[i], Path.rotation(np.array([i, i + 2]) * pi / 2)) for i in range(2)]
+        arms = [rotations[i % 2][i // 2] for i in range(4)]
 
         # tiny corner diagonals
         diag = Path([(width/2, width/2), (width/2 + height, width/2 + height)], 'v')
-        corner_diagonals = [diag * (1, i*pi/2) for i in range(4)]
+        corner_diagonals = Path.transform(diag, Path.rotation(np.arange(4)*pi/2))
 
         self.edge_points = Path.get_square_points(length, length)
 
@@ -0,0 +1,186 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Content-addressed on-disk cache of generated patterns
+
+Entries are keyed by a hash of the pattern class, its parsed options (or only the
+ones changing its geometry, see Pattern.DRAWING_OPTIONS), the scale of the document
+(see Pattern.calc_unit_factor) and the library version,
+and contain the generated path tree stored as the arrays of a PathBatch in a
+compressed .npz file. The total size of the cache is bounded,
+least recently used entries being evicted first.
+"""
+import glob
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import numpy as np
+from path import PathBatch
+
+CACHE_DIR_ENV = 'ORIGAMI_PATTERNS_CACHE_DIR'
+
+# options that do not change the generated geometry nor its drawing
+IGNORED_OPTIONS = ('input_file', 'output', 'ids', 'selected_nodes', 'active_tab', 'use_cache', 'cache_size',
+                   'profile', 'profile_memory')
+
+
+def get_library_version():
+    """ Get hash of the sources of the library, so that entries of other versions are not used
+    """
+    digest = hashlib.sha256()
+    for filename in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(filename, 'rb') as source:
+            digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+
+LIBRARY_VERSION = get_library_version()
+
+
+def get_user_cache_dir():
+    """ Get directory of the cache, following the conventions of each platform
+    """
+    if os.environ.get(CACHE_DIR_ENV):
+        return os.environ[CACHE_DIR_ENV]
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'origami-patterns')
+
+
+class PatternCache:
+    """ On-disk cache of generated path trees
+
+    Attributes
+    ----------
+    directory: str
+        Where entries are stored, see get_user_cache_dir
+    max_size: int
+        Maximal total size of the entries, in bytes
+
+    Methods
+    -------
+
+    key(pattern, ignored_options=IGNORED_OPTIONS)
+        Get key of pattern, from its class, options, document scale and library version
+
+    load(self, key, pattern)
+        Set generated attributes of pattern from entry, if it exists
+
+    store(self, key, pattern)
+        Save generated attributes of pattern, evicting old entries if needed
+
+    evict(self)
+        Remove least recently used entries until total size fits max_size
+    """
+
+    def __init__(self, directory=None, max_size=100 * 2**20):
+        self.directory = directory or get_user_cache_dir()
+        self.max_size = max_size
+
+    @staticmethod
+    def key(pattern, ignored_options=IGNORED_OPTIONS):
+        """ Get key of pattern
+
+        Parameters
+        ----------
+        pattern: Pattern
+            With parsed options and loaded document, before generating its path tree.
+            Its unit factor is part of the key, as generated coordinates are scaled by
+            it, so that the same options give other entries on other documents
+        ignored_options: iterable of str
+            Options not taken into account
+
+        Returns
+        -------
+        key: str
+        """
+        cls = type(pattern)
+        options = {name: value for name, value in vars(pattern.options).items() if name not in ignored_options}
+        content = json.dumps([cls.__module__, cls.__qualname__, options, pattern.calc_unit_factor(), LIBRARY_VERSION],
+                             sort_keys=True, default=repr)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def get_filename(self, key):
+        """ Get filename of entry """
+        return os.path.join(self.directory, key + '.npz')
+
+    def load(self, key, pattern):
+        """ Set path_tree, edge_points, vertex_points and translate of pattern from entry
+
+        Returns
+        -------
+        hit: bool
+            False if there is no valid entry for key, in which case pattern is unchanged
+        """
+        filename = self.get_filename(key)
+        try:
+            with np.load(filename) as data:
+                batch = PathBatch(**{name: data[name] for name in PathBatch.__slots__})
+                edge_points = data['edge_points']
+                vertex_points = data['vertex_points']
+                translate = data['translate']
+        except (OSError, KeyError, ValueError):
+            return False
+
+        # mark entry as recently used
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+
+        pattern.path_tree = batch.to_tree()
+        pattern.edge_points = [tuple(point) for point in edge_points.tolist()]
+        pattern.vertex_points = [tuple(point) for point in vertex_points.tolist()]
+        pattern.translate = tuple(translate.tolist())
+        return True
+
+    def store(self, key, pattern):
+        """ Save path_tree, edge_points, vertex_points and translate of pattern
+
+        Errors while writing are ignored, as the cache is only an optimization.
+        """
+        batch = PathBatch.from_tree(pattern.path_tree)
+        arrays = {name: getattr(batch, name) for name in PathBatch.__slots__}
+        arrays['edge_points'] = np.array(pattern.edge_points, dtype=float).reshape(-1, 2)
+        arrays['vertex_points'] = np.array(pattern.vertex_points, dtype=float).reshape(-1, 2)
+        arrays['translate'] = np.array(pattern.translate, dtype=float)
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # write to temporary file first, so that concurrent runs never read partial entries
+            fd, temp_filename = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+            try:
+                with os.fdopen(fd, 'wb') as output:
+                    np.savez_compressed(output, **arrays)
+                os.replace(temp_filename, self.get_filename(key))
+            except BaseException:
+                os.remove(temp_filename)
+                raise
+            self.evict()
+        except OSError:
+            pass
+
+    def evict(self):
+        """ Remove least recently used entries until total size fits max_size """
+        entries = []
+        for filename in glob.glob(os.path.join(self.directory, '*.npz')):
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            total_size -= size
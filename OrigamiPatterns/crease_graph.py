@@ -0,0 +1,721 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Planar graph of the creases of a pattern
+"""
+import math
+import numpy as np
+from path import PathBatch
+from spatial import PointIndex
+
+
+class CreaseGraph:
+    """ Vertices and edges of a path tree, with CSR adjacency
+
+    Every segment of every stroke of the tree becomes an edge. Endpoints closer
+    than a tolerance are snapped to the same vertex, edges are split where a
+    vertex lies on their interior (T-junctions), edges crossing each other are
+    both split at a new vertex (X-junctions), and edges joining the same pair of
+    vertices are merged, keeping the first one drawn. Single points (vertex
+    circles) are not part of the graph.
+
+    Attributes
+    ----------
+    vertices: numpy.ndarray
+        (V, 2) array of vertex coordinates
+    edges: numpy.ndarray
+        (E, 2) int array, indices of the vertices of each edge
+    styles: numpy.ndarray
+        (E,) uint8 array, ord() of the style character of each edge, as in PathBatch
+    fold_angles: numpy.ndarray
+        (E,) float array
+    indptr: numpy.ndarray
+        (V + 1,) int array, neighbours of vertex i are neighbours[indptr[i]:indptr[i+1]]
+    neighbours: numpy.ndarray
+        (2E,) int array of neighbouring vertices, sorted by vertex
+    neighbour_edges: numpy.ndarray
+        (2E,) int array, edge joining each vertex to its neighbour
+    tolerance: float
+        Distance under which points are considered equal
+
+    Methods
+    -------
+
+    from_tree(cls, paths, tolerance=1e-6, split_t_junctions=True, split_crossings=True)
+        Build graph from a path tree
+
+    get_style(self, edge)
+        Style character of an edge
+
+    get_neighbours(self, vertex)
+        Neighbouring vertices of a vertex, and edges joining them
+
+    degrees(self)
+        Number of edges of each vertex
+
+    get_half_edges(self)
+        Half-edge structure of the graph
+
+    get_faces(self)
+        Bounded faces of the graph, as cycles of vertices
+
+    triangulate(self, style='u', fold_angle=180.)
+        Split faces into triangles, adding diagonals as new edges
+    """
+
+    def __init__(self, vertices, edges, styles, fold_angles, tolerance=1e-6):
+        """ Constructor, building CSR adjacency from edges
+
+        Parameters
+        ----------
+        vertices: (V, 2) array
+        edges: (E, 2) int array
+        styles: (E,) uint8 array
+        fold_angles: (E,) float array
+        tolerance: float
+        """
+        self.vertices = np.asarray(vertices, dtype=float).reshape(-1, 2)
+        self.edges = np.asarray(edges, dtype=np.intp).reshape(-1, 2)
+        self.styles = np.asarray(styles, dtype=np.uint8).reshape(len(self.edges))
+        self.fold_angles = np.asarray(fold_angles, dtype=float).reshape(len(self.edges))
+        self.tolerance = tolerance
+
+        sources = self.edges.ravel()
+        targets = self.edges[:, ::-1].ravel()
+        edge_ids = np.repeat(np.arange(len(self.edges)), 2)
+        order = np.argsort(sources, kind='stable')
+        self.indptr = np.zeros(len(self.vertices) + 1, dtype=np.intp)
+        np.cumsum(np.bincount(sources, minlength=len(self.vertices)), out=self.indptr[1:])
+        self.neighbours = targets[order]
+        self.neighbour_edges = edge_ids[order]
+
+    @property
+    def num_vertices(self):
+        return len(self.vertices)
+
+    @property
+    def num_edges(self):
+        return len(self.edges)
+
+    @classmethod
+    def from_tree(cls, paths, tolerance=1e-6, split_t_junctions=True, split_crossings=True):
+        """ Build graph from path tree
+
+        Parameters
+        ----------
+        paths: nested list, Path or PathBatch
+        tolerance: float
+            Endpoints closer than tolerance are merged, and vertices closer than it to
+            the interior of an edge split it
+        split_t_junctions: bool
+            If true, edges are split at vertices lying on their interior
+        split_crossings: bool
+            If true, a vertex is added where two edges cross each other, splitting both
+
+        Returns
+        -------
+        graph: CreaseGraph
+        """
+        batch = paths if isinstance(paths, PathBatch) else PathBatch.from_tree(paths)
+        segments, styles, fold_angles = cls._get_segments(batch)
+
+        # snap endpoints, deduplicating identical points first to reduce work of the index
+        used = np.unique(segments)
+        coords, inverse = np.unique(batch.coords[used], axis=0, return_inverse=True)
+        index = PointIndex(tolerance)
+        snapped = np.zeros(len(batch.coords), dtype=np.intp)
+        snapped[used] = index.add_points(coords)[inverse.ravel()]
+        vertices = index.get_coords()
+        edges = snapped[segments]
+
+        # crossings become vertices, so that edges are split at them as at T-junctions
+        candidates = None if split_t_junctions else np.zeros(0, dtype=np.intp)
+        if split_crossings and len(edges):
+            _, _, points = cls._get_crossings(vertices, edges, tolerance)
+            if len(points):
+                crossings = np.unique(index.add_points(points))
+                vertices = index.get_coords()
+                if candidates is not None:
+                    candidates = crossings
+
+        if candidates is None or len(candidates):
+            split_edges, split_vertices, split_t = cls._get_t_junctions(vertices, edges, tolerance, candidates)
+            edges, parents = cls._split_edges(edges, split_edges, split_vertices, split_t)
+            styles, fold_angles = styles[parents], fold_angles[parents]
+
+        edges, styles, fold_angles = cls._merge_edges(edges, styles, fold_angles)
+        return cls(vertices, edges, styles, fold_angles, tolerance)
+
+    @staticmethod
+    def _get_segments(batch):
+        """ Get (S, 2) array of point indices of each segment of batch, in drawing order """
+        offsets = batch.offsets
+        counts = np.diff(offsets)
+        paths = np.repeat(np.arange(len(counts)), counts)
+
+        # a point starts a segment unless it is the last one of its path
+        starts = np.ones(len(batch.coords), dtype=bool)
+        starts[offsets[1:][counts > 0] - 1] = False
+        segment_starts = np.flatnonzero(starts)
+        open_segments = np.column_stack((segment_starts, segment_starts + 1))
+
+        # closed paths have an extra segment from their last to their first point
+        closing = np.flatnonzero(batch.closed & (counts > 2))
+        closing_segments = np.column_stack((offsets[closing + 1] - 1, offsets[closing]))
+
+        # keep drawing order: closing segment comes right after the other ones of its path
+        segments = np.concatenate((open_segments, closing_segments))
+        segment_paths = np.concatenate((paths[segment_starts], closing))
+        order = np.argsort(segment_paths, kind='stable')
+        segments = segments[order]
+        segment_paths = segment_paths[order]
+        return segments, batch.styles[segment_paths], batch.fold_angles[segment_paths]
+
+    @staticmethod
+    def _get_grid(low, high, tolerance, cell_size):
+        """ Register boxes in every cell of a uniform grid they overlap
+
+        Parameters
+        ----------
+        low, high: (N, 2) arrays
+            Corners of each box, boxes with a NaN corner are left out
+        tolerance: float
+            Margin added around boxes
+        cell_size: float
+
+        Returns
+        -------
+        grid: tuple
+            (origin, cell_size, width), see _get_cells
+        pair_cells, pair_boxes: (M,) int arrays
+            Cell and box of every cell overlapped by each box, sorted by cell
+        """
+        valid = ~np.isnan(low).any(axis=1) & ~np.isnan(high).any(axis=1)
+        origin = np.nanmin(low, axis=0) - 2 * tolerance if valid.any() else np.zeros(2)
+        top = np.nanmax(high, axis=0) + 2 * tolerance if valid.any() else np.zeros(2)
+        width = int((top[0] - origin[0]) // cell_size) + 2
+        grid = (origin, cell_size, width)
+        low_cells = np.floor((np.where(valid[:, None], low, origin) - tolerance - origin) / cell_size).astype(np.int64)
+        high_cells = np.floor((np.where(valid[:, None], high, origin) + tolerance - origin) / cell_size).astype(np.int64)
+        spans = high_cells - low_cells + 1
+
+        counts = np.where(valid, spans[:, 0] * spans[:, 1], 0)
+        pair_boxes = np.repeat(np.arange(len(low)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cx = low_cells[pair_boxes, 0] + local % spans[pair_boxes, 0]
+        cy = low_cells[pair_boxes, 1] + local // spans[pair_boxes, 0]
+        pair_cells = cy * width + cx
+        order = np.argsort(pair_cells, kind='stable')
+        return grid, pair_cells[order], pair_boxes[order]
+
+    @staticmethod
+    def _get_cells(points, grid):
+        """ Get (N,) array of cells of points in grid, see _get_grid """
+        origin, cell_size, width = grid
+        cells = np.floor((points - origin) / cell_size).astype(np.int64)
+        return cells[:, 1] * width + cells[:, 0]
+
+    @staticmethod
+    def _join_points(cells, pair_cells, pair_boxes):
+        """ Get (point, box) pairs of boxes registered in the cell of each point
+
+        Returns
+        -------
+        points, boxes: (M,) int arrays
+        """
+        first = np.searchsorted(pair_cells, cells, side='left')
+        matches = np.searchsorted(pair_cells, cells, side='right') - first
+        points = np.repeat(np.arange(len(cells)), matches)
+        local = np.arange(matches.sum()) - np.repeat(np.cumsum(matches) - matches, matches)
+        return points, pair_boxes[np.repeat(first, matches) + local]
+
+    @classmethod
+    def _get_edge_grid(cls, vertices, edges, tolerance):
+        """ Register edges of non zero length in a grid with cells the size of a typical edge """
+        p0 = vertices[edges[:, 0]]
+        p1 = vertices[edges[:, 1]]
+        lengths = np.sqrt(((p1 - p0)**2).sum(axis=1))
+        valid = lengths > tolerance
+        if not valid.any():
+            return None
+        cell_size = max(float(np.median(lengths[valid])), 4 * tolerance)
+        low = np.where(valid[:, None], np.minimum(p0, p1), np.nan)
+        high = np.where(valid[:, None], np.maximum(p0, p1), np.nan)
+        return cls._get_grid(low, high, tolerance, cell_size)
+
+    @classmethod
+    def _get_t_junctions(cls, vertices, edges, tolerance, candidates=None):
+        """ Find vertices lying on the interior of edges
+
+        Candidate vertex/edge pairs are found with a uniform grid: each edge is
+        registered in every cell of its bounding box, and each vertex is tested
+        against the edges of its cell only.
+
+        Parameters
+        ----------
+        candidates: int array or None
+            Vertices tested, all of them if None
+
+        Returns
+        -------
+        split_edges, split_vertices: (K,) int arrays
+            Each edge and a vertex on its interior
+        split_t: (K,) float array
+            Position of the vertex along the edge, between 0 and 1
+        """
+        empty = np.zeros(0, dtype=np.intp)
+        grid = cls._get_edge_grid(vertices, edges, tolerance) if len(edges) else None
+        if grid is None:
+            return empty, empty, np.zeros(0)
+        grid, pair_cells, pair_edges = grid
+        if candidates is None:
+            candidates = np.arange(len(vertices))
+        points, candidate_edges = cls._join_points(cls._get_cells(vertices[candidates], grid), pair_cells, pair_edges)
+        candidate_vertices = candidates[points]
+
+        # keep vertices on the interior of edges
+        p0 = vertices[edges[candidate_edges, 0]]
+        d = vertices[edges[candidate_edges, 1]] - p0
+        w = vertices[candidate_vertices] - p0
+        length2 = (d**2).sum(axis=1)
+        t = (w * d).sum(axis=1) / length2
+        distance2 = ((w - t[:, None] * d)**2).sum(axis=1)
+        margin = tolerance / np.sqrt(length2)
+        on_edge = ((distance2 <= tolerance * tolerance) & (t > margin) & (t < 1 - margin) &
+                   (candidate_vertices != edges[candidate_edges, 0]) &
+                   (candidate_vertices != edges[candidate_edges, 1]))
+        return candidate_edges[on_edge], candidate_vertices[on_edge], t[on_edge]
+
+    @classmethod
+    def _get_crossings(cls, vertices, edges, tolerance):
+        """ Find proper crossings of edges, away from their endpoints (X-junctions)
+
+        Candidate pairs are the edges registered in a same cell of a uniform grid,
+        see _get_t_junctions.
+
+        Returns
+        -------
+        first_edges, second_edges: (K,) int arrays
+            Pairs of crossing edges, first_edges < second_edges
+        points: (K, 2) array
+            Crossing point of each pair
+        """
+        grid = cls._get_edge_grid(vertices, edges, tolerance) if len(edges) else None
+        if grid is None:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), np.zeros((0, 2))
+        _, pair_cells, pair_edges = grid
+
+        # every pair of edges of each cell
+        ends = np.searchsorted(pair_cells, pair_cells, side='right')
+        counts = ends - np.arange(len(pair_cells)) - 1
+        first = np.repeat(np.arange(len(pair_cells)), counts)
+        second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        a = np.minimum(pair_edges[first], pair_edges[second])
+        b = np.maximum(pair_edges[first], pair_edges[second])
+        pairs = np.unique(a * len(edges) + b)
+        a, b = pairs // len(edges), pairs % len(edges)
+        shared = (edges[a][:, :, None] == edges[b][:, None, :]).any(axis=(1, 2))
+        a, b = a[~shared], b[~shared]
+
+        # segments p + t * r and q + u * s cross if both t and u are strictly inside (0, 1)
+        p = vertices[edges[a, 0]]
+        r = vertices[edges[a, 1]] - p
+        q = vertices[edges[b, 0]]
+        s = vertices[edges[b, 1]] - q
+        w = q - p
+        denominator = r[:, 0] * s[:, 1] - r[:, 1] * s[:, 0]
+        r_length = np.sqrt((r**2).sum(axis=1))
+        s_length = np.sqrt((s**2).sum(axis=1))
+        crossing = np.abs(denominator) > 1e-12 * r_length * s_length
+        denominator = np.where(crossing, denominator, 1.)
+        t = (w[:, 0] * s[:, 1] - w[:, 1] * s[:, 0]) / denominator
+        u = (w[:, 0] * r[:, 1] - w[:, 1] * r[:, 0]) / denominator
+        t_margin = tolerance / np.where(crossing, r_length, 1.)
+        u_margin = tolerance / np.where(crossing, s_length, 1.)
+        crossing &= (t > t_margin) & (t < 1 - t_margin) & (u > u_margin) & (u < 1 - u_margin)
+        return a[crossing], b[crossing], p[crossing] + t[crossing, None] * r[crossing]
+
+    @staticmethod
+    def _split_edges(edges, split_edges, split_vertices, split_t):
+        """ Split edges at vertices on their interior, see _get_t_junctions
+
+        Returns
+        -------
+        edges: (E', 2) int array
+            Each edge becomes a chain through its split vertices, sorted along it
+        parents: (E',) int array
+            Original edge of each new edge
+        """
+        if len(split_edges) == 0:
+            return edges, np.arange(len(edges))
+        order = np.lexsort((split_t, split_edges))
+        split_edges = split_edges[order]
+        split_vertices = split_vertices[order]
+        splits = np.bincount(split_edges, minlength=len(edges))
+
+        chain_starts = np.cumsum(splits + 2) - (splits + 2)
+        chains = np.empty((splits + 2).sum(), dtype=np.intp)
+        chains[chain_starts] = edges[:, 0]
+        chains[chain_starts + splits + 1] = edges[:, 1]
+        inner = np.ones(len(chains), dtype=bool)
+        inner[chain_starts] = False
+        inner[chain_starts + splits + 1] = False
+        chains[inner] = split_vertices
+
+        segment_starts = np.ones(len(chains), dtype=bool)
+        segment_starts[chain_starts + splits + 1] = False
+        segment_starts = np.flatnonzero(segment_starts)
+        new_edges = np.column_stack((chains[segment_starts], chains[segment_starts + 1]))
+        return new_edges, np.repeat(np.arange(len(edges)), splits + 1)
+
+    @staticmethod
+    def _merge_edges(edges, styles, fold_angles):
+        """ Remove degenerate edges, and merge edges joining the same vertices, keeping the first one """
+        keep = edges[:, 0] != edges[:, 1]
+        edges, styles, fold_angles = edges[keep], styles[keep], fold_angles[keep]
+        _, first = np.unique(np.sort(edges, axis=1), axis=0, return_index=True)
+        first = np.sort(first)
+        return edges[first], styles[first], fold_angles[first]
+
+    def get_style(self, edge):
+        """ Get style character of edge """
+        return chr(self.styles[edge])
+
+    def get_neighbours(self, vertex):
+        """ Get neighbouring vertices of vertex, and the edges joining them to it
+
+        Returns
+        -------
+        neighbours: (K,) int array
+        edges: (K,) int array
+        """
+        start, end = self.indptr[vertex], self.indptr[vertex + 1]
+        return self.neighbours[start:end], self.neighbour_edges[start:end]
+
+    def degrees(self):
+        """ Get (V,) array with number of edges of each vertex """
+        return np.diff(self.indptr)
+
+    def get_half_edges(self):
+        """ Get half-edge structure of the graph
+
+        Half-edges 2 * i and 2 * i + 1 go along edge i in both directions, so that the
+        twin of half-edge h is h ^ 1. The next half-edge of h is the one leaving its
+        target just clockwise from its twin, so that following next turns around the
+        face on the left of h, counterclockwise (for a y axis pointing up).
+
+        Returns
+        -------
+        origins: (2E,) int array
+            Vertex each half-edge leaves from
+        next_half_edges: (2E,) int array
+            Next half-edge around the same face
+        """
+        origins = self.edges.ravel()
+        targets = self.edges[:, ::-1].ravel()
+        delta = self.vertices[targets] - self.vertices[origins]
+        angles = np.arctan2(delta[:, 1], delta[:, 0])
+
+        # outgoing half-edges of each vertex, sorted counterclockwise
+        order = np.lexsort((angles, origins))
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        starts = np.searchsorted(origins[order], np.arange(self.num_vertices))
+        degrees = self.degrees()
+
+        twins = np.arange(len(origins)) ^ 1
+        twin_positions = position[twins]
+        block_starts = starts[targets]
+        previous = block_starts + (twin_positions - block_starts - 1) % degrees[targets]
+        return origins, order[previous]
+
+    def get_faces(self):
+        """ Enumerate bounded faces of the graph
+
+        Faces are the cycles of next half-edges. Outer boundaries of connected
+        components are the cycles with non positive area, and are left out.
+
+        Returns
+        -------
+        indptr: (F + 1,) int array
+            Vertices of face i are face_vertices[indptr[i]:indptr[i+1]]
+        face_vertices: int array
+            Vertices of all faces, counterclockwise (for a y axis pointing up)
+        """
+        indptr, cycle_vertices, areas = self._get_cycles()
+        return self._select_cycles(indptr, cycle_vertices, areas > self.tolerance * self.tolerance)
+
+    def _get_cycles(self):
+        """ Enumerate all cycles of next half-edges, bounded faces and outer boundaries
+
+        Returns
+        -------
+        indptr: (C + 1,) int array
+            Vertices of cycle i are cycle_vertices[indptr[i]:indptr[i+1]]
+        cycle_vertices: int array
+        areas: (C,) float array
+            Signed shoelace area of each cycle, positive for bounded faces
+        """
+        origins, next_half_edges = self.get_half_edges()
+        n = len(origins)
+        if n == 0:
+            return np.zeros(1, dtype=np.intp), np.zeros(0, dtype=np.intp), np.zeros(0)
+
+        # label each cycle with its smallest half-edge, by pointer doubling: after k
+        # steps, labels hold the minimum over the next 2**k half-edges of each cycle
+        labels = np.arange(n)
+        jumps = next_half_edges
+        for _ in range(int(np.ceil(np.log2(n))) + 1):
+            labels = np.minimum(labels, labels[jumps])
+            jumps = jumps[jumps]
+
+        # rank half-edges by distance to the end of their cycle, cut before its label
+        successors = np.where(next_half_edges == labels, np.arange(n), next_half_edges)
+        ranks = (successors != np.arange(n)).astype(np.intp)
+        while True:
+            following = successors[successors]
+            if np.array_equal(following, successors):
+                break
+            ranks = ranks + ranks[successors]
+            successors = following
+        order = np.lexsort((-ranks, labels))
+
+        # shoelace area of each cycle
+        _, cycles, counts = np.unique(labels, return_inverse=True, return_counts=True)
+        cycles = cycles.ravel()
+        p = self.vertices[origins]
+        q = self.vertices[origins[next_half_edges]]
+        areas = np.bincount(cycles, weights=p[:, 0] * q[:, 1] - p[:, 1] * q[:, 0]) / 2
+
+        indptr = np.zeros(len(counts) + 1, dtype=np.intp)
+        np.cumsum(counts, out=indptr[1:])
+        return indptr, origins[order], areas
+
+    @staticmethod
+    def _select_cycles(indptr, cycle_vertices, mask):
+        """ Keep cycles where mask is true, see _get_cycles """
+        sizes = np.diff(indptr)
+        kept = np.repeat(mask, sizes)
+        new_indptr = np.zeros(mask.sum() + 1, dtype=np.intp)
+        np.cumsum(sizes[mask], out=new_indptr[1:])
+        return new_indptr, cycle_vertices[kept]
+
+    def _get_faces_with_holes(self, indptr, face_vertices, hole_points):
+        """ Find faces containing points strictly inside them
+
+        Candidate face/point pairs are found with a uniform grid of face bounding
+        boxes, then tested by ray casting against every side of the face.
+
+        Parameters
+        ----------
+        indptr, face_vertices: int arrays
+            Faces, as returned by get_faces
+        hole_points: (H,) int array
+            One vertex of each hole, i.e. of each outer boundary of a connected component
+
+        Returns
+        -------
+        has_hole: (F,) bool array
+        """
+        sizes = np.diff(indptr)
+        has_hole = np.zeros(len(sizes), dtype=bool)
+        if len(hole_points) == 0 or len(sizes) == 0:
+            return has_hole
+        coords = self.vertices[face_vertices]
+        low = np.column_stack([np.minimum.reduceat(coords[:, k], indptr[:-1]) for k in (0, 1)])
+        high = np.column_stack([np.maximum.reduceat(coords[:, k], indptr[:-1]) for k in (0, 1)])
+        cell_size = max(float(np.median((high - low).max(axis=1))), 4 * self.tolerance)
+        grid, pair_cells, pair_faces = self._get_grid(low, high, self.tolerance, cell_size)
+        points, faces = self._join_points(self._get_cells(self.vertices[hole_points], grid), pair_cells, pair_faces)
+        points = hole_points[points]
+
+        # count crossings of a ray going right from the point with each side of the face
+        side_pairs = np.repeat(np.arange(len(faces)), sizes[faces])
+        local = np.arange(len(side_pairs)) - np.repeat(np.cumsum(sizes[faces]) - sizes[faces], sizes[faces])
+        start = indptr[faces[side_pairs]]
+        a = self.vertices[face_vertices[start + local]]
+        b = self.vertices[face_vertices[start + (local + 1) % sizes[faces[side_pairs]]]]
+        p = self.vertices[points[side_pairs]]
+        straddles = (a[:, 1] > p[:, 1]) != (b[:, 1] > p[:, 1])
+        dy = np.where(straddles, b[:, 1] - a[:, 1], 1.)
+        x = a[:, 0] + (p[:, 1] - a[:, 1]) * (b[:, 0] - a[:, 0]) / dy
+        crossings = np.bincount(side_pairs, weights=straddles & (p[:, 0] < x), minlength=len(faces))
+
+        # a vertex of the face itself is on its boundary, not inside it
+        on_face = np.zeros(len(faces), dtype=bool)
+        np.logical_or.at(on_face, side_pairs, face_vertices[start + local] == points[side_pairs])
+        has_hole[faces[(crossings % 2 == 1) & ~on_face]] = True
+        return has_hole
+
+    def triangulate(self, style='u', fold_angle=180.):
+        """ Split every face with more than three vertices into triangles
+
+        Strictly convex faces are split as fans from their first vertex, all at
+        once. Other faces (non convex, or with vertices in the middle of a side,
+        e.g. after splitting T-junctions) are split by ear clipping.
+
+        Faces ear clipping cannot handle are left as they are: faces going through
+        a vertex more than once (e.g. around a dangling edge), and faces with holes,
+        i.e. containing another connected component. Diagonals are checked last:
+        all diagonals and triangles of a face are dropped if one of its diagonals
+        is degenerate, duplicates an edge, crosses an edge or another diagonal, or
+        goes through a vertex.
+
+        Parameters
+        ----------
+        style: str
+            Style of the diagonals added
+        fold_angle: float
+            Fold angle of the diagonals added, 180 by default as for Path
+
+        Returns
+        -------
+        graph: CreaseGraph
+            Graph with diagonals appended after the original edges
+        triangles: (T, 3) int array
+            Vertices of each triangle, counterclockwise (for a y axis pointing up)
+        """
+        cycle_indptr, cycle_vertices, areas = self._get_cycles()
+        bounded = areas > self.tolerance * self.tolerance
+        indptr, face_vertices = self._select_cycles(cycle_indptr, cycle_vertices, bounded)
+        sizes = np.diff(indptr)
+        faces = np.repeat(np.arange(len(sizes)), sizes)
+
+        # faces with a repeated vertex or with holes are not simple polygons
+        pairs = np.unique(faces * self.num_vertices + face_vertices)
+        simple = np.bincount(pairs // max(self.num_vertices, 1), minlength=len(sizes)) == sizes
+        holes = cycle_vertices[cycle_indptr[:-1][~bounded]]
+        simple &= ~self._get_faces_with_holes(indptr, face_vertices, holes)
+
+        # convexity of each face, from the cross product at each of its vertices
+        local = np.arange(len(face_vertices)) - indptr[faces]
+        following = indptr[faces] + (local + 1) % sizes[faces]
+        preceding = indptr[faces] + (local - 1) % sizes[faces]
+        a = self.vertices[face_vertices[preceding]]
+        b = self.vertices[face_vertices]
+        c = self.vertices[face_vertices[following]]
+        cross = (b[:, 0] - a[:, 0]) * (c[:, 1] - b[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - b[:, 0])
+        scale = np.sqrt(((b - a)**2).sum(axis=1) * ((c - b)**2).sum(axis=1))
+        reflex = np.bincount(faces, weights=cross <= self.tolerance * scale, minlength=len(sizes)) > 0
+
+        # fans of convex faces
+        convex = np.flatnonzero(simple & ~reflex)
+        fans = np.maximum(sizes[convex] - 2, 0)
+        fan_faces = np.repeat(convex, fans)
+        fan_local = np.arange(fans.sum()) - np.repeat(np.cumsum(fans) - fans, fans) + 1
+        triangles = [np.column_stack((face_vertices[indptr[fan_faces]],
+                                      face_vertices[indptr[fan_faces] + fan_local],
+                                      face_vertices[indptr[fan_faces] + fan_local + 1]))]
+        inner = fan_local > 1
+        diagonals = [triangles[0][inner, :2]]
+        triangle_faces = [fan_faces]
+        diagonal_faces = [fan_faces[inner]]
+
+        # ear clipping of other faces
+        for face in np.flatnonzero(simple & reflex):
+            face_triangles, face_diagonals = self._clip_ears(face_vertices[indptr[face]:indptr[face + 1]])
+            triangles.append(face_triangles)
+            diagonals.append(face_diagonals)
+            triangle_faces.append(np.full(len(face_triangles), face))
+            diagonal_faces.append(np.full(len(face_diagonals), face))
+
+        triangles = np.concatenate(triangles).reshape(-1, 3)
+        diagonals = np.concatenate(diagonals).reshape(-1, 2)
+        triangle_faces = np.concatenate(triangle_faces).astype(np.intp)
+        diagonal_faces = np.concatenate(diagonal_faces).astype(np.intp)
+
+        invalid = self._get_invalid_diagonals(diagonals)
+        invalid_faces = np.zeros(len(sizes), dtype=bool)
+        invalid_faces[diagonal_faces[invalid]] = True
+        triangles = triangles[~invalid_faces[triangle_faces]]
+        diagonals = diagonals[~invalid_faces[diagonal_faces]]
+
+        graph = CreaseGraph(self.vertices,
+                            np.concatenate((self.edges, diagonals)),
+                            np.concatenate((self.styles, np.full(len(diagonals), ord(style), dtype=np.uint8))),
+                            np.concatenate((self.fold_angles, np.full(len(diagonals), fold_angle))),
+                            self.tolerance)
+        return graph, triangles
+
+    def _get_invalid_diagonals(self, diagonals):
+        """ Check diagonals added by triangulate against the graph and each other
+
+        Returns
+        -------
+        invalid: (D,) bool array
+            True for diagonals joining a vertex to itself, duplicating an edge or an
+            earlier diagonal, crossing an edge or another diagonal, or going through
+            a vertex
+        """
+        invalid = diagonals[:, 0] == diagonals[:, 1]
+        if len(diagonals) == 0:
+            return invalid
+
+        # duplicates of edges, or of earlier diagonals
+        keys = np.sort(np.concatenate((self.edges, diagonals)), axis=1)
+        keys = keys[:, 0] * self.num_vertices + keys[:, 1]
+        _, first = np.unique(keys, return_index=True)
+        duplicate = np.ones(len(keys), dtype=bool)
+        duplicate[first] = False
+        invalid |= duplicate[self.num_edges:]
+        invalid |= np.isin(keys[self.num_edges:], keys[:self.num_edges])
+
+        # crossings with edges or other diagonals, and vertices on diagonals
+        first_edges, second_edges, _ = self._get_crossings(self.vertices, np.concatenate((self.edges, diagonals)),
+                                                           self.tolerance)
+        crossing = np.concatenate((first_edges, second_edges))
+        crossing = crossing[crossing >= self.num_edges] - self.num_edges
+        invalid[crossing] = True
+        split_diagonals, _, _ = self._get_t_junctions(self.vertices, diagonals, self.tolerance)
+        invalid[split_diagonals] = True
+        return invalid
+
+    def _clip_ears(self, polygon):
+        """ Triangulate a single polygon by ear clipping
+
+        Parameters
+        ----------
+        polygon: (K,) int array
+            Vertices of a counterclockwise face
+
+        Returns
+        -------
+        triangles: (K - 2, 3) int array
+        diagonals: (K - 3, 2) int array
+        """
+        polygon = polygon.tolist()
+        points = {vertex: self.vertices[vertex].tolist() for vertex in polygon}
+        tolerance = self.tolerance
+
+        def cross(o, a, b):
+            return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+        def inside(o, a, p):
+            # left of o->a, or closer to its line than tolerance
+            return cross(o, a, p) >= -tolerance * math.hypot(a[0] - o[0], a[1] - o[1])
+
+        def is_ear(i):
+            a, b, c = (points[polygon[(i + k) % len(polygon)]] for k in (-1, 0, 1))
+            if cross(a, b, c) <= tolerance * tolerance:
+                return False
+            for vertex in polygon:
+                p = points[vertex]
+                if p in (a, b, c):
+                    continue
+                if inside(a, b, p) and inside(b, c, p) and inside(c, a, p):
+                    return False
+            return True
+
+        triangles, diagonals = [], []
+        while len(polygon) > 3:
+            for i in range(len(polygon)):
+                if is_ear(i):
+                    break
+            else:
+                break  # degenerate polygon, leave the remaining part as is
+            a, b, c = (polygon[(i + k) % len(polygon)] for k in (-1, 0, 1))
+            triangles.append((a, b, c))
+            diagonals.append((a, c))
+            del polygon[i]
+        if len(polygon) == 3:
+            triangles.append(tuple(polygon))
+        return np.array(triangles, dtype=np.intp).reshape(-1, 3), np.array(diagonals, dtype=np.intp).reshape(-1, 2)
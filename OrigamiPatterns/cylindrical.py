@@ -5,7 +5,7 @@ from math import pi, sin
 from itertools import accumulate
 
 import inkex
-from path import Path
+from path import Path, PathInstance
 from pattern import Pattern
 
 def generate_slot_line(n, slot_position,
@@ -183,7 +183,7 @@ class Cylindrical(Pattern):
             dx = cell_data['dx'][i]
             dy = cell_data['dy'][i] + base_height + i * distance
             pattern = cell_data['interior'][i]
-            interiors.append(Path.list_add(pattern, (dx, dy)))
+            interiors.append(PathInstance(pattern, Path.translation((dx, dy))))
         return interiors
 
     def generate_horizontal_dividers(self, cell_data):
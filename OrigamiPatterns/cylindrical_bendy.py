@@ -5,7 +5,7 @@ from math import pi, sin, cos, tan, asin, acos, atan, sqrt
 
 import inkex
 
-from path import Path
+from path import Path, PathBatch, PathInstance
 from pattern import Pattern
 
 # Select name of class, inherits from Pattern
@@ -15,6 +15,292 @@ from pattern import Pattern
 MIN = 0.0001
 
 
+def repeat_strokes(strokes, offsets):
+    """ Get strokes repeated at each offset, as arrays
+
+    Parameters
+    ----------
+    strokes: list of (points, style)
+        Points being a list of 2 sized tuples
+    offsets: (R, 2) array
+
+    Returns
+    -------
+    coords: (R * M, 2) array
+        Points of all strokes, M being the number of points of all strokes
+    counts: (R * S,) array
+        Number of points of each stroke
+    styles: (R * S,) uint8 array
+    """
+    block = np.array([point for points, _ in strokes for point in points], dtype=float).reshape(-1, 2)
+    offsets = np.asarray(offsets, dtype=float).reshape(-1, 2)
+    coords = (block + offsets[:, np.newaxis, :]).reshape(-1, 2)
+    counts = np.tile([len(points) for points, _ in strokes], len(offsets)).astype(np.int64)
+    styles = np.tile([ord(style) for _, style in strokes], len(offsets)).astype(np.uint8)
+    return coords, counts, styles
+
+
+def generate_bendy_straw(n, lines, pattern_type, A, a, b1, b2, base_height, distance,
+                         base_slot=None, distance_slot=None, center_base_slot=False, vertex_types=()):
+    """ Compute all strokes of a bendy straw at once, as arrays
+
+    Strokes are created in the same order and direction as when they were
+    created one by one, so that the pattern is drawn in the same way.
+
+    Parameters
+    ----------
+    n, lines: int
+        Number of columns (sides, plus one if there is an attachment) and of diamond lines
+    pattern_type: str
+        'origami', 'origami_bent', 'origami2', 'kirigami1' or 'kirigami2'
+    A, a: float
+        Width of a column, and of the small side of a diamond
+    b1, b2: float
+        Heights of both halves of a diamond
+    base_height, distance: float
+        Height of the base, and distance between lines
+    base_slot, distance_slot: tuple or None
+        (height, width) of slots of base and between lines, clipped to the
+        available space. If None, no slots are created
+    center_base_slot: bool
+    vertex_types: list of str
+        Vertices returned, among 'base_outer', 'base_inner', 'radius_outer' and 'radius_inner'
+
+    Returns
+    -------
+    straw: dict
+        'mountains', 'alternate', 'base_slots' and 'distance_slots': PathBatch of each
+            part of the pattern
+        'diamonds': PathBatch of the diamond columns, with one group per column
+        'diamond_left', 'diamond_middle', 'diamond_right': PathBatch of left, middle and
+            right columns, middle column being at the origin; 'diamond_bent' is the middle
+            column of bent patterns, placed at the fourth column, or None
+        'edge_points': list of 2 sized tuples
+        'vertices': (V, 2) array
+    """
+    dx = (A - a) / 2
+    height = (b1 + b2) * lines + distance * (lines - 1)
+    bent = pattern_type == 'origami_bent'
+
+    #
+    # big horizontal mountains grid
+    #
+    i = np.arange(1, lines)
+    y = np.column_stack((distance * (i - 1) + b1 * (i + 0) + b2 * (i + 0),
+                         distance * (i + 0) + b1 * (i + 0) + b2 * (i + 0))).reshape(-1)
+    if distance < MIN:
+        y = y[::2]
+    y = base_height + y
+    if base_height > MIN:
+        y = np.concatenate(([base_height], y, [base_height + (distance * (lines - 1) + b1 * lines + b2 * lines)]))
+    mountains = np.stack((np.column_stack((np.zeros_like(y), y)), np.column_stack((np.full_like(y, A * n), y))),
+                         axis=1)
+    # reverse every other horizontal stroke for faster laser-cutting
+    mountains[::2] = mountains[::2, ::-1]
+
+    #
+    # diamond shapes
+    #
+
+    # full diamond patterns styles, depending on pattern type
+    style_diag_left = 'm'
+    style_diag_right = 'm'
+    style_vert = 'm'
+    style_hori_left = 'm'
+    style_hori_right = 'm'
+    if pattern_type == 'origami' or pattern_type == 'origami_bent':
+        style_hori_left = 'v'
+        style_diag_left = 'n'
+        style_diag_right = 'v'
+    elif pattern_type == 'origami2':
+        style_hori_right = 'v'
+        style_diag_left = 'v'
+        style_diag_right = 'n'
+    elif pattern_type == 'kirigami1':
+        style_vert = 'v'
+        style_hori_left = 'c'
+        style_hori_right = 'c'
+    elif pattern_type == 'kirigami2':
+        style_diag_left = 'c'
+        style_diag_right = 'c'
+        style_hori_left = 'n'
+        style_hori_right = 'n'
+        style_vert = 'n'
+
+    # diamond pattern with strokes of different styles
+    stroke_base = [(0, 0), (0, base_height)]
+    diagonals_left = [(0, base_height), (-dx, base_height + b1), (0, base_height + b1 + b2)]
+    diagonals_right = [(0, base_height + b1 + b2), (dx, base_height + b1), (0, base_height)]
+    vertical = [(0, base_height), (0, base_height + b1 + b2)]
+    stroke_distance = [(0, base_height + b1 + b2), (0, distance + base_height + b1 + b2)]
+
+    # columns are lines of diamonds (or bent diagonals), with strokes of distance and base between them
+    deltas = np.column_stack((np.zeros(lines), (distance + b1 + b2) * np.arange(lines)))
+    base_strokes = [(stroke_base, 'm')] if base_height > MIN else []
+    distance_strokes = [(stroke_distance, 'm')] if distance > MIN else []
+    bottom = repeat_strokes(base_strokes, [(0, base_height + height)])
+
+    def generate_column(strokes):
+        coords, counts, styles = repeat_strokes(strokes + distance_strokes, deltas)
+        if distance_strokes:
+            # no stroke of distance after last line
+            coords, counts, styles = coords[:-len(stroke_distance)], counts[:-1], styles[:-1]
+        parts = [repeat_strokes(base_strokes, [(0, 0)]), (coords, counts, styles), bottom]
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+    middle = generate_column([(diagonals_left, style_diag_left), (diagonals_right, style_diag_right),
+                              (vertical, style_vert)])
+    bent_middle = generate_column([(diagonals_right, 'm')]) if bent else None
+
+    # side columns only have diagonals, left one from bottom to top
+    sides = [] if pattern_type == 'kirigami2' else [(diagonals_right, style_diag_right)]
+    left = repeat_strokes(sides, deltas[::-1])
+    sides = [] if pattern_type == 'kirigami2' else [(diagonals_left, style_diag_left)]
+    coords, counts, styles = repeat_strokes(sides, deltas)
+    right = (coords + (A * n, 0), counts, styles)
+
+    columns = [left]
+    for i in range(n - 1):
+        coords, counts, styles = bent_middle if bent and i == 2 else middle
+        columns.append((coords + (A * (i + 1), 0), counts, styles))
+    columns.append(right)
+    coords, counts, styles = [np.concatenate(arrays) for arrays in zip(*columns)]
+    diamonds = PathBatch.from_strokes(coords, counts, styles,
+                                      sublist_sizes=[len(counts) for _, counts, _ in columns])
+
+    #
+    # small horizontal alternate style grid
+    #
+    i = np.arange(n)
+    strokes = np.empty((n, 3, 2, 2))
+    strokes[:, 0, :, 0] = np.column_stack((dx + (a + 2 * dx) * i, dx + a + (a + 2 * dx) * i))
+    strokes[:, 1, :, 0] = np.column_stack((-dx + (A + (a + 2 * dx) * i), 0 + (A + (a + 2 * dx) * i)))
+    strokes[:, 2, :, 0] = np.column_stack((0 + (A + (a + 2 * dx) * i), dx + (A + (a + 2 * dx) * i)))
+    strokes[..., 1] = 0
+    styles = np.empty((n, 3), dtype=np.uint8)
+    styles[:] = [ord('v'), ord(style_hori_left), ord(style_hori_right)]
+    # valley, left horizontal and right horizontal (or bent) strokes of each column
+    used = np.ones((n, 3), dtype=bool)
+    used[:, 1:] = pattern_type != 'kirigami2'
+    used[n - 1, 2] = False
+    if bent and n > 3:
+        used[3, :2] = False
+    if bent and n > 2 and pattern_type != 'kirigami2':
+        used[2, 2] = True
+        styles[2, 2] = ord('v')
+    first = [] if pattern_type == 'kirigami2' else [[(0, 0), (dx, 0)]]
+    line = np.concatenate((np.reshape(first, (-1, 2, 2)), strokes[used]))
+    line_styles = np.concatenate(([ord(style_hori_right)] * len(first), styles[used])).astype(np.uint8)
+
+    i = np.arange(lines)
+    y = base_height + distance * (i + 0) + b1 * (i + 1) + b2 * (i + 0)
+    alternate = line + np.column_stack((np.zeros(lines), y))[:, np.newaxis, np.newaxis, :]
+    alternate_styles = np.tile(line_styles, (lines, 1))
+    # reverse every other horizontal line for faster laser-cutting
+    alternate[::2] = alternate[::2, ::-1, ::-1]
+    alternate_styles[::2] = alternate_styles[::2, ::-1]
+
+    #
+    # edge drawing
+    #
+    i = np.arange(lines)[:, np.newaxis]
+    right_edge = [(A * n + 0, base_height + (b1 + b2) * (i + 0) + distance * i)]
+    if pattern_type == 'kirigami2':
+        right_edge.append((A * n - dx, base_height + b1 * (i + 1) + (b2 + distance) * i))
+    right_edge.append((A * n + 0, base_height + (b1 + b2) * (i + 1) + distance * i))
+    edges = [[(0, 0), (A * n, 0), (A * n, base_height)],
+             np.stack([np.hstack(np.broadcast_arrays(x, y)) for x, y in right_edge], axis=1),
+             [(A * n, height + 2 * base_height), (0, height + 2 * base_height)]]
+    # if full kirigami selected, cut left side next to cells
+    if pattern_type == 'kirigami2':
+        left_edge = [(0, height + base_height - (b1 + b2) * (i + 0) - distance * i),
+                     (dx, height + base_height - b2 * (i + 1) - (b1 + distance) * i),
+                     (0, height + base_height - (b1 + b2) * (i + 1) - distance * i)]
+        edges.append(np.stack([np.hstack(np.broadcast_arrays(x, y)) for x, y in left_edge], axis=1))
+    edge_points = list(map(tuple, np.concatenate([np.reshape(edge, (-1, 2)) for edge in edges]).tolist()))
+
+    #
+    # slots drawing
+    #
+    i = np.arange(n)[:, np.newaxis, np.newaxis]
+    base_slots = np.empty((0, 4, 2))
+    if base_slot is not None:
+        base_slot_height, base_slot_width = base_slot
+        if base_slot_height > base_height or base_slot_width > A:
+            inkex.utils.debug('Base slot dimensions are too big')
+            base_slot_height = min(base_height, base_slot_height)
+            base_slot_width = min(A, base_slot_width)
+        if base_slot_height > 0 and base_slot_width > 0:
+            points = np.array([(0, 0),
+                               (0, base_slot_height),
+                               (base_slot_width, base_slot_height),
+                               (base_slot_width, 0,)], dtype=float)
+            points = points + ((A - base_slot_width) / 2, (base_height - base_slot_height) / (1 + center_base_slot))
+            line = points + np.concatenate((A * i, 0 * i), axis=-1)
+            base_slots = np.concatenate((line, line + (0, height + base_slot_height +
+                                                       (base_height - base_slot_height) * center_base_slot)))
+
+    distance_slots = np.empty((0, 4, 2))
+    if distance_slot is not None:
+        dist_slot_height, dist_slot_width = distance_slot
+        if dist_slot_height > distance or dist_slot_width > A:
+            inkex.utils.debug('Dimensions of slots between cells are too big')
+            dist_slot_height = min(distance, dist_slot_height)
+            dist_slot_width = min(A, dist_slot_width)
+        if dist_slot_height > 0 and dist_slot_width > 0:
+            points = np.array([(0, 0),
+                               (0, dist_slot_height),
+                               (dist_slot_width, dist_slot_height),
+                               (dist_slot_width, 0,)], dtype=float)
+            points = points + ((A - dist_slot_width) / 2, base_height + b1 + b2 + (distance - dist_slot_height) / 2)
+            line = points + np.concatenate((A * i, 0 * i), axis=-1)
+            j = np.arange(lines - 1)[:, np.newaxis, np.newaxis, np.newaxis]
+            distance_slots = (line + np.concatenate((0 * j, j * (b1 + b2 + distance)), axis=-1)).reshape(-1, 4, 2)
+
+    #
+    # vertices drawing
+    #
+    i = np.arange(n + 1)
+    j = np.arange(lines)[:, np.newaxis]
+    y = base_height + b1 * (j + 1) + (b2 + distance) * j
+    # for each type, (x, y) of lines of vertices drawn one after another, then of
+    # lines drawn at every line of diamonds, alternating between them
+    vertices = {'base_outer': ([(A * i, height + base_height * 2), (A * i, 0)], []),
+                'base_inner': ([(A * i, base_height), (A * i, height + base_height)],
+                               [(A * i, base_height + ((b1 + b2) * (j[:-1] + 1)) + distance * j[:-1]),
+                                (A * i, base_height + ((b1 + b2) * (j[:-1] + 1)) + distance * (j[:-1] + 1))]),
+                'radius_outer': ([], []),
+                'radius_inner': ([], [])}
+    if pattern_type != 'kirigami2':
+        radius_columns = np.concatenate((np.arange(3), np.arange(3 + bent, n + 1)))
+        vertices['radius_outer'][1].append((A * radius_columns, y))
+    if pattern_type != 'origami2':
+        vertices['radius_inner'][1].append((dx + A * i[:-1], y))
+    if pattern_type[:7] != 'origami':
+        vertices['radius_inner'][1].append((-dx + A * (i[:-1] + 1), y))
+
+    points = [np.empty((0, 2))]
+    for vertex_type in vertex_types:
+        single, repeated = vertices[vertex_type]
+        points += [np.column_stack(np.broadcast_arrays(x, y)) for x, y in single]
+        if repeated:
+            points.append(np.concatenate([np.stack(np.broadcast_arrays(x, y), axis=-1) for x, y in repeated],
+                                         axis=1).reshape(-1, 2))
+
+    return {'mountains': PathBatch.from_array(mountains, 'm'),
+            'alternate': PathBatch.from_array(alternate.reshape(-1, 2, 2), alternate_styles.reshape(-1),
+                                              sublist_size=len(line_styles)),
+            'diamonds': diamonds,
+            'diamond_left': PathBatch.from_strokes(*left),
+            'diamond_middle': PathBatch.from_strokes(*middle),
+            'diamond_bent': None if bent_middle is None else PathBatch.from_strokes(*bent_middle),
+            'diamond_right': PathBatch.from_strokes(*right),
+            'base_slots': PathBatch.from_array(base_slots, 'c', closed=True, sublist_size=n),
+            'distance_slots': PathBatch.from_array(distance_slots, 'c', closed=True, sublist_size=n),
+            'edge_points': edge_points,
+            'vertices': np.concatenate(points)}
+
+
 class Bendy_Straw(Pattern):
 
     def __init__(self):
@@ -62,7 +348,6 @@ class Bendy_Straw(Pattern):
         """
         # retrieve conversion factor for selected unit
         unit_factor = self.calc_unit_factor()
-        vertex_radius = self.options.vertex_radius * unit_factor
 
         # retrieve saved parameters, and apply unit factor where needed
         pattern_type = self.options.pattern_type
@@ -89,286 +374,50 @@ class Bendy_Straw(Pattern):
         A = 2 * R * sin(pi / n)
         # attachment_length = 0.01 * self.options.attachment_length * A
         a = A * radial_ratio
-        dx = (A - a) / 2
         beta1 = acos(cos(alpha1) * sin(pi / n))
         beta2 = acos(cos(alpha2) * sin(pi / n))
         b1 = l1 * sin(beta1)
         b2 = l2 * sin(beta2)
-        height = (b1 + b2) * lines + distance * (lines - 1)
 
         if self.options.add_attachment: n = n+1
 
-        #
-        # big horizontal mountains grid
-        #
-        mountain_horizontal_stroke = Path([(0, base_height), (A * n, base_height)], 'm')
-        horizontal_grid_mountain = []
-        for i in range(1, lines):
-            horizontal_grid_mountain.append(
-                mountain_horizontal_stroke + (0, distance * (i - 1) + b1 * (i + 0) + b2 * (i + 0)))
-            horizontal_grid_mountain.append(
-                mountain_horizontal_stroke + (0, distance * (i + 0) + b1 * (i + 0) + b2 * (i + 0)))
-        if distance < MIN:
-            horizontal_grid_mountain = horizontal_grid_mountain[::2]
-        if base_height > MIN:
-            horizontal_grid_mountain.insert(0, mountain_horizontal_stroke)
-            horizontal_grid_mountain.append(
-                mountain_horizontal_stroke + (0, distance * (lines - 1) + b1 * lines + b2 * lines))
-
-        # reverse every other horizontal stroke for faster laser-cutting
-        for i in range(len(horizontal_grid_mountain)):
-            if (i % 2 == 0):
-                horizontal_grid_mountain[i].points.reverse()
-
-        #
-        # diamond shapes
-        #
-
-        # full diamond patterns styles, depending on pattern type
-        style_diag_left = 'm'
-        style_diag_right = 'm'
-        style_diag = 'v'
-        style_vert = 'm'
-        style_hori_left = 'm'
-        style_hori_right = 'm'
-        if pattern_type == 'origami' or pattern_type == 'origami_bent':
-            style_hori_left = 'v'
-            style_diag_left = 'n'
-            style_diag_right = 'v'
-        elif pattern_type == 'origami2':
-            style_hori_right = 'v'
-            style_diag_left = 'v'
-            style_diag_right = 'n'
-        elif pattern_type == 'kirigami1':
-            style_vert = 'v'
-            style_hori_left = 'c'
-            style_hori_right = 'c'
-        elif pattern_type == 'kirigami2':
-            style_diag_left = 'c'
-            style_diag_right = 'c'
-            style_hori_left = 'n'
-            style_hori_right = 'n'
-            style_vert = 'n'
-
-        # diamond pattern with strokes of different styles
-        stroke_base = Path([(0, 0), (0, base_height)], 'm')
-        diamond_diagonals_left = Path([(0, base_height), (-dx, base_height + b1), (0, base_height + b1 + b2)],
-                                      style_diag_left)
-        diamond_diagonals_right = Path([(0, base_height + b1 + b2), (dx, base_height + b1), (0, base_height)],
-                                       style_diag_right)
-        diamond_vertical = Path([(0, base_height), (0, base_height + b1 + b2)], style_vert)
-        stroke_distance = Path([(0, base_height + b1 + b2), (0, distance + base_height + b1 + b2)], 'm')
-        diamond_horizontal_left = Path([(-dx, 0), (0, 0)], style_hori_left)
-        diamond_horizontal_right = Path([(0, 0), (dx, 0)], style_hori_right)
-
-        diamond = [diamond_diagonals_left, diamond_diagonals_right, diamond_vertical]
-
-        if pattern_type == 'origami_bent':
-            bent_diagonal = Path([(0, base_height + b1 + b2), (dx, base_height + b1), (0, base_height)], 'm')
-            bent_horizontal = Path([(0, 0), (dx, 0)], 'v')
-            line_bent = []
-
-
-        # drawing lines with the diamond shapes
-        line_left = []
-        line_middle = []
-        line_right = []
-        if base_height > MIN:
-            line_middle.append(stroke_base)
-            if pattern_type == 'origami_bent':
-                line_bent.append(stroke_base)
-        for i in range(lines):
-            delta = (0, (distance + b1 + b2) * i)
-            if pattern_type != 'kirigami2':
-                line_left.append(diamond_diagonals_right + delta)
-            line_middle = line_middle + Path.list_add(diamond, delta)
-            if pattern_type != 'kirigami2':
-                line_right.append(diamond_diagonals_left + delta)
-            if distance > MIN and i < lines - 1:
-                line_middle.append(stroke_distance + delta)
-
-            if pattern_type == 'origami_bent':
-                line_bent = line_bent + [bent_diagonal + delta]
-                if distance > MIN and i < lines - 1:
-                    line_bent.append(stroke_distance + delta)
-
-        if base_height > MIN:
-            line_middle.append(stroke_base + (0, base_height + height))
-            if pattern_type == 'origami_bent':
-                line_bent.append(stroke_base + (0, base_height + height))
-
-        # creating full diamond patterns
-        line_left = line_left[::-1]
-        diamond_patterns_full = [line_left]
-        for i in range(n - 1):
-            delta = (A * (i + 1), 0)
-            if pattern_type == 'origami_bent' and i == 2:
-                diamond_patterns_full.append(Path.list_add(line_bent, delta))
-            else:
-                diamond_patterns_full.append(Path.list_add(line_middle, delta))
-        diamond_patterns_full.append(Path.list_add(line_right, (A * n, 0)))
-
-        #
-        # small horizontal alternate style grid
-        #
-        valley_points = [(dx, 0),
-                         (dx + a, 0)]
-        valley_stroke = Path(valley_points, 'v')
-        if pattern_type == 'kirigami2':
-            horizontal_line = []
-        else:
-            horizontal_line = [diamond_horizontal_right + (0, 0)]
-        for i in range(n):
-            if not (pattern_type == 'origami_bent' and i == 3):
-                horizontal_line.append(valley_stroke + ((a + 2 * dx) * i, 0))
-            if (pattern_type != 'kirigami2'):
-                if not (pattern_type == 'origami_bent' and i == 3):
-                    horizontal_line.append(diamond_horizontal_left + (A + (a + 2 * dx) * i, 0))
-                if pattern_type == 'origami_bent' and i==2:
-                    horizontal_line.append(bent_horizontal + (A + (a + 2 * dx) * i, 0))
-                elif i < n - 1:
-                    horizontal_line.append(diamond_horizontal_right + (A + (a + 2 * dx) * i, 0))
-        horizontal_grid_alternate = []
-        for i in range(lines):
-            horizontal_grid_alternate.append(
-                Path.list_add(horizontal_line, (0, base_height + distance * (i + 0) + b1 * (i + 1) + b2 * (i + 0))))
-
-        # reverse every other horizontal stroke for faster laser-cutting
-        for i in range(len(horizontal_grid_alternate)):
-            if (i % 2 == 0):
-                horizontal_grid_alternate[i] = Path.list_invert(horizontal_grid_alternate[i])
-
-        # for i in range(len(horizontal_grid_alternate)):
-        #     inkex.utils.debug(i)
-        #     Path.debug_points(horizontal_grid_alternate[i])
-        #     inkex.utils.debug('\n')
-
-        #
-        # edge drawing
-        #
-        self.edge_points = [(0, 0)]
-        self.edge_points.append((A * n, 0))
-
-        # rectangles for attachments at base and between cells
-
-        # add upper base attachment
-        self.edge_points.append((A * n, base_height))
-
-        # draw attachment between cells and inside cells
-        for i in range(lines):
-            self.edge_points.append((A * n + 0, base_height + (b1 + b2) * (i + 0) + distance * i))
-            if pattern_type == 'kirigami2':
-                self.edge_points.append((A * n - dx, base_height + b1 * (i + 1) + (b2 + distance) * i))
-            self.edge_points.append((A * n + 0, base_height + (b1 + b2) * (i + 1) + distance * i))
-
-        self.edge_points.append((A * n, height + 2 * base_height))
-        self.edge_points.append((0, height + 2 * base_height))
-
-        # if full kirigami selected, cut left side next to cells
-        if pattern_type == 'kirigami2':
-            for i in range(lines):
-                self.edge_points.append((0, height + base_height - (b1 + b2) * (i + 0) - distance * i))
-                self.edge_points.append((dx, height + base_height - b2 * (i + 1) - (b1 + distance) * i))
-                self.edge_points.append((0, height + base_height - (b1 + b2) * (i + 1) - distance * i))
-
-        #
-        # slots drawing
-        #
-        center_slot = self.options.center_base_slot
-        base_slots = []
+        base_slot = None
         if self.options.add_base_slot:
-            base_slot_height = self.options.base_slot_height * unit_factor
-            base_slot_width = self.options.base_slot_width * unit_factor
-            if base_slot_height > base_height or base_slot_width > A:
-                inkex.utils.debug('Base slot dimensions are too big')
-                base_slot_height = min(base_height, base_slot_height)
-                base_slot_width = min(A, base_slot_width)
-            if base_slot_height > 0 and base_slot_width > 0:
-                points = [(0,     0),
-                          (0,     base_slot_height),
-                          (base_slot_width, base_slot_height),
-                          (base_slot_width, 0,)]
-                base_slot = Path(points, 'c', closed=True) + ((A - base_slot_width)/2, (base_height - base_slot_height)/(1+center_slot))
-                base_slots_line = []
-                for i in range(n):
-                    base_slots_line.append(base_slot + (A*i, 0))
-                base_slots = [base_slots_line]
-                base_slots.append(Path.list_add(base_slots_line, (0, height+base_slot_height + (base_height - base_slot_height)*center_slot)))
-
-        dist_slots = []
+            base_slot = (self.options.base_slot_height * unit_factor, self.options.base_slot_width * unit_factor)
+        distance_slot = None
         if self.options.add_distance_slot:
-            dist_slot_height = self.options.distance_slot_height * unit_factor
-            dist_slot_width = self.options.distance_slot_width * unit_factor
-            if dist_slot_height > distance or dist_slot_width > A:
-                inkex.utils.debug('Dimensions of slots between cells are too big')
-                dist_slot_height = min(distance, dist_slot_height)
-                dist_slot_width = min(A, dist_slot_width)
-
-            if dist_slot_height > 0 and dist_slot_width > 0:
-                points = [(0,     0),
-                          (0,     dist_slot_height),
-                          (dist_slot_width, dist_slot_height),
-                          (dist_slot_width, 0,)]
-                dist_slot = Path(points, 'c', closed=True) + ((A - dist_slot_width)/2, base_height+b1+b2 + (distance - dist_slot_height)/2)
-                dist_slots_line = []
-                for i in range(n):
-                    dist_slots_line.append(dist_slot + (A*i, 0))
-
-                for i in range(lines-1):
-                    dist_slots.append(Path.list_add(dist_slots_line, (0, i*(b1+b2+distance))))
+            distance_slot = (self.options.distance_slot_height * unit_factor,
+                             self.options.distance_slot_width * unit_factor)
+        vertex_types = [vertex_type for vertex_type, enabled in (
+            ('base_outer', self.options.vertex_base_outer_bool), ('base_inner', self.options.vertex_base_inner_bool),
+            ('radius_outer', self.options.vertex_radius_outer_bool),
+            ('radius_inner', self.options.vertex_radius_inner_bool)) if enabled]
+
+        straw = generate_bendy_straw(n, lines, pattern_type, A, a, b1, b2, base_height, distance,
+                                     base_slot, distance_slot, self.options.center_base_slot, vertex_types)
+
+        # when drawing with symbols, middle columns are instances of the same line of diamonds
+        diamond_patterns_full = straw['diamonds']
+        if self.options.use_symbols:
+            line_middle = list(straw['diamond_middle'])
+            line_bent = None if straw['diamond_bent'] is None else list(straw['diamond_bent'])
+            diamond_patterns_full = [straw['diamond_left']]
+            for i in range(n - 1):
+                delta = (A * (i + 1), 0)
+                if pattern_type == 'origami_bent' and i == 2:
+                    diamond_patterns_full.append(PathInstance(line_bent, Path.translation(delta)))
+                else:
+                    diamond_patterns_full.append(PathInstance(line_middle, Path.translation(delta)))
+            diamond_patterns_full.append(straw['diamond_right'])
+
+        self.edge_points = straw['edge_points']
 
+        # sending lines  to draw
+        self.path_tree = [straw['mountains'], straw['alternate'], diamond_patterns_full,
+                          straw['base_slots'], straw['distance_slots']]
 
+        self.vertex_points = self.vertex_points + list(map(tuple, straw['vertices'].tolist()))
 
-        # sending lines  to draw
-        self.path_tree = [horizontal_grid_mountain, horizontal_grid_alternate, diamond_patterns_full, base_slots, dist_slots]
-
-        #
-        # vertices drawing
-        #
-        # outer base vertices?
-        if self.options.vertex_base_outer_bool:
-            self.vertex_points = self.vertex_points + [(A * i, height + base_height * 2) for i in range(n + 1)]
-            self.vertex_points = self.vertex_points + [(A*i, 0) for i in range(n+1)]
-
-        # inner base vertices?
-        if self.options.vertex_base_inner_bool:
-            self.vertex_points = self.vertex_points + [(A*i, base_height) for i in range(n+1)]
-            self.vertex_points = self.vertex_points + [(A*i, height+base_height) for i in range(n+1)]
-            for j in range(lines-1):
-                    self.vertex_points = self.vertex_points + [(A*i, base_height+((b1+b2)*(j+1))+distance*j) for i in range(n+1)] + \
-                                                              [(A*i, base_height+((b1+b2)*(j+1))+distance*(j+1)) for i in range(n+1)]
-
-        # radius vertices?
-        if self.options.vertex_radius_outer_bool and pattern_type != 'kirigami2':
-            for j in range(lines):
-                i_range = list(range(3)) + list(range(3+(pattern_type=='origami_bent'), n + 1))
-                self.vertex_points = self.vertex_points + [(A * i, base_height + b1*(j+1) + (b2+distance)*j) for i in i_range]
-        if self.options.vertex_radius_inner_bool:
-            for j in range(lines):
-                if pattern_type != 'origami2':
-                    # pass
-                    self.vertex_points = self.vertex_points + [(dx + A * i, base_height + b1*(j+1) + (b2+distance)*j) for i in range(n)]
-                if pattern_type[:7] != 'origami':
-                    # pass
-                    self.vertex_points = self.vertex_points + [(-dx + A * (i + 1), base_height + b1 * (j + 1) + (b2 + distance) * j) for i in range(n)]
-            # for j in range(lines):
-
-
-
-
-        # self.vertex_points = self.vertex_points + vertices_base
-
-        # self.vertex_points = self.vertex_points + self.edge_points
-        # diamond_patterns_full_simple = Path.list_simplify(diamond_patterns_full)
-        # for path in diamond_patterns_full:
-        #     # path = Path.list_simplify(path)
-        #     # path = Path.list_simplify(path[0])
-        #     if path.style != 'n':
-        #         self.vertex_points = self.vertex_points + path.points
-
-
-
-#
 
 # Main function, creates an instance of the Class and calls self.run() to draw the origami on inkscape
 # self.run() is either a call to inkex.affect() or to svg.run(), depending on python version
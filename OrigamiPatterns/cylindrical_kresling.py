@@ -1,14 +1,64 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 from math import pi, sin, asin, cos, tan, acos, sqrt
+import numpy as np
 import inkex
 import os
 
-from path import Path
+from path import Path, PathBatch
 from pattern import Pattern
 from cylindrical import Cylindrical
 
 
+def generate_zigzag_rows(sides, cols, radius, angle_ratio, offsets, mirror_cells=False):
+    """ Compute zigzag creases of all rows of a Kresling tower at once, as arrays
+
+    Parameters
+    ----------
+    sides, cols: int
+        Number of sides of the polygon and of columns of each row
+    radius, angle_ratio: float
+    offsets: (rows, 2) array
+        Position of each row
+    mirror_cells: bool
+        If true, every odd row is the zigzag reflected on the horizontal line
+        crossing the middle of the cell
+
+    Returns
+    -------
+    coords: (rows * (2*cols - 1), 2, 2) array
+        Stroke between each two consecutive points of the zigzag of every row
+    styles: (rows * (2*cols - 1),) uint8 array
+        Style codes, alternating valleys and mountains, see PathBatch
+    """
+    theta = (pi / 2.) * (1 - 2. / sides)
+    l = 2. * radius * cos(theta * (1. - angle_ratio))
+    a = 2. * radius * sin(pi / sides)
+    dy = l * sin(theta * angle_ratio)
+    dx = l * cos(theta * angle_ratio) - a
+
+    # points (i*a, 0) and ((i+1)*a + dx, dy) of each column
+    i = np.arange(cols)
+    points = np.empty((2 * cols, 2))
+    points[0::2, 0] = i * a
+    points[0::2, 1] = 0
+    points[1::2, 0] = (i + 1) * a + dx
+    points[1::2, 1] = dy
+    zigzags = [np.stack((points[:-1], points[1:]), axis=1)]
+    if mirror_cells:
+        mirrored = np.empty_like(zigzags[0])
+        mirrored[..., 0] = zigzags[0][..., 0] + (-dx)
+        mirrored[..., 1] = dy - zigzags[0][..., 1]
+        zigzags.append(mirrored)
+    zigzags = np.stack(zigzags)
+
+    offsets = np.asarray(offsets, dtype=float).reshape(-1, 2)
+    rows = len(offsets)
+    coords = zigzags[np.arange(rows) % len(zigzags)] + offsets[:, np.newaxis, np.newaxis, :]
+    styles = np.where(np.arange(2 * cols - 1) % 2 == 0, ord('v'), ord('m')).astype(np.uint8)
+    return coords.reshape(-1, 2, 2), np.tile(styles, rows)
+
+
 class Kresling(Cylindrical):
 
     def __init__(self):
@@ -19,8 +69,8 @@ class Kresling(Cylindrical):
         self.add_argument('--pattern', type=str, default="kresling")
 
         self.add_argument('--measure_value', type=float, default=10.0)
-        self.add_argument('--measure_type', type=str, default=60)
-        self.add_argument('--parameter_type', type=str, default=60)
+        self.add_argument('--measure_type', type=str, default='a')
+        self.add_argument('--parameter_type', type=str, default='angle_ratio')
         self.add_argument('--radial_ratio', type=float, default=0.5)
         self.add_argument('--angle_ratio', type=float, default=0.5)
         self.add_argument('--lambdatheta', type=float, default=45)
@@ -121,41 +171,40 @@ class Kresling(Cylindrical):
             edge_right.append(Path([(cols * width - dx, dy), (cols * width, 0)], style='e'))
         cell_data['edge_right'] = [edge_right[i % (1 + mirror_cells)] for i in range(rows)]
 
-        # rest of cell
-        zigzags = [Kresling.generate_kresling_zigzag(sides, cols, radius, angle_ratio)]
-        if mirror_cells:
-            zigzags.append(Path.list_reflect(zigzags[0], (0, dy / 2), (dx, dy / 2)))
-            zigzags[1] = Path.list_add(zigzags[1], (-dx, 0))
+        return cell_data
 
-        cell_data['interior'] = [zigzags[i % (1 + mirror_cells)] for i in range(rows)]
+    def generate_interior(self, cell_data):
+        """ Generate zigzags of all rows at once, with one group per row
 
-        return cell_data
+        When drawing with symbols, rows are instead instances of the zigzag and of
+        its mirrored version, see Cylindrical.generate_interior
+        """
+        unit_factor = self.calc_unit_factor()
+        rows = self.options.rows
+        base_height = self.options.base_height * unit_factor
+        distance = self.options.distance * unit_factor
+        mirror_cells = self.options.mirror_cells
+        size = 2 * self.options.cols - 1
+        zigzag_parameters = (self.options.sides, self.options.cols,
+                             self.options.radius * unit_factor, self.options.angle_ratio)
+
+        if self.options.use_symbols:
+            coords, styles = generate_zigzag_rows(*zigzag_parameters, [(0, 0)] * (1 + mirror_cells),
+                                                  mirror_cells=mirror_cells)
+            zigzags = [list(PathBatch.from_array(coords[i * size:(i + 1) * size], styles[:size]))
+                       for i in range(1 + mirror_cells)]
+            cell_data['interior'] = [zigzags[i % (1 + mirror_cells)] for i in range(rows)]
+            return Cylindrical.generate_interior(self, cell_data)
+
+        offsets = np.column_stack((cell_data['dx'][:rows],
+                                   np.array(cell_data['dy'][:rows]) + base_height + np.arange(rows) * distance))
+        coords, styles = generate_zigzag_rows(*zigzag_parameters, offsets, mirror_cells)
+        return PathBatch.from_array(coords, styles, sublist_size=size)
 
     @staticmethod
     def generate_kresling_zigzag(sides, cols, radius, angle_ratio):
-    # def generate_kresling_zigzag(sides, radius, angle_ratio, add_attachment):
-
-        theta = (pi / 2.) * (1 - 2. / sides)
-        l = 2. * radius * cos(theta * (1. - angle_ratio))
-        a = 2. * radius * sin(pi / sides)
-        dy = l * sin(theta * angle_ratio)
-        dx = l * cos(theta * angle_ratio) - a
-
-        points = []
-        styles = []
-
-        for i in range(cols):
-            points.append((i * a, 0))
-            points.append(((i + 1) * a + dx, dy))
-            styles.append('v')
-            if i != cols - 1:
-                styles.append('m')
-            # elif add_attachment:
-            #     points.append((sides * a, 0))
-            #     styles.append('m')
-
-        path = Path.generate_separated_paths(points, styles)
-        return path
+        """ Generate list of strokes of a single zigzag, see generate_zigzag_rows """
+        return list(PathBatch.from_array(*generate_zigzag_rows(sides, cols, radius, angle_ratio, [(0, 0)])))
 
 if __name__ == '__main__':
 
@@ -0,0 +1,141 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Export of patterns to the FOLD format
+
+FOLD files (https://github.com/edemaine/fold) describe crease patterns with
+vertex coordinates, edges and their assignment (mountain, valley, boundary, ...)
+and fold angles, and are read directly by Origami Simulator. Files follow version
+1.2 of the specification, the first one with the cut ('C') assignment. The JSON
+document is written by chunks, so that it is never held in memory as a whole.
+"""
+import itertools
+import json
+import numpy as np
+from crease_graph import CreaseGraph
+
+FILE_SPEC = 1.2
+FILE_CREATOR = 'Origami Patterns'
+
+# style of Path: FOLD edge assignment
+ASSIGNMENTS = {
+    'm': 'M',
+    'v': 'V',
+    'e': 'B',
+    'c': 'C',
+    'u': 'U',
+    's': 'F',
+}
+
+
+def get_assignments(graph):
+    """ Get FOLD assignment and fold angle of each edge of graph
+
+    Fold angles are positive for valleys, negative for mountains, and 0 for other
+    edges, following FOLD conventions.
+
+    Returns
+    -------
+    assignments: (E,) str array
+    fold_angles: (E,) float array
+    """
+    codes = np.full(256, 'U')
+    for style, assignment in ASSIGNMENTS.items():
+        codes[ord(style)] = assignment
+    signs = np.zeros(256)
+    signs[ord('v')] = 1.
+    signs[ord('m')] = -1.
+    return codes[graph.styles], signs[graph.styles] * graph.fold_angles + 0.
+
+
+def write_json_array(stream, rows, chunk_size=4096):
+    """ Write JSON array of rows to stream, serializing chunk_size rows at a time
+
+    Parameters
+    ----------
+    stream: text file
+    rows: numpy.ndarray or iterable
+        Rows of the array. Arrays are converted to lists one chunk at a time, and
+        iterables (e.g. generators) are only consumed one chunk at a time
+    chunk_size: int
+    """
+    if isinstance(rows, np.ndarray):
+        chunks = (rows[start:start + chunk_size].tolist() for start in range(0, len(rows), chunk_size))
+    else:
+        rows = iter(rows)
+        chunks = iter(lambda: list(itertools.islice(rows, chunk_size)), [])
+
+    stream.write('[')
+    for i, chunk in enumerate(chunks):
+        if i:
+            stream.write(',')
+        # a single call per chunk, stripped of its brackets, lets json use its C encoder
+        stream.write(json.dumps(chunk, separators=(',', ':'))[1:-1])
+    stream.write(']')
+
+
+def write_fold(graph, output, include_faces=True, unit='unit', title=None, chunk_size=4096):
+    """ Write crease graph as a FOLD file
+
+    Parameters
+    ----------
+    graph: CreaseGraph
+    output: str or text file
+        Filename or stream to write to
+    include_faces: bool
+        If true, faces_vertices is written too
+    unit: str
+        Unit of coordinates, written as frame_unit
+    title: str or None
+        Written as frame_title if given
+    chunk_size: int
+        Number of array entries serialized at once
+    """
+    if isinstance(output, str):
+        with open(output, 'w') as stream:
+            write_fold(graph, stream, include_faces, unit, title, chunk_size)
+        return
+
+    header = {
+        'file_spec': FILE_SPEC,
+        'file_creator': FILE_CREATOR,
+        'file_classes': ['singleModel'],
+        'frame_classes': ['creasePattern'],
+        'frame_attributes': ['2D'],
+        'frame_unit': unit,
+    }
+    if title is not None:
+        header['frame_title'] = title
+
+    assignments, fold_angles = get_assignments(graph)
+    arrays = [
+        ('vertices_coords', graph.vertices),
+        ('edges_vertices', graph.edges),
+        ('edges_assignment', assignments),
+        ('edges_foldAngle', fold_angles),
+    ]
+    if include_faces:
+        indptr, face_vertices = graph.get_faces()
+        faces = (face_vertices[indptr[i]:indptr[i + 1]].tolist() for i in range(len(indptr) - 1))
+        arrays.append(('faces_vertices', faces))
+
+    output.write('{\n')
+    output.write(',\n'.join('{}: {}'.format(json.dumps(key), json.dumps(value)) for key, value in header.items()))
+    for key, rows in arrays:
+        output.write(',\n{}: '.format(json.dumps(key)))
+        write_json_array(output, rows, chunk_size)
+    output.write('\n}\n')
+
+
+def export_fold(paths, output, tolerance=1e-6, **kwargs):
+    """ Build crease graph of a path tree and write it as a FOLD file
+
+    Parameters
+    ----------
+    paths: nested list, Path or PathBatch
+    output: str or text file
+    tolerance: float
+        See CreaseGraph.from_tree
+    kwargs:
+        Passed to write_fold
+    """
+    write_fold(CreaseGraph.from_tree(paths, tolerance), output, **kwargs)
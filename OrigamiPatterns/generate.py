@@ -0,0 +1,360 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Generate patterns without Inkscape
+
+Patterns are generated from an empty in-memory document, instead of an input SVG
+read from stdin, so they can be produced in batch. Usage from the command line:
+
+    python OrigamiPatterns/generate.py generate <pattern> [--param=value ...] [-f svg|fold] [-o output.svg]
+
+where params are the same as the ones passed by Inkscape to the pattern's extension.
+From Python:
+
+    svg = generate_svg('waterbomb', lines=4, columns=6)
+    path_tree = generate_path_tree('cylindrical_kresling', measure_type='a', sides=8)
+
+Catalogs of variants are generated in parallel, one file per variant, with:
+
+    python OrigamiPatterns/generate.py sweep <pattern> --grid sides=6,7,8 --grid rows=2,3 [--param=value ...] -o catalog/
+"""
+import argparse
+import concurrent.futures
+import importlib
+import io
+import itertools
+import json
+import os
+import pickle
+import sys
+import time
+from fold import export_fold
+
+# pattern name: (module, class)
+PATTERNS = {
+    'boxes_masu': ('boxes_masu', 'MasuBox'),
+    'boxes_masu_traditional': ('boxes_masu_traditional', 'MasuBoxSquare'),
+    'cylindrical_bendy': ('cylindrical_bendy', 'Bendy_Straw'),
+    'cylindrical_kresling': ('cylindrical_kresling', 'Kresling'),
+    'cylindrical_support_ring': ('cylindrical_support_ring', 'SupportRing'),
+    'cylindrical_template': ('cylindrical_template', 'Template'),
+    'old_bendy': ('old_bendy', 'Bendy_Straw'),
+    'old_kresling_full': ('old_kresling_full', 'Kresling_Full'),
+    'pleat_circular': ('pleat_circular', 'PleatCircular'),
+    'pleat_hypar': ('pleat_hypar', 'Hypar'),
+    'template': ('template', 'Template'),
+    'waterbomb': ('waterbomb', 'Waterbomb'),
+}
+
+OUTPUT_FORMATS = ('svg', 'fold', 'pickle')
+
+EMPTY_DOCUMENT = (
+    b'<svg xmlns="http://www.w3.org/2000/svg" '
+    b'xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape" '
+    b'xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd" '
+    b'width="210mm" height="297mm" viewBox="0 0 210 297">'
+    b'<sodipodi:namedview id="namedview1" inkscape:document-units="mm" inkscape:current-layer="layer1"/>'
+    b'<g id="layer1" inkscape:label="Layer 1" inkscape:groupmode="layer"/>'
+    b'</svg>')
+
+
+def get_pattern_class(pattern):
+    """ Import module of pattern and return its class """
+    if pattern not in PATTERNS:
+        raise ValueError('Unknown pattern {!r}, choose one of: {}'.format(pattern, ', '.join(sorted(PATTERNS))))
+    module, name = PATTERNS[pattern]
+    return getattr(importlib.import_module(module), name)
+
+
+def format_args(args=None, **params):
+    """ Get command line arguments of a pattern from keyword parameters
+
+    Parameters
+    ----------
+    args: list of str or None
+        Arguments already in command line form, e.g. ['--sides=6']
+    params:
+        Additional parameters, e.g. sides=6. Booleans are converted to 'true'/'false'
+
+    Returns
+    -------
+    args: list of str
+    """
+    args = list(args or [])
+    for key, value in params.items():
+        if isinstance(value, bool):
+            value = str(value).lower()
+        args.append('--{}={}'.format(key, value))
+    return args
+
+
+def create_pattern(pattern, args=None, **params):
+    """ Create pattern instance with parsed options and an empty in-memory document
+
+    Parameters
+    ----------
+    pattern: str
+        Name of the pattern, one of PATTERNS
+    args: list of str or None
+        Command line arguments of the pattern
+    params:
+        Additional parameters, see format_args
+
+    Returns
+    -------
+    effect: Pattern
+    """
+    effect = get_pattern_class(pattern)()
+    effect.parse_arguments(format_args(args, **params))
+    effect.document = effect.load(io.BytesIO(EMPTY_DOCUMENT))
+    return effect
+
+
+def generate_path_tree(pattern, args=None, **params):
+    """ Generate path tree of a pattern, without drawing it
+
+    Parameters are the same as for create_pattern.
+
+    Returns
+    -------
+    path_tree: nested list
+        Paths of the pattern, including vertices and edges
+    """
+    effect = create_pattern(pattern, args, **params)
+    effect.check_simulation_mode()
+    effect.generate_geometry()
+    return effect.get_complete_path_tree()
+
+
+def write_pattern_fold(effect, output):
+    """ Write generated geometry of pattern as a FOLD file, see fold.export_fold
+
+    Coordinates are in user units of the document, millimeters for the empty document.
+    """
+    tolerance = effect.options.vertex_tolerance * effect.calc_unit_factor()
+    export_fold(effect.get_complete_path_tree(), output, tolerance, unit='mm', title=effect.options.pattern)
+
+
+def generate_fold(pattern, output, args=None, **params):
+    """ Generate pattern and write it as a FOLD file, without drawing it
+
+    Parameters
+    ----------
+    pattern: str
+        Name of the pattern, one of PATTERNS
+    output: str or text file
+        Filename or stream to write to
+    args, params:
+        See create_pattern
+    """
+    effect = create_pattern(pattern, args, **params)
+    effect.check_simulation_mode()
+    effect.generate_geometry()
+    write_pattern_fold(effect, output)
+
+
+def generate_svg(pattern, args=None, **params):
+    """ Generate pattern and draw it to an empty document
+
+    Parameters are the same as for create_pattern.
+
+    Returns
+    -------
+    svg: bytes
+        Serialized SVG document
+    """
+    effect = create_pattern(pattern, args, **params)
+    effect.effect()
+    return effect.svg.tostring()
+
+
+def expand_grid(grid):
+    """ Get all combinations of parameter values
+
+    Parameters
+    ----------
+    grid: dict
+        Maps each parameter name to the list of its values
+
+    Returns
+    -------
+    variants: list of dict
+        One dict of parameters per point of the grid, last parameter varying fastest
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*[grid[name] for name in names])]
+
+
+def run_variant(job):
+    """ Generate a single variant of a sweep and write it to its own file
+
+    Parameters
+    ----------
+    job: tuple
+        (pattern, args, params, output_path, output_format), see run_sweep
+
+    Returns
+    -------
+    result: dict
+        Parameters, output path and timings in seconds of the variant. If generation
+        failed, 'error' contains the exception instead, SystemExit for invalid parameters.
+    """
+    pattern, args, params, output_path, output_format = job
+    result = {'params': params, 'output': output_path}
+    start = time.perf_counter()
+    try:
+        effect = create_pattern(pattern, args, **params)
+        effect.check_simulation_mode()
+        effect.check_bool_only()
+        effect.create_styles_dict()
+        effect.generate_geometry()
+        result['generate_time'] = time.perf_counter() - start
+
+        if output_format == 'fold':
+            write_pattern_fold(effect, output_path)
+        else:
+            if output_format == 'svg':
+                effect.draw()
+                data = effect.svg.tostring()
+            else:
+                data = pickle.dumps(effect.get_complete_path_tree(), protocol=pickle.HIGHEST_PROTOCOL)
+            with open(output_path, 'wb') as output:
+                output.write(data)
+    except (Exception, SystemExit) as error:
+        # a failing variant must not stop the whole sweep, including invalid values rejected by argparse
+        result['error'] = repr(error)
+    result['total_time'] = time.perf_counter() - start
+    return result
+
+
+def run_sweep(pattern, grid, output_dir, args=None, output_format='svg', max_workers=None, chunksize=None,
+              callback=None):
+    """ Generate every variant of a parameter grid in a process pool
+
+    Parameters
+    ----------
+    pattern: str
+        Name of the pattern, one of PATTERNS
+    grid: dict
+        Maps each parameter name to the list of its values, see expand_grid
+    output_dir: str
+        Directory where each variant is written to its own file, named after the pattern
+        and the index of the variant
+    args: list of str or None
+        Command line arguments shared by all variants
+    output_format: str
+        'svg' to draw each variant, 'fold' to write its crease pattern as a FOLD file,
+        or 'pickle' to write its path tree without drawing it
+    max_workers: int or None
+        Number of processes, all cores by default
+    chunksize: int or None
+        Number of variants sent to a process at once. By default, variants are split
+        in about four chunks per process, to balance load while limiting overhead
+    callback: callable or None
+        Called with the result of each variant as soon as it is available
+
+    Returns
+    -------
+    results: list of dict
+        Result of each variant, in grid order, see run_variant
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("output_format must be one of {}, not {!r}".format(OUTPUT_FORMATS, output_format))
+    os.makedirs(output_dir, exist_ok=True)
+
+    variants = expand_grid(grid)
+    jobs = [(pattern, args, params, os.path.join(output_dir, '{}_{:05d}.{}'.format(pattern, i, output_format)),
+             output_format) for i, params in enumerate(variants)]
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (4 * max_workers))
+
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for result in executor.map(run_variant, jobs, chunksize=chunksize):
+            results.append(result)
+            if callback is not None:
+                callback(result)
+    return results
+
+
+def parse_grid(grid_args):
+    """ Get grid dict from command line values such as 'sides=6,7,8' """
+    grid = {}
+    for grid_arg in grid_args:
+        name, sep, values = grid_arg.partition('=')
+        if not sep or not values:
+            raise ValueError('Grid parameters must be given as name=value1,value2,..., not {!r}'.format(grid_arg))
+        grid[name.lstrip('-')] = values.split(',')
+    return grid
+
+
+def main(argv=None):
+    """ Command line entry point """
+    parser = argparse.ArgumentParser(prog='python OrigamiPatterns/generate.py', description='Generate origami patterns without Inkscape')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser(
+        'generate', help='generate a pattern',
+        description='Generate a pattern. Other arguments are passed to the pattern, e.g. --lines=4')
+    generate_parser.add_argument('pattern', choices=sorted(PATTERNS))
+    generate_parser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    generate_parser.add_argument('-f', '--format', choices=('svg', 'fold'), default='svg',
+                                 help='write drawn SVG, or FOLD crease pattern')
+
+    sweep_parser = subparsers.add_parser(
+        'sweep', help='generate all variants of a parameter grid in parallel',
+        description='Generate every combination of the grid values, each one to its own file. '
+                    'Other arguments are passed to all variants, e.g. --measure_type=a')
+    sweep_parser.add_argument('pattern', choices=sorted(PATTERNS))
+    sweep_parser.add_argument('--grid', action='append', default=[], metavar='NAME=V1,V2,...',
+                              help='values of a parameter, can be repeated')
+    sweep_parser.add_argument('-o', '--output', default='.', help='output directory (default: current)')
+    sweep_parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='svg',
+                              help='write drawn SVG, FOLD crease pattern, or pickled path tree')
+    sweep_parser.add_argument('-j', '--jobs', type=int, default=None, help='number of processes (default: all cores)')
+    sweep_parser.add_argument('--chunksize', type=int, default=None, help='variants sent to a process at once')
+
+    options, pattern_args = parser.parse_known_args(argv)
+
+    if options.command == 'generate' and options.format == 'fold':
+        generate_fold(options.pattern, sys.stdout if options.output == '-' else options.output, pattern_args)
+
+    elif options.command == 'generate':
+        effect = create_pattern(options.pattern, pattern_args)
+        effect.effect()
+        with effect.profiler.stage('serialize'):
+            svg = effect.svg.tostring()
+        effect.profiler.close()
+        if options.output == '-':
+            sys.stdout.buffer.write(svg)
+        else:
+            with open(options.output, 'wb') as output:
+                output.write(svg)
+        overlaps = effect.postprocess_report.get('overlaps')
+        if overlaps:
+            sys.stderr.write('overlapping segments: {} -> {}\n'.format(overlaps['segments'], overlaps['merged']))
+        chaining = effect.postprocess_report.get('chaining')
+        if chaining:
+            sys.stderr.write('strokes: {} -> {}\n'.format(chaining['before'], chaining['after']))
+        for style, travel in effect.postprocess_report.get('travel', {}).items():
+            sys.stderr.write('travel {}: {:.3f} -> {:.3f}\n'.format(style, travel['before'], travel['after']))
+
+    elif options.command == 'sweep':
+        def report(result):
+            timing = 'error: ' + result['error'] if 'error' in result else \
+                'generate {:.3f}s, total {:.3f}s'.format(result['generate_time'], result['total_time'])
+            sys.stderr.write('{} {}\n'.format(result['output'], timing))
+
+        start = time.perf_counter()
+        results = run_sweep(options.pattern, parse_grid(options.grid), options.output, pattern_args,
+                            options.format, options.jobs, options.chunksize, report)
+        with open(os.path.join(options.output, 'sweep_report.json'), 'w') as output:
+            json.dump(results, output, indent=1)
+        failed = sum('error' in result for result in results)
+        sys.stderr.write('{} variants in {:.3f}s, {} failed\n'.format(len(results), time.perf_counter() - start, failed))
+        return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
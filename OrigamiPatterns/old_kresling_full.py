@@ -16,8 +16,8 @@ class Kresling_Full(Kresling):
         Kresling.__init__(self)  # Must be called in order to parse common options
 
         self.add_argument('--measure_value', type=float, default=10.0)
-        self.add_argument('--measure_type', type=str, default=60)
-        self.add_argument('--parameter_type', type=str, default=60)
+        self.add_argument('--measure_type', type=str, default='a')
+        self.add_argument('--parameter_type', type=str, default='angle_ratio')
         self.add_argument('--radial_ratio', type=float, default=0.5)
         self.add_argument('--angle_ratio', type=float, default=0.5)
         self.add_argument('--lambdatheta', type=float, default=45)
@@ -1,6 +1,8 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
+import re
 from math import sin, cos, pi, sqrt
+import numpy as np
 import inkex
 
 def format_style(style):
@@ -8,13 +10,159 @@ def format_style(style):
     """
     return str(inkex.Style(style))
 
+
+STYLE_ELEMENT_ID = 'origami-patterns-styles'
+
+
+def create_style_classes(svg, styles_dict):
+    """ Write a CSS class for each enabled style to the <style> element of the document
+
+    Classes are named 'crease-' followed by the style key. If a class of the same name
+    was already defined with a different declaration (e.g. by a previous run with other
+    colors), a numbered suffix is added to the new class name.
+
+    Parameters
+    ----------
+    svg: inkex.elements._svg.SvgDocumentElement
+    styles_dict: dict
+        Contains all styles to define
+
+    Returns
+    -------
+    style_attributes: dict
+        Maps each style key to the ('class', name) attribute of its elements
+    """
+    elem = svg.getElementById(STYLE_ELEMENT_ID)
+    if elem is None:
+        elem = svg.defs.add(inkex.StyleElement())
+        elem.set('id', STYLE_ELEMENT_ID)
+        elem.set('type', 'text/css')
+    text = elem.text or ''
+    rules = dict(re.findall(r'\.([\w-]+)\s*\{([^}]*)\}', text))
+
+    style_attributes = {}
+    for style, definition in styles_dict.items():
+        if not definition['isEnabled']:
+            continue
+        declaration = format_style(definition)
+        name = 'crease-' + style
+        i = 1
+        while rules.get(name, declaration) != declaration:
+            name = 'crease-{}-{}'.format(style, i)
+            i += 1
+        if name not in rules:
+            rules[name] = declaration
+            text = text + '.{}{{{}}}\n'.format(name, declaration)
+        style_attributes[style] = ('class', name)
+    elem.text = text
+    return style_attributes
+
+
+def format_number(value, precision=None):
+    """ Get shortest string representing value, rounded to precision decimals if given
+    """
+    if precision is not None:
+        value = round(value, precision)
+    text = repr(value + 0.)  # avoid '-0.0'
+    if text.endswith('.0'):
+        text = text[:-2]
+    return text
+
+
+def format_path_data(coords, closed=False, precision=None, relative=False):
+    """ Get the 'd' attribute of a polyline in a single pass over its points
+
+    Parameters
+    ----------
+    coords: (N, 2) array
+    closed: bool
+        If true, the last point is connected to the first one
+    precision: int or None
+        Number of decimals kept in coordinates. If None, full precision is used
+    relative: bool
+        If true, only the first point is absolute, and other ones are given
+        relatively to the previous point, using 'h' and 'v' for horizontal and
+        vertical segments
+
+    Returns
+    -------
+    d: str
+    """
+    coords = np.asarray(coords, dtype=float)
+    if closed:
+        coords = np.vstack((coords, coords[:1]))
+    if precision is not None:
+        coords = np.round(coords, precision)
+    points = coords.tolist()
+
+    if not relative:
+        numbers = [format_number(x) + ',' + format_number(y) for x, y in points]
+        d = 'M' + ' L'.join(numbers)
+    else:
+        deltas = np.diff(coords, axis=0)
+        if precision is not None:
+            # rounded again, as differences of rounded values are not always exact
+            deltas = np.round(deltas, precision)
+        commands = ['M' + format_number(points[0][0]) + ',' + format_number(points[0][1])]
+        for dx, dy in deltas.tolist():
+            if dy == 0:
+                commands.append('h' + format_number(dx))
+            elif dx == 0:
+                commands.append('v' + format_number(dy))
+            else:
+                commands.append('l' + format_number(dx) + ',' + format_number(dy))
+        d = ' '.join(commands)
+
+    if closed:
+        d = d + (' z' if relative else ' Z')
+    return d
+
+
+class PointList(list):
+    """ List of point tuples returned by Path.points
+
+    Behaves as a regular list, but in-place modifications (e.g. points.reverse())
+    invalidate the array representation of the Path that owns it, so that the
+    array is rebuilt from the list the next time it is needed.
+    """
+    __slots__ = ('owner',)
+
+    def __init__(self, owner, points):
+        list.__init__(self, points)
+        self.owner = owner
+
+
+def _invalidate_owner(name):
+    """ Wrap list method so that calling it invalidates the owner's coordinates """
+    method = getattr(list, name)
+
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        if self.owner._points is self:
+            self.owner._coords = None
+        return result
+
+    wrapper.__name__ = name
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
+for _name in ('__setitem__', '__delitem__', '__iadd__', '__imul__', 'append', 'extend',
+              'insert', 'pop', 'remove', 'reverse', 'sort', 'clear'):
+    setattr(PointList, _name, _invalidate_owner(_name))
+
 class Path:
     """ Class that defines an svg stroke to be drawn in Inkscape
 
     Attributes
     ---------
-    points: tuple or list of tuples
-        Points defining stroke lines.
+    coords: numpy.ndarray
+        (N, 2) float64 array of points defining stroke lines.
+    points: list of tuples
+        Points defining stroke lines. Lazily created view of coords, kept for
+        compatibility; modifying it in place also updates coords.
+    type: str
+        'linear' for strokes, 'circular' when a single point is given.
     style: str
         Single character defining style of stroke. Default values are:
         'm' for mountain creases
@@ -39,6 +187,9 @@ class Path:
     invert(self)
         Inverts path
 
+    copy(self, coords=None)
+        Return new Path with same attributes, optionally with new coordinates
+
     Overloaded Operators
     --------------------
 
@@ -53,11 +204,22 @@ class Path:
     Static Methods
     --------------
 
-    draw_paths_recursively(path_tree, group, styles_dict)
+    draw_paths_recursively(path_tree, group, styles_dict, symbols=None, compact=False, precision=None, relative=False,
+                           css_classes=False)
         Draws strokes defined on "path_tree" to "group".
         Styles dict maps style of path_tree element to the definition of the style. Ex.:
         if path_tree[i].style = 'm', styles_dict must have an element 'm'.
 
+    draw_instance(instance, group, styles_dict, symbols, buckets=None, **kwargs)
+        Draws a PathInstance as a <use> element referencing a <symbol> of its template.
+
+    draw_element(group, coords, style, styles_dict, closed=False, fold_angle=180., radius=0.1, buckets=None,
+                 precision=None, relative=False, style_attributes=None)
+        Draws a single stroke, or a circle if only one point is given.
+
+    get_style_attribute(style, styles_dict, style_attributes=None)
+        Returns the cached style or class attribute for elements of a given style.
+
     generate_hgrid(cls, xlims, ylims, nb_of_divisions, style, include_edge=False)
         Generate list of Path instances, in which each Path is a stroke defining a
         horizontal grid dividing the space xlims * ylims nb_of_divisions times.
@@ -75,7 +237,7 @@ class Path:
         Path instance with new reflected points
 
     list_reflect(cls, paths, p1, p2)
-        Generate list of new Path instances, rotation each path by transform
+        Generate list of new Path instances, reflecting each path on line defined by two points
 
     list_rotate(cls, paths, theta, translation=(0, 0))
         Generate list of new Path instances, rotation each path by transform
@@ -86,6 +248,10 @@ class Path:
     list_mul(cls, paths, transf)
         Generate list of new Path instances, multiplying a different tuple for each list
 
+    transform(cls, paths, matrix)
+        Apply affine matrix, or stack of N matrices, to all points of a path tree at once.
+        Matrices are created with translation, rotation, reflection and multiplication.
+
     list_simplify(cls, paths)
         Gets complicated path-tree list and converts it into
         a simple list.
@@ -95,15 +261,26 @@ class Path:
 
     debug_points(cls, paths)
         Plots points of path tree in drawing order.
+
+    iter_paths(cls, paths)
+        Iterate over Path instances of path tree in drawing order.
+
+    get_coords(cls, paths)
+        Get (N, 2) array of points of path tree in drawing order.
+
+    iter_nodes(cls, paths, materialize=True)
+        Iterate over Path, PathBatch and PathInstance nodes of path tree in drawing order.
     """
 
+    __slots__ = ('_coords', '_points', 'type', 'style', 'closed', 'radius', 'fold_angle')
+
     def __init__(self, points, style, closed=False, invert=False, radius=0.1, fold_angle = 180.0):
         """ Constructor
 
         Parameters
         ----------
 
-        points: list of 2D tuples
+        points: list of 2D tuples or (N, 2) array
             stroke will connect all points
         style: str
             Single character defining style of stroke. For use with the OrigamiPatterns class
@@ -116,88 +293,278 @@ class Path:
         invert: bool
             if true, stroke will start at the last point and go all the way to the first one
         """
-        if isinstance(points, list) and len(points) != 1:
-            self.type = 'linear'
-            if invert:
-                self.points = points[::-1]
-            else:
-                self.points = points
+        if isinstance(points, tuple) and len(points) == 2:
+            points = [points]
+        elif not isinstance(points, (list, np.ndarray)):
+            raise TypeError('Points must be tuple of length 2 (for a circle)'
+                            'or a list of tuples of length 2 each')
 
-        elif (isinstance(points, list) and len(points) == 1):
-            self.type = 'circular'
-            self.points = points
-            self.radius = radius
+        coords = np.array(points, dtype=float)
+        if coords.ndim == 1 and coords.size == 2:
+            coords = coords.reshape(1, 2)
+        elif coords.ndim != 2 or coords.shape[1] != 2:
+            raise TypeError('Points must be tuple of length 2 (for a circle)'
+                            'or a list of tuples of length 2 each')
 
-        elif (isinstance(points, tuple) and len(points) == 2):
+        if len(coords) == 1:
             self.type = 'circular'
-            self.points = [points]
-            self.radius = radius
-
         else:
-            raise TypeError('Points must be tuple of length 2 (for a circle)'
-                            'or a list of tuples of length 2 each')
+            self.type = 'linear'
+            if invert:
+                coords = coords[::-1]
 
+        self._coords = coords
+        self._points = None
+        self.radius = radius
         self.fold_angle = max(min(fold_angle, 180.), 0.)
         self.style = style
         self.closed = closed
 
+    @property
+    def coords(self):
+        """ (N, 2) array of points, rebuilt if the points list was modified in place """
+        if self._coords is None:
+            self._coords = np.array(self._points, dtype=float).reshape(-1, 2)
+        return self._coords
+
+    @coords.setter
+    def coords(self, coords):
+        self._coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        self._points = None
+
+    @property
+    def points(self):
+        """ List of point tuples, lazily created from coords """
+        if self._points is None:
+            self._points = PointList(self, map(tuple, self._coords.tolist()))
+        return self._points
+
+    @points.setter
+    def points(self, points):
+        self.coords = points
+
+    def __getstate__(self):
+        """ Pickle coordinates only, the points list is recreated when needed """
+        return (self.coords, self.type, self.style, self.closed, self.radius, self.fold_angle)
+
+    def __setstate__(self, state):
+        self._coords, self.type, self.style, self.closed, self.radius, self.fold_angle = state
+        self._points = None
+
+    def copy(self, coords=None):
+        """ Return new Path with same attributes, optionally with new coordinates """
+        if coords is None:
+            coords = self.coords
+        path = object.__new__(type(self))
+        path._coords = coords
+        path._points = None
+        path.type = self.type
+        path.style = self.style
+        path.closed = self.closed
+        path.radius = self.radius
+        path.fold_angle = self.fold_angle
+        return path
+
     def invert(self):
         """ Inverts path """
-        self.points = self.points[::-1]
+        self.coords = self.coords[::-1]
 
     @staticmethod
-    def draw_paths_recursively(path_tree, group, styles_dict):
+    def draw_paths_recursively(path_tree, group, styles_dict, symbols=None, compact=False,
+                               precision=None, relative=False, css_classes=False):
         """ Draw list of Path instances recursively
 
         Parameters
         ----------
         path_tree: nested list
-            List of Path instances
+            List of Path instances, PathBatch and PathInstance instances are also accepted as nodes
         group: inkex.elements._groups.Group
         styles_dict: dict
             Contains all styles for path_tree
+        symbols: dict or None
+            If None, PathInstance nodes are flattened to plain paths. Otherwise, the template
+            of each PathInstance is drawn only once, as a <symbol> in the document's <defs>,
+            and every instance is drawn as a <use> element referencing it. The dict caches
+            the symbol created for each template, and can be shared between calls.
+        compact: bool
+            If true, all strokes of a group sharing the same style and fold angle are drawn
+            as a single <path> element with one subpath per stroke, keeping their order.
+        precision: int or None
+            Number of decimals written in path data, see format_path_data
+        relative: bool
+            If true, path data is written with relative commands, see format_path_data
+        css_classes: bool
+            If true, styles are defined once as CSS classes in a <style> element, and
+            elements are given a class attribute instead of an inline style
+        """
+        buckets = {} if compact else None
+        style_attributes = create_style_classes(group.root, styles_dict) if css_classes else {}
+        Path._draw_tree(path_tree, group, styles_dict, symbols, buckets,
+                        precision=precision, relative=relative, style_attributes=style_attributes)
+        Path._merge_buckets(buckets)
+
+    @staticmethod
+    def get_style_attribute(style, styles_dict, style_attributes=None):
+        """ Get name and value of the attribute setting style to an element
+
+        Parameters
+        ----------
+        style: str
+        styles_dict: dict
+            Contains definition of style
+        style_attributes: dict or None
+            Cache of attributes already serialized, updated if style is not in it yet
+
+        Returns
+        -------
+        attribute: tuple
+            ('style', inline style) or ('class', CSS class name)
         """
+        if style_attributes is None:
+            return 'style', format_style(styles_dict[style])
+        if style not in style_attributes:
+            style_attributes[style] = ('style', format_style(styles_dict[style]))
+        return style_attributes[style]
+
+    @staticmethod
+    def _draw_tree(path_tree, group, styles_dict, symbols, buckets, **kwargs):
+        """ Recursive part of draw_paths_recursively, kwargs are passed to draw_element """
         for subpath in path_tree:
             if isinstance(subpath, list):
                 if len(subpath) == 1:
                     subgroup = group
                 else:
                     subgroup = group.add(inkex.Group())
-                Path.draw_paths_recursively(subpath, subgroup, styles_dict)
+                Path._draw_tree(subpath, subgroup, styles_dict, symbols, buckets, **kwargs)
+
+            elif isinstance(subpath, PathBatch):
+                subpath._draw(group, styles_dict, buckets, **kwargs)
+
+            elif isinstance(subpath, PathInstance) and symbols is None:
+                Path._draw_tree([subpath.materialize()], group, styles_dict, symbols, buckets, **kwargs)
+
+            elif isinstance(subpath, PathInstance):
+                Path.draw_instance(subpath, group, styles_dict, symbols, buckets, **kwargs)
 
             else:
-                if subpath.style != 'n' and styles_dict[subpath.style]['isEnabled']:
-                    if subpath.type == 'linear':
-
-                        points = subpath.points
-                        path = 'M{},{} '.format(*points[0])
-                        for i in range(1, len(points)):
-                            path = path + 'L{},{} '.format(*points[i])
-                        if subpath.closed:
-                            path = path + 'L{},{} Z'.format(*points[0])
-
-                        elem = group.add(inkex.PathElement())
-                        elem.set('style', format_style(styles_dict[subpath.style]))
-                        elem.set('d', path)
-                        elem.set('opacity', subpath.fold_angle/180)
-                    else:
-                        elem = group.add(inkex.Circle())
-                        elem.set('style', format_style(styles_dict[subpath.style]))
-                        elem.set('cx', subpath.points[0][0])
-                        elem.set('cy', subpath.points[0][1])
-                        elem.set('r', subpath.radius)
-                        elem.set('opacity', subpath.fold_angle/180)
+                Path.draw_element(group, subpath.coords, subpath.style, styles_dict,
+                                  subpath.closed, subpath.fold_angle, subpath.radius, buckets, **kwargs)
+
+    @staticmethod
+    def _merge_buckets(buckets):
+        """ Set path data of elements created by draw_element in compact mode """
+        if buckets is None:
+            return
+        for elem, path_data in buckets.values():
+            elem.set('d', ' '.join(path_data))
+        buckets.clear()
+
+    @staticmethod
+    def draw_instance(instance, group, styles_dict, symbols, buckets=None, **kwargs):
+        """ Draw PathInstance as a <use> element, creating the <symbol> of its template if needed
+
+        Parameters
+        ----------
+        instance: PathInstance
+        group: inkex.elements._groups.Group
+        styles_dict: dict
+        symbols: dict
+            Maps id of each template to the symbol already created for it
+        buckets: dict or None
+            Strokes merged so far in compact mode, see draw_element
+        kwargs:
+            Passed to draw_element when drawing the template
+
+        Returns
+        -------
+        elem: inkex.Use
+        """
+        template = instance.template
+        if id(template) not in symbols:
+            svg = group.root
+            symbol = svg.defs.add(inkex.Symbol())
+            # content outside of the symbol's viewport must not be clipped
+            symbol.set('style', 'overflow:visible')
+            symbol_id = 'cell{}'.format(len(symbols))
+            while svg.getElementById(symbol_id) is not None:
+                symbol_id = symbol_id + '_'
+            symbol.set('id', symbol_id)
+            Path._draw_tree(template if isinstance(template, list) else [template],
+                            symbol, styles_dict, symbols, buckets, **kwargs)
+            # keep reference to template, so that its id is not reused while cached
+            symbols[id(template)] = (symbol, template)
+
+        elem = group.add(inkex.Use())
+        elem.href = symbols[id(template)][0]
+        m = instance.matrix
+        elem.set('transform', inkex.Transform((m[0, 0], m[1, 0], m[0, 1], m[1, 1], m[0, 2], m[1, 2])))
+        return elem
+
+    @staticmethod
+    def draw_element(group, coords, style, styles_dict, closed=False, fold_angle=180., radius=0.1,
+                     buckets=None, precision=None, relative=False, style_attributes=None):
+        """ Draw a single stroke, or a circle if only one point is given
+
+        Parameters
+        ----------
+        group: inkex.elements._groups.Group
+        coords: (N, 2) array
+        style: str
+        styles_dict: dict
+            Contains definition of style
+        closed: bool
+        fold_angle: float
+        radius: float
+            Used only for circles
+        buckets: dict or None
+            If given, strokes are merged to the element previously created in the same
+            group for the same style and fold angle. Its path data is only set later,
+            by _merge_buckets.
+        precision: int or None
+            Number of decimals written in path data and circle attributes
+        relative: bool
+            If true, path data is written with relative commands
+        style_attributes: dict or None
+            Cache of style attributes, see get_style_attribute
+
+        Returns
+        -------
+        elem: inkex element or None, if style is not drawn
+        """
+        if style == 'n' or not styles_dict[style]['isEnabled']:
+            return None
+
+        if len(coords) != 1:
+            path = format_path_data(coords, closed, precision, relative)
+
+            if buckets is not None:
+                key = (group, style, fold_angle)
+                if key in buckets:
+                    elem, path_data = buckets[key]
+                    path_data.append(path)
+                    return elem
+
+            elem = group.add(inkex.PathElement())
+            elem.set(*Path.get_style_attribute(style, styles_dict, style_attributes))
+            elem.set('d', path)
+            elem.set('opacity', fold_angle/180)
+
+            if buckets is not None:
+                buckets[key] = (elem, [path])
+        else:
+            elem = group.add(inkex.Circle())
+            elem.set(*Path.get_style_attribute(style, styles_dict, style_attributes))
+            elem.set('cx', format_number(float(coords[0][0]), precision))
+            elem.set('cy', format_number(float(coords[0][1]), precision))
+            elem.set('r', format_number(float(radius), precision))
+            elem.set('opacity', fold_angle/180)
+        return elem
 
     @classmethod
     def get_average_point(cls, paths):
         """ Get average position of points in paths """
-        points = cls.get_points(paths)
-        n = len(points)
-        x, y = 0, 0
-        for p in points:
-            x += p[0]
-            y += p[1]
-        return (x/n, y/n)
+        x, y = cls.get_coords(paths).mean(axis=0)
+        return (float(x), float(y))
 
     @classmethod
     def get_square_points(cls, width, height, center = None):
@@ -351,27 +718,151 @@ class Path:
         defined by the tuple
         """
         if isinstance(offsets, list):
-            if len(offsets) != 1 or len(offsets) != len(self.points):
+            if len(offsets) != 1 and len(offsets) != len(self.coords):
                 raise TypeError("Paths can only be added by a tuple of a list of N tuples, "
                                 "where N is the same number of points")
 
         elif not isinstance(offsets, tuple):
             raise TypeError("Paths can only be added by tuples")
-        else:
-            offsets = [offsets] * len(self.points)
 
-        # if isinstance(self.points, list):
-        points_new = []
-        for point, offset in zip(self.points, offsets):
-            points_new.append((point[0]+offset[0],
-                               point[1]+offset[1]))
+        return self.copy(self.coords + np.array(offsets, dtype=float))
+
+    @staticmethod
+    def translation(offsets):
+        """ Affine matrix translating by offsets
+
+        Parameters
+        ----------
+        offsets: tuple or (N, 2) array
+
+        Returns
+        -------
+        matrix: (3, 3) array, or (N, 3, 3) array if N offsets are given
+        """
+        offsets = np.asarray(offsets, dtype=float)
+        if offsets.size == 0:
+            offsets = offsets.reshape(0, 2)  # empty list of offsets
+        matrix = np.zeros(offsets.shape[:-1] + (3, 3))
+        matrix[..., 0, 0] = matrix[..., 1, 1] = matrix[..., 2, 2] = 1
+        matrix[..., :2, 2] = offsets
+        return matrix
 
-        if self.type == 'circular':
-            radius = self.radius
+    @staticmethod
+    def rotation(theta, center=(0, 0), scale=1.):
+        """ Affine matrix rotating by theta around center, and optionally scaling
+
+        Parameters
+        ----------
+        theta: float or (N,) array
+            angle of rotation, in radians
+        center: tuple or list 2
+            axis of rotation
+        scale: float or (N,) array
+
+        Returns
+        -------
+        matrix: (3, 3) array, or (N, 3, 3) array if N angles are given
+        """
+        theta, scale = np.broadcast_arrays(np.asarray(theta, dtype=float), np.asarray(scale, dtype=float))
+        center = np.asarray(center, dtype=float)
+        u = scale * np.cos(theta)
+        v = scale * np.sin(theta)
+        matrix = np.zeros(theta.shape + (3, 3))
+        matrix[..., 0, 0] = u
+        matrix[..., 0, 1] = -v
+        matrix[..., 1, 0] = v
+        matrix[..., 1, 1] = u
+        matrix[..., 0, 2] = center[0] - u * center[0] + v * center[1]
+        matrix[..., 1, 2] = center[1] - v * center[0] - u * center[1]
+        matrix[..., 2, 2] = 1
+        return matrix
+
+    @staticmethod
+    def reflection(p1, p2):
+        """ Affine matrix reflecting on line defined by two points
+
+        Parameters
+        ----------
+        p1: tuple or list of size 2
+        p2: tuple or list of size 2
+
+        Returns
+        -------
+        matrix: (3, 3) array
+        """
+        p1 = np.asarray(p1, dtype=float)
+        d = np.asarray(p2, dtype=float) - p1
+        norm = d[0] ** 2 + d[1] ** 2
+        if norm == 0:
+            raise ValueError("Duplicate points don't define a line")
+        linear = 2 * np.outer(d, d) / norm - np.eye(2)
+        matrix = np.eye(3)
+        matrix[:2, :2] = linear
+        matrix[:2, 2] = p1 - linear @ p1
+        return matrix
+
+    @classmethod
+    def multiplication(cls, transform):
+        """ Affine matrix equivalent to multiplying a Path by transform, see __mul__ """
+        if isinstance(transform, (int, float)):
+            return cls.rotation(0, scale=transform)
+        elif isinstance(transform, (list, tuple)) and len(transform) == 2:
+            return cls.rotation(transform[1], scale=transform[0])
+        elif isinstance(transform, (list, tuple)) and len(transform) == 4:
+            return cls.rotation(transform[1], transform[2:], scale=transform[0])
+        raise TypeError('Paths can only be multiplied by a number or a tuple/list of length 2 or 4')
+
+    @classmethod
+    def transform(cls, paths, matrix):
+        """ Apply affine transformation to all points of a path tree in a single operation
+
+        Parameters
+        ----------
+        paths: Path, PathBatch or nested list
+        matrix: (3, 3) or (N, 3, 3) array
+            affine matrix (see translation, rotation and reflection), or stack of
+            N matrices to create N transformed copies of paths at once
+
+        Returns
+        -------
+        paths_new: same structure as paths, or list of N copies of it
+        """
+        matrix = np.asarray(matrix, dtype=float)
+        coords = [node.coords for node in cls.iter_nodes(paths, materialize=False)
+                  if not isinstance(node, PathInstance)]
+        coords = np.concatenate(coords) if coords else np.empty((0, 2))
+        if np.all(matrix[..., :2, :2] == np.eye(2)):
+            coords_new = coords + matrix[..., np.newaxis, :2, 2]
         else:
-            radius = 0.2
+            # explicit products instead of matmul, so that results don't depend on BLAS
+            x, y = coords[:, 0], coords[:, 1]
+            m = matrix[..., np.newaxis]
+            coords_new = np.stack((m[..., 0, 0, :] * x + m[..., 0, 1, :] * y + m[..., 0, 2, :],
+                                   m[..., 1, 0, :] * x + m[..., 1, 1, :] * y + m[..., 1, 2, :]), axis=-1)
+
+        if matrix.ndim == 2:
+            return cls._rebuild_tree(paths, coords_new, matrix)
+        return [cls._rebuild_tree(paths, coords, m) for coords, m in zip(coords_new, matrix)]
+
+    @classmethod
+    def _rebuild_tree(cls, paths, coords, matrix):
+        """ Copy path tree, replacing its points, in drawing order, by coords,
+        and composing matrix with the transform of its instances
+        """
+        start = 0
+
+        def rebuild(node):
+            nonlocal start
+            if isinstance(node, list):
+                return [rebuild(sub_node) for sub_node in node]
+            if isinstance(node, PathInstance):
+                return node.transformed(matrix)
+            end = start + len(node.coords)
+            node_new = node.copy(coords[start:end])
+            start = end
+            return node_new
 
-        return Path(points_new, self.style, self.closed, radius=radius, fold_angle=self.fold_angle)
+        return rebuild(paths)
 
     @classmethod
     def list_add(cls, paths, offsets):
@@ -389,35 +880,26 @@ class Path:
         paths_new: list
             list of N Path instances
         """
-        if isinstance(paths, Path) and isinstance(offsets, tuple):
-            paths = [paths]
-            offsets = [offsets]
+        if not isinstance(paths, list) and isinstance(offsets, tuple):
+            return [cls.transform(paths, cls.translation(offsets))]
 
         elif isinstance(paths, list) and isinstance(offsets, tuple):
-            offsets = [offsets] * len(paths)
+            return cls.transform(paths, cls.translation(offsets))
 
-        elif isinstance(paths, Path) and isinstance(offsets, list):
-            paths = [paths] * len(offsets)
+        elif not isinstance(paths, list) and isinstance(offsets, list):
+            return cls.transform(paths, cls.translation(offsets))
 
         elif isinstance(paths, list) and isinstance(offsets, list):
             if len(paths) == 1:
-                paths = [paths[0]] * len(offsets)
+                return cls.transform(paths[0], cls.translation(offsets))
             elif len(offsets) == 1:
-                offsets = [offsets[0]] * len(paths)
+                return cls.transform(paths, cls.translation(offsets[0]))
             elif len(offsets) != len(paths):
                 raise TypeError("List of paths and list of tuples must have same length. {} paths and {} offsets "
                                 " where given".format(len(paths), len(offsets)))
-            else:
-                pass
-
-        paths_new = []
-        for path, offset in zip(paths, offsets):
-            if isinstance(path, Path):
-                paths_new.append(path + offset)
-            elif isinstance(path, list):
-                paths_new.append(cls.list_add(path, offset))
 
-        return paths_new
+        matrices = cls.translation(offsets)
+        return [cls.transform(path, matrix) for path, matrix in zip(paths, matrices)]
 
     @classmethod
     def list_mul(cls, paths, offsets):
@@ -428,39 +910,36 @@ class Path:
         paths: Path or list
             list of N Path instances
         offsets: tuple or list
-            list of N tuples
+            list of N tuples, see __mul__
 
         Returns
         -------
         paths_new: list
             list of N Path instances
         """
-        if isinstance(paths, Path) and isinstance(offsets, tuple):
+        if not isinstance(paths, list) and isinstance(offsets, tuple):
             paths = [paths]
             offsets = [offsets]
         elif isinstance(paths, list) and isinstance(offsets, tuple):
-            offsets = [offsets] * len(paths)
-        elif isinstance(paths, Path) and isinstance(offsets, list):
+            return cls.transform(paths, cls.multiplication(offsets))
+        elif not isinstance(paths, list) and isinstance(offsets, list):
             paths = [paths] * len(offsets)
         elif isinstance(paths, list) and isinstance(offsets, list):
             if len(paths) == 1:
                 paths = [paths[0]] * len(offsets)
             elif len(offsets) == 1:
-                offsets = [offsets[0]] * len(paths)
+                return cls.transform(paths, cls.multiplication(offsets[0]))
             elif len(offsets) != len(paths):
                 raise TypeError("List of paths and list of tuples must have same length. {} paths and {} offsets "
                                 " where given".format(len(paths), len(offsets)))
-            else:
-                pass
 
-        paths_new = []
-        for path, offset in zip(paths, offsets):
-            paths_new.append(path*offset)
-
-        return paths_new
+        matrices = np.stack([cls.multiplication(offset) for offset in offsets])
+        if all(path is paths[0] for path in paths):
+            return cls.transform(paths[0], matrices)
+        return [cls.transform(path, matrix) for path, matrix in zip(paths, matrices)]
 
     def break_path(self, lengths, styles = None):
-        if len(self.points) != 2:
+        if len(self.coords) != 2:
             raise ValueError('Path breaking only implemented for straight lines with 2 points')
 
         if styles is None:
@@ -468,20 +947,11 @@ class Path:
         elif len(styles) != len(lengths):
             raise ValueError('Different number of lenghts and styles')
 
-        p0 = self.points[0]
-        p1 = self.points[1]
-        d = (p1[0] - p0[0], p1[1] - p0[1])
-        L = sqrt(d[0] ** 2 + d[1] ** 2)
-        dx = d[0] / L
-        dy = d[1] / L
-        paths = []
-        start = 0
-        p0_ = p0
-        for l, s in zip(lengths, styles):
-            p1_ = (p0_[0] + dx * l, p0_[1] + dy * l)
-            paths.append(Path([p0_, p1_], style = s))
-            p0_ = p1_
-        return paths
+        p0, p1 = self.coords
+        d = p1 - p0
+        d = d / sqrt(d[0] ** 2 + d[1] ** 2)
+        points = np.cumsum(np.vstack((p0, np.outer(lengths, d))), axis=0)
+        return [Path(points[i:i+2], style = s) for i, s in enumerate(styles)]
 
     def __mul__(self, transform):
         """ Multiplication operator overload.
@@ -497,12 +967,8 @@ class Path:
             if tuple length 4, transform[2],transform[3] define a different axis of rotation
                 Example: path * (3, pi, 1, 1)
         """
-        points_new = []
-
         if isinstance(transform, (int, float)):
-            for p in self.points:
-                points_new.append((transform * p[0],
-                                   transform * p[1]))
+            return self.copy(transform * self.coords)
 
         elif isinstance(transform, (list, tuple)):
             if len(transform) == 2:
@@ -516,26 +982,17 @@ class Path:
             else:
                 raise IndexError('Paths can only be multiplied by a number or a tuple/list of length 2 or 4')
 
-            for p in self.points:
-                x, y = p[0]-x_, p[1]-y_
-                points_new.append((x_ + x * u - y * v,
-                                   y_ + x * v + y * u))
+            x = self.coords[:, 0] - x_
+            y = self.coords[:, 1] - y_
+            return self.copy(np.column_stack((x_ + x * u - y * v,
+                                              y_ + x * v + y * u)))
         else:
             raise TypeError('Paths can only be multiplied by a number or a tuple/list of length 2 or 4')
 
-        if self.type == 'circular':
-            radius = self.radius
-        else:
-            radius = 0.2
-
-        return Path(points_new, self.style, self.closed, radius=radius, fold_angle=self.fold_angle)
-
     def shape(self):
         """ Return bounds of path """
-        points = self.points
-        x = [p[0] for p in points]
-        y = [p[1] for p in points]
-        return [min(x), max(x), min(y), max(y)]
+        (x_min, y_min), (x_max, y_max) = self.coords.min(axis=0), self.coords.max(axis=0)
+        return [x_min, x_max, y_min, y_max]
 
     @classmethod
     def list_create_from_points(cls, points, styles, fold_angles = None):
@@ -584,15 +1041,10 @@ class Path:
         """
 
         theta = 2*pi/n
-        paths_new = []
-        for i in range(n):
-            ith_rotation = cls.list_rotate(paths, theta, translation=translation)
-            if isinstance(paths, list):
-                paths_new += ith_rotation
-            else:
-                paths_new.append(ith_rotation)
-        return paths_new
-
+        rotations = cls.transform(paths, cls.rotation(theta * np.arange(1, n + 1), translation))
+        if isinstance(paths, list):
+            return [path for rotation in rotations for path in rotation]
+        return rotations
 
     @classmethod
     def list_rotate(cls, paths, theta, translation=(0, 0)):
@@ -618,19 +1070,12 @@ class Path:
         if not isinstance(paths, list):
             paths = [paths]
 
-        paths_new = []
-        for path in paths:
-            if isinstance(path, Path):
-                paths_new.append(path*(1, theta, translation[0], translation[1]))
-            elif isinstance(path, list):
-                paths_new.append(cls.list_rotate(path, theta, translation))
+        paths_new = cls.transform(paths, cls.rotation(theta, translation))
 
         if len(paths_new) == 1:
             paths_new = paths_new[0]
         return paths_new
 
-    # TODO:
-    # Apparently it's not working properly, must be debugged and tested
     @classmethod
     def reflect(cls, path, p1, p2):
         """ Reflects each point of path on line defined by two points and return new Path instance with new reflected points
@@ -645,34 +1090,11 @@ class Path:
         -------
         path_reflected: Path
         """
+        return cls.transform(path, cls.reflection(p1, p2))
 
-        (x1, y1) = p1
-        (x2, y2) = p2
-
-        if x1 == x2 and y1 == y2:
-            ValueError("Duplicate points don't define a line")
-        elif x1 == x2:
-            t_x = [-1, 0, 2*x1, 1]
-            t_y = [0, 1, 0, 1]
-        else:
-            m = (y2 - y1)/(x2 - x1)
-            t = y1 - m*x1
-            t_x = [1 - m**2, 2*m, -2*m*t, m**2 + 1]
-            t_y = [2*m, m**2 - 1, +2*t, m**2 + 1]
-
-        points_new = []
-        for p in path.points:
-            x_ = (t_x[0]*p[0] + t_x[1]*p[1] + t_x[2]) / t_x[3]
-            y_ = (t_y[0]*p[0] + t_y[1]*p[1] + t_y[2]) / t_y[3]
-            points_new.append((x_, y_))
-
-        return Path(points_new, path.style, path.closed, fold_angle=path.fold_angle)
-
-    # TODO:
-    # Apparently it's not working properly, must be debugged and tested
     @classmethod
     def list_reflect(cls, paths, p1, p2):
-        """ Generate list of new Path instances, rotation each path by transform
+        """ Generate list of new Path instances, reflecting each path on line defined by two points
 
         Parameters
         ----------
@@ -687,14 +1109,10 @@ class Path:
             list of N Path instances
         """
 
-        if isinstance(paths, Path):
+        if not isinstance(paths, list):
             paths = [paths]
 
-        paths_new = []
-        for path in paths:
-            paths_new.append(Path.reflect(path, p1, p2))
-
-        return paths_new
+        return cls.transform(paths, cls.reflection(p1, p2))
 
     @classmethod
     def list_simplify(cls, paths):
@@ -709,13 +1127,7 @@ class Path:
         if isinstance(paths, Path):
             return paths
 
-        simple_list = []
-        for i in range(len(paths)):
-            if isinstance(paths[i], Path):
-                simple_list.append(paths[i])
-            elif isinstance(paths[i], list):
-                simple_list = simple_list + Path.list_simplify(paths[i])
-        return simple_list
+        return list(cls.iter_paths(paths))
 
     @classmethod
     def list_invert(cls, paths):
@@ -729,7 +1141,9 @@ class Path:
 
         if isinstance(paths, Path):
             # return Path(paths.points[::-1], paths.style, paths.closed, paths.invert)
-            return Path(paths.points, paths.style, paths.closed, True)
+            return Path(paths.coords, paths.style, paths.closed, True)
+        elif isinstance(paths, PathInstance):
+            return Path.list_invert(paths.materialize())
         elif isinstance(paths, list):
             paths_inverted = []
             # n = len(paths)
@@ -744,19 +1158,466 @@ class Path:
     @classmethod
     def debug_points(cls, paths):
         """ Plots points of path tree in drawing order """
-        if isinstance(paths, Path):
-            inkex.utils.debug(paths.points)
-        elif isinstance(paths, list):
-            for sub_path in paths:
-                Path.debug_points(sub_path)
+        for path in cls.iter_paths(paths):
+            inkex.utils.debug(path.points)
+
+    @classmethod
+    def iter_nodes(cls, paths, materialize=True):
+        """ Iterate over Path, PathBatch and PathInstance nodes of path tree in drawing order
+
+        Parameters
+        ----------
+        paths: nested list
+        materialize: bool
+            if true, PathInstance nodes are replaced by the nodes of their materialized tree
+        """
+        stack = [paths]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack.extend(node[::-1])
+            elif isinstance(node, PathInstance) and materialize:
+                stack.append(node.materialize())
+            else:
+                yield node
+
+    @classmethod
+    def iter_paths(cls, paths):
+        """ Iterate over Path instances of path tree in drawing order """
+        for node in cls.iter_nodes(paths):
+            if isinstance(node, PathBatch):
+                yield from node
+            else:
+                yield node
+
+    @classmethod
+    def get_coords(cls, paths):
+        """ Get (N, 2) array of points of path tree in drawing order """
+        coords = [node.coords for node in cls.iter_nodes(paths)]
+        if len(coords) == 0:
+            return np.empty((0, 2))
+        return np.concatenate(coords)
 
     @classmethod
     def get_points(cls, paths):
         """ Get points of path tree in drawing order """
-        points = []
-        if isinstance(paths, Path):
-            points = points + paths.points
-        elif isinstance(paths, list):
-            for sub_path in paths:
-                points = points + Path.get_points(sub_path)
-        return points
+        return list(map(tuple, cls.get_coords(paths).tolist()))
+
+
+class PathBatch:
+    """ Struct-of-arrays container holding a whole path tree
+
+    Instead of one Python object per stroke and one list per group, all points
+    are kept in a single coordinate buffer and every other attribute in a flat
+    array with one entry per path, so that operations on the whole tree can be
+    done with single vectorized calls.
+
+    A PathBatch can also be used as a node of a regular path tree, in which case
+    its root group is drawn directly to the group containing it.
+
+    Attributes
+    ----------
+    coords: numpy.ndarray
+        (M, 2) array with the points of all paths, concatenated in drawing order
+    offsets: numpy.ndarray
+        (P + 1,) array, points of i-th path are coords[offsets[i]:offsets[i+1]]
+    styles: numpy.ndarray
+        (P,) uint8 array of style codes, ord() of the style character of each path
+    closed: numpy.ndarray
+        (P,) bool array
+    fold_angles: numpy.ndarray
+        (P,) float array
+    radii: numpy.ndarray
+        (P,) float array, only used for circles (paths with a single point)
+    groups: numpy.ndarray
+        (P,) int array, index of the group containing each path
+    group_parents: numpy.ndarray
+        (G,) int array, index of the parent of each group. Group 0 is the root
+        and has parent -1
+    group_starts: numpy.ndarray
+        (G,) int array, index of first path drawn after each group is created,
+        needed to keep the order between groups and paths of the same parent
+
+    Methods
+    -------
+
+    from_tree(cls, paths)
+        Create PathBatch from nested list of Path instances
+
+    from_array(cls, coords, styles, closed=None, fold_angles=None, radii=None, sublist_size=1)
+        Create PathBatch drawn as a list of paths with the same number of points
+
+    from_strokes(cls, coords, counts, styles, closed=None, fold_angles=None, radii=None, sublist_sizes=None)
+        Create PathBatch drawn as a list of paths with any number of points
+
+    to_tree(self)
+        Convert back to nested list of Path instances
+
+    draw(self, group, styles_dict)
+        Batch version of Path.draw_paths_recursively
+
+    get_coords(self), get_points(self)
+        Batch versions of Path.get_coords and Path.get_points
+
+    simplify(self)
+        Batch version of Path.list_simplify
+    """
+
+    __slots__ = ('coords', 'offsets', 'styles', 'closed', 'fold_angles', 'radii',
+                 'groups', 'group_parents', 'group_starts')
+
+    def __init__(self, coords, offsets, styles, closed=None, fold_angles=None, radii=None,
+                 groups=None, group_parents=None, group_starts=None):
+        """ Constructor
+
+        Parameters
+        ----------
+        coords: (M, 2) array
+        offsets: (P + 1,) array
+        styles: str, list of str or (P,) uint8 array
+            if str, same style is used for all paths
+        closed, fold_angles, radii: scalar or (P,) arrays
+            default to False, 180 and 0.1, as in Path
+        groups, group_parents, group_starts: arrays
+            if not given, all paths are put in the root group
+        """
+        self.coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        n = len(self.offsets) - 1
+
+        if isinstance(styles, str):
+            styles = [styles] * n
+        if len(styles) and isinstance(styles[0], str):
+            styles = [ord(style) for style in styles]
+        self.styles = np.asarray(styles, dtype=np.uint8).reshape(n)
+
+        self.closed = np.broadcast_to(np.asarray(False if closed is None else closed, dtype=bool), (n,))
+        self.fold_angles = np.clip(np.broadcast_to(np.asarray(180. if fold_angles is None else fold_angles,
+                                                              dtype=float), (n,)), 0., 180.)
+        self.radii = np.broadcast_to(np.asarray(0.1 if radii is None else radii, dtype=float), (n,))
+
+        if groups is None:
+            groups = np.zeros(n, dtype=np.int32)
+            group_parents = [-1]
+            group_starts = [0]
+        self.groups = np.asarray(groups, dtype=np.int32)
+        self.group_parents = np.asarray(group_parents, dtype=np.int32)
+        self.group_starts = np.asarray(group_starts, dtype=np.int32)
+
+    @classmethod
+    def from_tree(cls, paths):
+        """ Create PathBatch from nested list of Path instances
+
+        Follows the same grouping rules as Path.draw_paths_recursively: every
+        sublist with more than one element creates a new group.
+
+        Parameters
+        ----------
+        paths: Path, PathBatch or nested list
+
+        Returns
+        -------
+        batch: PathBatch
+        """
+        coords, counts = [], []
+        styles, closed, fold_angles, radii, groups = [], [], [], [], []
+        group_parents, group_starts = [-1], [0]
+
+        def visit(node, group):
+            if isinstance(node, PathInstance):
+                node = node.materialize()
+
+            if isinstance(node, Path):
+                coords.append(node.coords)
+                counts.append(len(node.coords))
+                styles.append(ord(node.style))
+                closed.append(node.closed)
+                fold_angles.append(node.fold_angle)
+                radii.append(node.radius)
+                groups.append(group)
+
+            elif isinstance(node, PathBatch):
+                # root group of node is merged into current group
+                base = len(group_parents) - 1
+                node_groups = np.where(node.groups == 0, group, node.groups + base)
+                node_parents = np.where(node.group_parents[1:] == 0, group, node.group_parents[1:] + base)
+                group_parents.extend(node_parents.tolist())
+                group_starts.extend((node.group_starts[1:] + len(styles)).tolist())
+                coords.append(node.coords)
+                counts.extend(np.diff(node.offsets).tolist())
+                styles.extend(node.styles.tolist())
+                closed.extend(node.closed.tolist())
+                fold_angles.extend(node.fold_angles.tolist())
+                radii.extend(node.radii.tolist())
+                groups.extend(node_groups.tolist())
+
+            elif isinstance(node, list):
+                for sub_node in node:
+                    if isinstance(sub_node, PathInstance):
+                        sub_node = sub_node.materialize()
+                    if isinstance(sub_node, list) and len(sub_node) != 1:
+                        group_parents.append(group)
+                        group_starts.append(len(styles))
+                        visit(sub_node, len(group_parents) - 1)
+                    else:
+                        visit(sub_node, group)
+
+        visit(paths, 0)
+
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(np.concatenate(coords) if coords else np.empty((0, 2)), offsets,
+                   np.array(styles, dtype=np.uint8), np.array(closed, dtype=bool),
+                   np.array(fold_angles, dtype=float), np.array(radii, dtype=float),
+                   groups, group_parents, group_starts)
+
+    @classmethod
+    def from_array(cls, coords, styles, closed=None, fold_angles=None, radii=None, sublist_size=1):
+        """ Create PathBatch equivalent to a list of paths with the same number of points
+
+        Lets generators compute whole lists of strokes at once. As a node of a path
+        tree, the batch is drawn exactly as the list of paths would be.
+
+        Parameters
+        ----------
+        coords: (P, K, 2) array
+            Points of each path
+        styles, closed, fold_angles, radii:
+            See constructor
+        sublist_size: int
+            If greater than 1, consecutive paths are grouped in sublists of this size,
+            as in [[p0, p1], [p2, p3], ...]
+
+        Returns
+        -------
+        batch: PathBatch
+        """
+        coords = np.asarray(coords, dtype=float)
+        n, k = coords.shape[:2]
+        items = n // sublist_size
+
+        # list creates a group unless it has a single item, as in draw_paths_recursively
+        group_parents, group_starts = [-1], [0]
+        list_group = 0
+        if items != 1:
+            group_parents.append(0)
+            group_starts.append(0)
+            list_group = 1
+
+        if sublist_size == 1:
+            groups = np.full(n, list_group)
+        else:
+            groups = len(group_parents) + np.arange(n) // sublist_size
+            group_parents += [list_group] * items
+            group_starts += list(range(0, n, sublist_size))
+
+        return cls(coords.reshape(-1, 2), np.arange(n + 1) * k, styles, closed, fold_angles, radii,
+                   groups, group_parents, group_starts)
+
+    @classmethod
+    def from_strokes(cls, coords, counts, styles, closed=None, fold_angles=None, radii=None,
+                     sublist_sizes=None):
+        """ Create PathBatch equivalent to a list of paths with any number of points
+
+        Parameters
+        ----------
+        coords: (M, 2) array
+            Points of all paths, concatenated
+        counts: (P,) array
+            Number of points of each path
+        styles, closed, fold_angles, radii:
+            See constructor
+        sublist_sizes: list of int or None
+            If given, consecutive paths are grouped in sublists of these sizes,
+            as in [[p0, p1, p2], [p3], [p4, p5], ...]
+
+        Returns
+        -------
+        batch: PathBatch
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        n = len(counts)
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        items = n if sublist_sizes is None else len(sublist_sizes)
+
+        # list creates a group unless it has a single item, as in draw_paths_recursively
+        group_parents, group_starts = [-1], [0]
+        list_group = 0
+        if items != 1:
+            group_parents.append(0)
+            group_starts.append(0)
+            list_group = 1
+
+        if sublist_sizes is None:
+            groups = np.full(n, list_group)
+        else:
+            sizes = np.asarray(sublist_sizes, dtype=np.int64)
+            starts = np.cumsum(sizes) - sizes
+            grouped = np.flatnonzero(sizes != 1)
+            sublist_groups = np.full(len(sizes), list_group)
+            sublist_groups[grouped] = len(group_parents) + np.arange(len(grouped))
+            groups = np.repeat(sublist_groups, sizes)
+            group_parents += [list_group] * len(grouped)
+            group_starts += starts[grouped].tolist()
+
+        return cls(coords, offsets, styles, closed, fold_angles, radii, groups, group_parents, group_starts)
+
+    def __len__(self):
+        """ Number of paths """
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """ Get i-th path as a new Path instance """
+        return Path(self.coords[self.offsets[i]:self.offsets[i+1]], chr(self.styles[i]),
+                    closed=bool(self.closed[i]), radius=float(self.radii[i]),
+                    fold_angle=float(self.fold_angles[i]))
+
+    def __iter__(self):
+        """ Iterate over all paths as Path instances, in drawing order """
+        for i in range(len(self)):
+            yield self[i]
+
+    def copy(self, coords=None):
+        """ Return new PathBatch sharing all arrays, optionally with new coordinates """
+        if coords is None:
+            coords = self.coords
+        return PathBatch(coords, self.offsets, self.styles, self.closed, self.fold_angles, self.radii,
+                         self.groups, self.group_parents, self.group_starts)
+
+    def to_tree(self):
+        """ Convert back to nested list of Path instances
+
+        Returns
+        -------
+        paths: nested list
+            one sublist for each group
+        """
+        nodes = [[] for _ in range(len(self.group_parents))]
+        next_group = 1
+        for i in range(len(self) + 1):
+            while next_group < len(nodes) and self.group_starts[next_group] <= i:
+                nodes[self.group_parents[next_group]].append(nodes[next_group])
+                next_group += 1
+            if i < len(self):
+                nodes[self.groups[i]].append(self[i])
+        return nodes[0]
+
+    def draw(self, group, styles_dict, compact=False, precision=None, relative=False, css_classes=False):
+        """ Batch version of Path.draw_paths_recursively
+
+        Parameters
+        ----------
+        group: inkex.elements._groups.Group
+        styles_dict: dict
+            Contains all styles for the paths
+        compact: bool
+            If true, strokes of a group with same style and fold angle are merged into a single element
+        precision: int or None
+            Number of decimals written in path data
+        relative: bool
+            If true, path data is written with relative commands
+        css_classes: bool
+            If true, styles are written once as CSS classes, see create_style_classes
+        """
+        buckets = {} if compact else None
+        style_attributes = create_style_classes(group.root, styles_dict) if css_classes else {}
+        self._draw(group, styles_dict, buckets, precision=precision, relative=relative,
+                   style_attributes=style_attributes)
+        Path._merge_buckets(buckets)
+
+    def _draw(self, group, styles_dict, buckets, **kwargs):
+        """ Draw paths to group, merging strokes in buckets if given, kwargs are passed to draw_element """
+        elements = [group]
+        coords = self.coords
+        offsets = self.offsets.tolist()
+        styles = self.styles.tobytes().decode('latin-1')
+        closed = self.closed.tolist()
+        fold_angles = self.fold_angles.tolist()
+        radii = self.radii.tolist()
+        groups = self.groups.tolist()
+        group_parents = self.group_parents.tolist()
+        group_starts = self.group_starts.tolist()
+
+        for i in range(len(self) + 1):
+            while len(elements) < len(group_parents) and group_starts[len(elements)] <= i:
+                elements.append(elements[group_parents[len(elements)]].add(inkex.Group()))
+            if i < len(self):
+                Path.draw_element(elements[groups[i]], coords[offsets[i]:offsets[i+1]], styles[i],
+                                  styles_dict, closed[i], fold_angles[i], radii[i], buckets, **kwargs)
+
+    def get_coords(self):
+        """ Batch version of Path.get_coords """
+        return self.coords
+
+    def get_points(self):
+        """ Batch version of Path.get_points """
+        return list(map(tuple, self.coords.tolist()))
+
+    def simplify(self):
+        """ Batch version of Path.list_simplify, putting all paths in the root group """
+        return PathBatch(self.coords, self.offsets, self.styles, self.closed, self.fold_angles, self.radii)
+
+
+class PathInstance:
+    """ Lazy node of a path tree, referencing a template subtree and an affine transform
+
+    Replicated cells can be added to a path tree as instances of the same
+    template instead of transformed copies of it. The points of an instance are
+    only computed when they are needed (e.g. when drawing, or by get_coords),
+    and transforming an instance (by Path.transform, Path.list_add, etc.) only
+    composes its matrix, at constant cost independent of the number of points.
+
+    The template must not be modified after instances of it are created.
+
+    Attributes
+    ----------
+    template: Path, PathBatch or nested list
+    matrix: numpy.ndarray
+        (3, 3) affine matrix, see Path.translation, Path.rotation and Path.reflection
+
+    Methods
+    -------
+
+    materialize(self)
+        Return transformed copy of template
+
+    transformed(self, matrix)
+        Return new instance of the same template, with matrix composed to its transform
+    """
+
+    __slots__ = ('template', 'matrix')
+
+    def __init__(self, template, matrix=None):
+        """ Constructor
+
+        Parameters
+        ----------
+        template: Path, PathBatch, PathInstance or nested list
+            if another PathInstance is given, its template is referenced directly
+        matrix: (3, 3) array
+            defaults to identity
+        """
+        matrix = np.eye(3) if matrix is None else np.asarray(matrix, dtype=float)
+        if matrix.shape != (3, 3):
+            raise ValueError('PathInstance transform must be a single 3x3 affine matrix')
+
+        if isinstance(template, PathInstance):
+            matrix = matrix @ template.matrix
+            template = template.template
+
+        self.template = template
+        self.matrix = matrix
+
+    def transformed(self, matrix):
+        """ Return new instance of the same template, with matrix composed to its transform """
+        return PathInstance(self.template, np.asarray(matrix, dtype=float) @ self.matrix)
+
+    def materialize(self):
+        """ Return transformed copy of template, with the same structure """
+        return Path.transform(self.template, self.matrix)
+
+    @property
+    def coords(self):
+        """ (N, 2) array of transformed points, computed on demand """
+        return Path.get_coords(self.materialize())
@@ -1,8 +1,15 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
 from abc import abstractmethod
+import time
+import numpy as np
 import inkex
-from path import Path
+from path import Path, PathBatch
+from cache import PatternCache, IGNORED_OPTIONS
+from spatial import PointIndex
+from crease_graph import CreaseGraph
+from postprocess import OVERLAP_PRIORITY, merge_overlaps, chain_paths, optimize_travel
+from profiling import Profiler
 
 class Pattern(inkex.Effect):
     """ Class that inherits inkex.Effect and further specializes it for different
@@ -26,12 +33,39 @@ class Pattern(inkex.Effect):
     translate: 2 sized tuple
         Defines translation to be added when drawing to Inkscape (default: 0,0)
 
+    postprocess_report: dict
+        Statistics of the post-processing stages run while drawing, e.g. travel distances
+
+    profiler: Profiler
+        Records timings of each stage if profile option or ORIGAMI_PATTERNS_PROFILE is set
+
     Methods
     -------
 
     effect(self)
         Main function, called when the extension is run.
 
+    parse_arguments(self, args), load_raw(self), save_raw(self, ret), clean_up(self)
+        Steps of inkex.Effect.run, instrumented with profiler.
+
+    check_bool_only(self)
+        Disable crease types not selected, if some are to be printed alone.
+
+    generate_geometry(self)
+        Generate path tree and add the pattern's vertices to it, or load it from cache.
+
+    get_triangulation(self, tolerance)
+        Return diagonals splitting every face of the pattern into triangles.
+
+    get_complete_path_tree(self)
+        Return path tree with edges added, as it is drawn.
+
+    postprocess(self, path_tree)
+        Prepare complete path tree for plotters and laser cutters, as selected in options.
+
+    draw(self)
+        Draw the complete path tree to the document's current layer.
+
     create_styles_dict(self)
         Get stroke style parameters and use them to create the styles dictionary.
 
@@ -52,6 +86,15 @@ class Pattern(inkex.Effect):
 
     """
 
+    # options only used to draw the path tree, which do not change its geometry
+    DRAWING_OPTIONS = tuple(
+        f'{style_type}_{option}'
+        for style_type in ('mountain', 'valley', 'universal', 'semicrease', 'cut', 'edge', 'vertex')
+        for option in ('stroke_color', 'stroke_width', 'dashes_len', 'dashes_duty', 'dashes_bool',
+                       'bool', 'bool_only')
+    ) + ('edge_single_path', 'use_symbols', 'compact_paths', 'path_precision', 'relative_paths', 'css_classes',
+         'merge_overlaps', 'overlap_priority', 'chain_paths', 'chain_keep_groups', 'optimize_travel')
+
     @abstractmethod
     def generate_path_tree(self):
         """ Generate nested list of Path instances
@@ -74,6 +117,43 @@ class Pattern(inkex.Effect):
         # bypass most style options for OrigamiSimulator
         self.add_argument('--simulation_mode', type=inkex.Boolean, default=False)
 
+        # draw repeated cells once as <symbol>, and their copies as <use> elements
+        self.add_argument('--use_symbols', type=inkex.Boolean, default=False)
+
+        # split faces of the pattern into triangles with universal creases, e.g. for simulation
+        self.add_argument('--triangulate', type=inkex.Boolean, default=False)
+
+        # merge strokes of same style and fold angle of each group into a single <path>
+        self.add_argument('--compact_paths', type=inkex.Boolean, default=False)
+
+        # number of decimals written in path data, negative values keep full precision
+        self.add_argument('--path_precision', type=int, default=-1)
+
+        # write path data with relative commands (l, h, v)
+        self.add_argument('--relative_paths', type=inkex.Boolean, default=False)
+
+        # define styles once as CSS classes (.crease-m, .crease-v, ...) instead of inline styles
+        self.add_argument('--css_classes', type=inkex.Boolean, default=False)
+
+        # draw overlapping collinear strokes once, with the style listed first in overlap_priority
+        self.add_argument('--merge_overlaps', type=inkex.Boolean, default=False)
+        self.add_argument('--overlap_priority', type=str, default=OVERLAP_PRIORITY)
+
+        # join connected strokes of same style and fold angle into polylines, to reduce pen lifts
+        self.add_argument('--chain_paths', type=inkex.Boolean, default=False)
+        self.add_argument('--chain_keep_groups', type=inkex.Boolean, default=False)  # only join strokes of a group
+
+        # order and orient strokes of each style to reduce idle travel of plotters and laser cutters
+        self.add_argument('--optimize_travel', type=inkex.Boolean, default=False)
+
+        # write JSON lines with timings, counters and peak memory of each stage to file ('-' for stderr)
+        self.add_argument('--profile', type=str, default='')
+        self.add_argument('--profile_memory', type=inkex.Boolean, default=True)  # tracemalloc, slows down stages
+
+        # reuse path tree generated by a previous run with the same options, stored on disk
+        self.add_argument('--use_cache', type=inkex.Boolean, default=False)
+        self.add_argument('--cache_size', type=float, default=100.)  # in MB
+
         # mountain options
         self.add_argument('--mountain_stroke_color', type=str,  default=4278190335)  # Red
         self.add_argument('--mountain_stroke_width', type=float, default=0.1)
@@ -133,6 +213,7 @@ class Pattern(inkex.Effect):
         self.add_argument('--vertex_stroke_color', type=str, default=255)  # Black
         self.add_argument('--vertex_stroke_width', type=float, default=0.1)
         self.add_argument('--vertex_radius', type=float, default=0.1)
+        self.add_argument('--vertex_tolerance', type=float, default=1e-6)  # vertices closer than this are merged
         self.add_argument('--vertex_dashes_bool', type=inkex.Boolean, default=False)
         self.add_argument('--vertex_bool', type=inkex.Boolean, default=True)
         self.add_argument('--vertex_bool_only', type=inkex.Boolean, default=False)
@@ -145,14 +226,62 @@ class Pattern(inkex.Effect):
         self.vertex_points = []
         self.translate = (0, 0)
         self.styles_dict = {}
+        self.postprocess_report = {}
+        self.profiler = Profiler()
+
+    def parse_arguments(self, args):
+        """ Parse options, and set up profiler from them """
+        start = time.perf_counter()
+        inkex.Effect.parse_arguments(self, args)
+        self.profiler.close()
+        self.profiler = Profiler.from_target(self.options.profile, type(self).__name__, self.options.profile_memory)
+        self.profiler.record_stage('parse_arguments', time.perf_counter() - start)
+
+    def load_raw(self):
+        """ Load document, timed as 'load' stage """
+        with self.profiler.stage('load'):
+            inkex.Effect.load_raw(self)
+
+    def save_raw(self, ret):
+        """ Write document, timed as 'serialize' stage """
+        with self.profiler.stage('serialize'):
+            inkex.Effect.save_raw(self, ret)
+
+    def clean_up(self):
+        """ Close files and profiler """
+        inkex.Effect.clean_up(self)
+        self.profiler.close()
 
     def effect(self):
         """ Main function, called when the extension is run.
         """
-        # bypass most style options if simulation mode is choosen
-        self.check_simulation_mode()
+        with self.profiler.stage('styles'):
+            # bypass most style options if simulation mode is choosen
+            self.check_simulation_mode()
+
+            # check if any selected to print only some of the crease types
+            self.check_bool_only()
+
+            # construct dictionary containing styles
+            self.create_styles_dict()
+
+        # get paths for selected origami pattern, with its vertices
+        self.generate_geometry()
+
+        # draw everything in the document's current layer
+        self.draw()
 
-        # check if any selected to print only some of the crease types:
+        if self.profiler.enabled:
+            batch = PathBatch.from_tree(self.path_tree)
+            self.profiler.count('paths', len(batch))
+            self.profiler.count('points', len(batch.coords))
+            self.profiler.count('vertices', int(np.count_nonzero(batch.styles == ord('p'))))  # drawn vertex circles
+            self.profiler.count('elements', sum(1 for _ in self.topgroup.iterdescendants()))
+            self.profiler.emit_counters()
+
+    def check_bool_only(self):
+        """ If some crease types are selected to be printed alone, disable all other ones
+        """
         bool_only_list = [
             self.options.mountain_bool_only,
             self.options.valley_bool_only,
@@ -172,20 +301,102 @@ class Pattern(inkex.Effect):
             self.options.cut_bool = self.options.cut_bool and self.options.cut_bool_only
             self.options.vertex_bool = self.options.vertex_bool and self.options.vertex_bool_only
 
-        # construct dictionary containing styles
-        self.create_styles_dict()
+    def generate_geometry(self):
+        """ Generate path tree of the pattern and add its vertices to it
+
+        If use_cache is set, the result is loaded from the on-disk cache when it was
+        already generated with the same geometric options, and stored to it otherwise.
+        Options in DRAWING_OPTIONS are not part of the key, so changing only colors,
+        dashes or visibility of creases just draws the cached geometry again. Cells
+        drawn as symbols are not kept by the cache, so it is bypassed in this case.
+        """
+        cache = None
+        if self.options.use_cache and not self.options.use_symbols:
+            cache = PatternCache(max_size=int(self.options.cache_size * 2**20))
+            key = cache.key(self, IGNORED_OPTIONS + self.DRAWING_OPTIONS)
+            with self.profiler.stage('cache_load'):
+                if cache.load(key, self):
+                    return
 
         # get paths for selected origami pattern
-        self.generate_path_tree()
+        with self.profiler.stage('generate_path_tree'):
+            self.generate_path_tree()
+
+        unit_factor = self.calc_unit_factor()
+        if self.options.triangulate:
+            with self.profiler.stage('triangulate'):
+                self.path_tree.append(self.get_triangulation(self.options.vertex_tolerance * unit_factor))
 
         # get vertex points and add them to path tree
-        vertex_radius = self.options.vertex_radius * self.calc_unit_factor()
-        vertices = []
-        self.vertex_points = list(set(self.vertex_points)) # remove duplicates
-        for vertex_point in self.vertex_points:
-            vertices.append(Path(vertex_point, style='p', radius=vertex_radius))
-        self.path_tree.append(vertices)
+        with self.profiler.stage('vertices'):
+            vertex_radius = self.options.vertex_radius * unit_factor
+            vertices = []
+            # remove duplicates, including points only differing by rounding errors
+            self.vertex_points = PointIndex.deduplicate(self.vertex_points,
+                                                        self.options.vertex_tolerance * unit_factor)
+            for vertex_point in self.vertex_points:
+                vertices.append(Path(vertex_point, style='p', radius=vertex_radius))
+            self.path_tree.append(vertices)
+
+        if cache is not None:
+            with self.profiler.stage('cache_store'):
+                cache.store(key, self)
+
+    def get_triangulation(self, tolerance):
+        """ Get diagonals splitting every face of the pattern into triangles
+
+        Parameters
+        ----------
+        tolerance: float
+            Points closer than tolerance are considered the same vertex, see CreaseGraph
+
+        Returns
+        -------
+        diagonals: PathBatch
+            One universal crease per diagonal, in a group of their own
+        """
+        graph = CreaseGraph.from_tree(self.get_complete_path_tree(), tolerance)
+        triangulated, _ = graph.triangulate('u')
+        coords = triangulated.vertices[triangulated.edges[graph.num_edges:]].reshape(-1, 2)
+        num_diagonals = len(coords) // 2
+        return PathBatch(coords, np.arange(0, len(coords) + 1, 2), 'u',
+                         groups=np.ones(num_diagonals), group_parents=[-1, 0], group_starts=[0, 0])
+
+    def get_complete_path_tree(self):
+        """ Get path tree with the edges of the pattern added to it, as it is drawn
+        """
+        if len(self.edge_points) == 0:
+            return self.path_tree
+        elif self.options.edge_single_path:
+            edges = Path(self.edge_points, 'e', closed=True)
+            return self.path_tree + [edges]
+        else:
+            edges = Path.generate_separated_paths(self.edge_points, 'e', closed=True)
+            return self.path_tree + edges
 
+    def postprocess(self, path_tree):
+        """ Prepare complete path tree for plotters and laser cutters, as selected in options
+
+        Statistics of each stage are stored in postprocess_report.
+        """
+        self.postprocess_report = {}
+        tolerance = self.options.vertex_tolerance * self.calc_unit_factor()
+        if self.options.merge_overlaps:
+            batch, self.postprocess_report['overlaps'] = merge_overlaps(path_tree, tolerance,
+                                                                        self.options.overlap_priority)
+            path_tree = [batch]
+        if self.options.chain_paths:
+            batch, self.postprocess_report['chaining'] = chain_paths(path_tree, tolerance,
+                                                                     self.options.chain_keep_groups)
+            path_tree = [batch]
+        if self.options.optimize_travel:
+            batch, self.postprocess_report['travel'] = optimize_travel(path_tree)
+            path_tree = [batch]
+        return path_tree
+
+    def draw(self):
+        """ Draw generated path tree to the document's current layer
+        """
         # add the group to the document's current layer
         layer = self.svg.get_current_layer()
         if isinstance(self.path_tree, list) and len(self.path_tree) != 1:
@@ -197,14 +408,18 @@ class Pattern(inkex.Effect):
         else:
             self.topgroup = layer
 
-        if len(self.edge_points) == 0:
-            Path.draw_paths_recursively(self.path_tree, self.topgroup, self.styles_dict)
-        elif self.options.edge_single_path:
-            edges = Path(self.edge_points, 'e', closed=True)
-            Path.draw_paths_recursively(self.path_tree + [edges], self.topgroup, self.styles_dict)
-        else:
-            edges = Path.generate_separated_paths(self.edge_points, 'e', closed=True)
-            Path.draw_paths_recursively(self.path_tree + edges, self.topgroup, self.styles_dict)
+        # flatten repeated cells to plain paths, unless symbols are used
+        symbols = {} if self.options.use_symbols else None
+
+        precision = self.options.path_precision if self.options.path_precision >= 0 else None
+
+        with self.profiler.stage('postprocess'):
+            path_tree = self.postprocess(self.get_complete_path_tree())
+
+        with self.profiler.stage('draw'):
+            Path.draw_paths_recursively(path_tree, self.topgroup, self.styles_dict, symbols,
+                                        self.options.compact_paths, precision, self.options.relative_paths,
+                                        self.options.css_classes)
 
     def check_simulation_mode(self):
         """ If simulation mode is selected, use OrigamiSimulator settings
@@ -245,6 +460,9 @@ class Pattern(inkex.Effect):
 
             self.options.vertex_bool = False
 
+            # OrigamiSimulator doesn't resolve <use> elements
+            self.options.use_symbols = False
+
     def create_styles_dict(self):
         """ Get stroke style parameters and use them to create the styles dictionary,
             used for the Path generation.
@@ -4,7 +4,7 @@ import numpy as np
 
 from math import pi, sin, cos
 
-from path import Path
+from path import Path, PathInstance
 from pattern import Pattern
 
 
@@ -86,9 +86,9 @@ class PleatCircular(Pattern):
                              Path(top, 's'),                                    # top half of semicrease pattern
                              Path(bottom, 's')]                                # bottom half of semicrease pattern
 
-            all_paths = [paths]
-            for i in range(1, sides):
-                all_paths.append(Path.list_rotate(all_paths[0], i*2*dtheta))
+            # all other slices are rotated instances of the first one
+            rotations = Path.rotation(np.arange(1, sides)*2*dtheta)
+            all_paths = [paths] + [PathInstance(paths, rotation) for rotation in rotations]
 
             self.path_tree = all_paths
             # self.vertex_points = Path.get_points(self.path_tree)
@@ -70,11 +70,10 @@ class Hypar(Pattern):
             diagonal_line.append((Path([(x1, y1), (x2, y2)], style='m' if i % 2 else 'v')))
 
         # rotation of vertices and diagonals for completing the drawing
-        diagonals = []
+        rotations = Path.rotation(np.arange(sides) * 2 * pi / float(sides))
         vertices = [Path((0, 0), style='p', radius=vertex_radius)]
-        for i in range(sides):
-            vertices = vertices+Path.list_rotate(vertex_line, i * 2 * pi / float(sides))
-            diagonals = diagonals+[Path.list_rotate(diagonal_line, i * 2 * pi / float(sides))]
+        vertices = vertices + Path.list_simplify(Path.transform(vertex_line, rotations))
+        diagonals = Path.transform(diagonal_line, rotations)
 
         # modify center if needed
         if simplify_center:
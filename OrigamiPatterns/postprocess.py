@@ -0,0 +1,516 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Post-generation stages preparing path trees for plotters and laser cutters
+"""
+import numpy as np
+from path import PathBatch
+from spatial import PointGrid, PointIndex
+
+
+def get_endpoints(batch):
+    """ Get (P, 2) arrays of first and last points of each path of batch
+
+    Closed paths end where they start, as they are drawn back to their first point.
+    """
+    starts = batch.coords[batch.offsets[:-1]]
+    ends = batch.coords[batch.offsets[1:] - 1]
+    ends = np.where(batch.closed[:, None], starts, ends)
+    return starts, ends
+
+
+def get_travel(batch, order=None, reversed_paths=None, origin=(0., 0.)):
+    """ Get total distance travelled between paths (pen up moves), starting from origin
+
+    Parameters
+    ----------
+    batch: PathBatch
+    order: (P,) int array or None
+        Order in which paths are drawn, drawing order by default
+    reversed_paths: (P,) bool array or None
+        Paths drawn from their last to their first point
+    origin: 2 sized tuple
+
+    Returns
+    -------
+    travel: float
+    """
+    if len(batch) == 0:
+        return 0.
+    starts, ends = get_endpoints(batch)
+    if order is None:
+        order = np.arange(len(batch))
+    if reversed_paths is not None:
+        starts, ends = np.where(reversed_paths[:, None], ends, starts), np.where(reversed_paths[:, None], starts, ends)
+    previous_ends = np.vstack((np.asarray(origin, dtype=float).reshape(1, 2), ends[order[:-1]]))
+    return float(np.sqrt(((starts[order] - previous_ends)**2).sum(axis=1)).sum())
+
+
+def order_nearest_neighbour(starts, ends, origin=(0., 0.)):
+    """ Order paths greedily, always drawing next the path with the nearest endpoint
+
+    Parameters
+    ----------
+    starts, ends: (P, 2) arrays
+        Endpoints of paths
+    origin: 2 sized tuple
+        Starting position
+
+    Returns
+    -------
+    order: (P,) int array
+    reversed_paths: (P,) bool array
+        True for paths drawn from their end
+    """
+    n = len(starts)
+    # endpoint 2 * i is the start of path i, 2 * i + 1 its end
+    grid = PointGrid(np.column_stack((starts, ends)).reshape(-1, 2))
+    order = np.empty(n, dtype=np.intp)
+    reversed_paths = np.zeros(n, dtype=bool)
+    ends = ends.tolist()
+    starts = starts.tolist()
+    position = origin
+    for k in range(n):
+        endpoint = grid.nearest(position)
+        path, is_end = divmod(endpoint, 2)
+        grid.remove(2 * path)
+        grid.remove(2 * path + 1)
+        order[k] = path
+        reversed_paths[path] = is_end
+        position = starts[path] if is_end else ends[path]
+    return order, reversed_paths
+
+
+def improve_two_opt(starts, ends, order, reversed_paths, origin=(0., 0.), window=32, max_passes=8):
+    """ Improve order of paths with 2-opt moves, reversing runs of consecutive paths
+
+    Reversing the run of paths k + 1..l (and the direction of each of them) only
+    changes the moves entering and leaving the run. Gains of all runs of the same
+    length are computed at once, and non overlapping improving moves are applied,
+    for run lengths up to window.
+
+    Parameters
+    ----------
+    starts, ends: (P, 2) arrays
+        Endpoints of paths, in their original direction
+    order, reversed_paths: arrays
+        Initial solution, see order_nearest_neighbour
+    origin: 2 sized tuple
+    window: int
+        Maximal number of paths of a reversed run
+    max_passes: int
+        Maximal number of passes over all run lengths
+
+    Returns
+    -------
+    order, reversed_paths: arrays
+        Improved solution
+    """
+    order = order.copy()
+    reversed_paths = reversed_paths.copy()
+    n = len(order)
+
+    # oriented endpoints in drawing order, origin being a fixed path drawn before the first one
+    flip = reversed_paths[order][:, None]
+    first = np.vstack((np.where(flip, ends[order], starts[order]), np.full((1, 2), np.nan)))
+    last = np.vstack((np.asarray(origin, dtype=float).reshape(1, 2), np.where(flip, starts[order], ends[order])))
+
+    for _ in range(max_passes):
+        improved = False
+        for length in range(1, min(window, n) + 1):
+            # reverse paths order[k:l], entered from last[k] and left to first[l]
+            k = np.arange(0, n - length + 1)
+            l = k + length
+            before = np.hypot(*(first[k] - last[k]).T) + np.nan_to_num(np.hypot(*(first[l] - last[l]).T))
+            after = np.hypot(*(last[l] - last[k]).T) + np.nan_to_num(np.hypot(*(first[l] - first[k]).T))
+            gains = before - after
+
+            # apply non overlapping improving moves, from left to right
+            next_free = 0
+            for c in np.flatnonzero(gains > 1e-9 * (1 + before)).tolist():
+                if c < next_free:
+                    continue
+                run = slice(c, c + length)
+                shifted = slice(c + 1, c + length + 1)
+                order[run] = order[run][::-1].copy()
+                reversed_paths[order[run]] = ~reversed_paths[order[run]]
+                first[run], last[shifted] = last[shifted][::-1].copy(), first[run][::-1].copy()
+                next_free = c + length + 1
+                improved = True
+        if not improved:
+            break
+    return order, reversed_paths
+
+
+def reorder(batch, order, reversed_paths, groups=None, group_parents=None, group_starts=None):
+    """ Get new PathBatch with paths in given order and direction
+
+    Parameters
+    ----------
+    batch: PathBatch
+    order: (P,) int array
+    reversed_paths: (P,) bool array
+    groups, group_parents, group_starts:
+        Groups of the new batch, see PathBatch. All paths in root group by default
+
+    Returns
+    -------
+    batch: PathBatch
+    """
+    counts = np.diff(batch.offsets)[order]
+    offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    # index of each point in original coordinates, reversed inside reversed paths
+    local = np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts)
+    flip = np.repeat(reversed_paths[order], counts)
+    local = np.where(flip, np.repeat(counts, counts) - 1 - local, local)
+    indices = np.repeat(batch.offsets[:-1][order], counts) + local
+
+    return PathBatch(batch.coords[indices], offsets, batch.styles[order], batch.closed[order],
+                     batch.fold_angles[order], batch.radii[order], groups, group_parents, group_starts)
+
+
+# default resolution of overlapping strokes of different styles: first listed style wins
+OVERLAP_PRIORITY = 'cemvsu'
+
+
+def get_segments(batch):
+    """ Get all segments of batch, closed paths including their closing segment
+
+    Returns
+    -------
+    first, second: (S,) int arrays
+        Indices in batch.coords of the endpoints of each segment
+    paths: (S,) int array
+        Path of each segment, segments being sorted by path and position in it
+    """
+    counts = np.diff(batch.offsets)
+    segment_counts = np.where(counts > 1, counts - 1 + batch.closed, 0)
+    paths = np.repeat(np.arange(len(batch)), segment_counts)
+    positions = np.arange(len(paths)) - np.repeat(np.cumsum(segment_counts) - segment_counts, segment_counts)
+    first = batch.offsets[:-1][paths] + positions
+    second = np.where(positions + 1 < counts[paths], first + 1, batch.offsets[:-1][paths])
+    return first, second, paths
+
+
+def merge_overlaps(paths, tolerance=1e-6, priority=OVERLAP_PRIORITY):
+    """ Merge overlapping collinear segments, so that no line is drawn twice
+
+    Segments are clustered by supporting line, sorting them by direction then by
+    distance to the origin, and overlapping segments of each line are found by a
+    sweep along it. Wherever segments overlap, a single stroke is drawn, with the
+    style (and fold angle) of the covering segment ranked first in priority.
+
+    Parameters
+    ----------
+    paths: nested list, Path or PathBatch
+    tolerance: float
+        Maximal distance between merged lines, and minimal length of overlaps
+    priority: str
+        Styles that can be merged, from highest to lowest priority, e.g. 'cm' to draw
+        a cut over a mountain crease. Segments of other styles are kept as they are
+
+    Returns
+    -------
+    batch: PathBatch
+        With the groups of paths. Paths are split around overlapping segments, merged
+        strokes being drawn right after the path whose style they take
+    report: dict
+        Number of overlapping segments, and of strokes they were merged into
+    """
+    batch = paths if isinstance(paths, PathBatch) else PathBatch.from_tree(paths)
+    first, second, segment_paths = get_segments(batch)
+    rank = np.full(256, len(priority))
+    rank[[ord(style) for style in priority]] = np.arange(len(priority))
+    segment_ranks = rank[batch.styles[segment_paths]]
+
+    vectors = batch.coords[second] - batch.coords[first]
+    lengths = np.hypot(*vectors.T)
+    candidates = np.flatnonzero((segment_ranks < len(priority)) & (lengths > tolerance))
+
+    # orient lines with an angle in [0, pi), merging angles close to pi with 0
+    extent = max(np.abs(batch.coords).max(initial=0.) * 2, tolerance)
+    angle_tolerance = tolerance / extent
+    units = vectors[candidates] / lengths[candidates, None]
+    units[units[:, 1] < 0] *= -1
+    angles = np.arctan2(units[:, 1], units[:, 0])
+    wrapped = angles > np.pi - angle_tolerance
+    units[wrapped] *= -1
+    angles[wrapped] -= np.pi
+    distances = units[:, 0] * batch.coords[first[candidates], 1] - units[:, 1] * batch.coords[first[candidates], 0]
+
+    # cluster segments by line: sweep over sorted angles, then over sorted distances
+    order = np.argsort(angles, kind='stable')
+    angle_clusters = np.empty(len(order), dtype=np.intp)
+    angle_clusters[order] = np.cumsum(np.diff(angles[order], prepend=-np.inf) > angle_tolerance)
+    order = np.lexsort((distances, angle_clusters))
+    new_line = (np.diff(distances[order], prepend=-np.inf) > tolerance) | \
+        (np.diff(angle_clusters[order], prepend=-1) != 0)
+    lines = np.empty(len(order), dtype=np.intp)
+    lines[order] = np.cumsum(new_line)
+
+    # position of segment endpoints along the direction of the first segment of their line
+    line_units = units[order[new_line]][lines - 1]
+    t_first = (batch.coords[first[candidates]] * line_units).sum(axis=1)
+    t_second = (batch.coords[second[candidates]] * line_units).sum(axis=1)
+    lows, highs = np.minimum(t_first, t_second), np.maximum(t_first, t_second)
+
+    # sweep along each line, lines being shifted apart so that all are swept at once
+    shift = lines * 4 * (extent + 1)
+    order = np.lexsort((lows, lines))
+    reach = np.maximum.accumulate(highs[order] + shift[order])
+    new_component = np.ones(len(order), dtype=bool)
+    new_component[1:] = lows[order][1:] + shift[order][1:] >= reach[:-1] - tolerance
+    components = np.cumsum(new_component) - 1
+    sizes = np.bincount(components)
+    overlapping = sizes[components] > 1
+
+    removed = np.zeros(len(first), dtype=bool)
+    removed[candidates[order[overlapping]]] = True
+
+    # duplicated segments (the most common case) are replaced by the one of highest priority at once
+    component_starts = np.flatnonzero(new_component)
+    sorted_lows, sorted_highs = lows[order], highs[order]
+    spans = np.maximum.reduceat(sorted_highs, component_starts) - np.minimum.reduceat(sorted_lows, component_starts) \
+        if len(order) else np.zeros(0)
+    duplicates = np.abs(sorted_highs - sorted_lows - spans[components]) <= tolerance
+    duplicated = (np.bincount(components, weights=~duplicates, minlength=len(sizes)) == 0) & (sizes > 1)
+    best = np.lexsort((candidates[order], segment_ranks[candidates[order]], components))
+    best = best[np.diff(components[best], prepend=-1) != 0]
+    best = candidates[order[best[duplicated]]]
+    merged = [(path, points) for path, points in zip(segment_paths[best].tolist(), np.column_stack((first[best], second[best])))]
+
+    # other groups of overlapping segments are resolved into strokes of the winning styles
+    starts = component_starts[~duplicated & (sizes > 1)].tolist()
+    for start in starts:
+        members = candidates[order[start:start + sizes[components[start]]]]
+        member_lows, member_highs = lows[order[start:start + len(members)]], highs[order[start:start + len(members)]]
+
+        # endpoints sorted along the line, closer than tolerance ones being merged
+        ts = np.concatenate((t_first[order[start:start + len(members)]], t_second[order[start:start + len(members)]]))
+        points = np.concatenate((first[members], second[members]))
+        by_t = np.argsort(ts, kind='stable')
+        keep = np.diff(ts[by_t], prepend=-np.inf) > tolerance
+        breaks, break_points = ts[by_t][keep], points[by_t][keep]
+
+        # winner of each elementary interval between breaks, by priority then drawing order
+        winners = []
+        for k in range(len(breaks) - 1):
+            covering = np.flatnonzero((member_lows <= breaks[k] + tolerance) &
+                                      (member_highs >= breaks[k + 1] - tolerance))
+            winners.append(members[covering[np.lexsort((members[covering], segment_ranks[members[covering]]))[0]]]
+                           if len(covering) else -1)
+
+        # consecutive intervals with the same style and fold angle are drawn as one stroke
+        k = 0
+        while k < len(winners):
+            if winners[k] < 0:
+                k += 1
+                continue
+            path = segment_paths[winners[k]]
+            end = k + 1
+            while end < len(winners) and winners[end] >= 0 and \
+                    batch.styles[segment_paths[winners[end]]] == batch.styles[path] and \
+                    batch.fold_angles[segment_paths[winners[end]]] == batch.fold_angles[path]:
+                end += 1
+            merged.append((path, break_points[[k, end]]))
+            k = end
+
+    # split paths around removed segments, keeping the others untouched
+    entries = []
+    segment_starts = np.searchsorted(segment_paths, np.arange(len(batch) + 1))
+    has_removed = np.bincount(segment_paths[removed], minlength=len(batch)) > 0
+    for path in range(len(batch)):
+        if not has_removed[path]:
+            entries.append((path, path, batch.coords[batch.offsets[path]:batch.offsets[path + 1]], batch.closed[path]))
+            continue
+        path_removed = removed[segment_starts[path]:segment_starts[path + 1]]
+        path_first = first[segment_starts[path]:segment_starts[path + 1]]
+        path_second = second[segment_starts[path]:segment_starts[path + 1]]
+        if batch.closed[path]:
+            # start runs after a removed segment, so that no run wraps around
+            rotation = int(np.flatnonzero(path_removed)[0]) + 1
+            path_removed, path_first, path_second = (np.roll(array, -rotation) for array in
+                                                     (path_removed, path_first, path_second))
+        k = 0
+        while k < len(path_removed):
+            if path_removed[k]:
+                k += 1
+                continue
+            end = k
+            while end < len(path_removed) and not path_removed[end]:
+                end += 1
+            entries.append((path, path, batch.coords[np.append(path_first[k:end], path_second[end - 1])], False))
+            k = end
+    entries += [(path, path, batch.coords[points], False) for path, points in merged]
+
+    entries.sort(key=lambda entry: entry[0])
+    positions = np.array([entry[0] for entry in entries], dtype=np.intp)
+    styled = np.array([entry[1] for entry in entries], dtype=np.intp)
+    coords = [entry[2] for entry in entries]
+    offsets = np.zeros(len(entries) + 1, dtype=np.int64)
+    np.cumsum([len(points) for points in coords], out=offsets[1:])
+    return (PathBatch(np.concatenate(coords) if coords else np.zeros((0, 2)), offsets, batch.styles[styled],
+                      np.array([entry[3] for entry in entries], dtype=bool), batch.fold_angles[styled],
+                      batch.radii[styled], batch.groups[positions], batch.group_parents,
+                      np.searchsorted(positions, batch.group_starts)),
+            {'segments': int(removed.sum()), 'merged': len(merged)})
+
+
+def chain_paths(paths, tolerance=1e-6, keep_groups=False):
+    """ Join open paths of the same style and fold angle sharing endpoints into polylines
+
+    Paths are chained across groups by default, as a plotter or laser cutter draws
+    each style layer as a whole, see optimize_travel: e.g. zigzags of consecutive
+    Kresling rows, each one in its own group, are joined into long polylines.
+    Endpoints closer than tolerance are identified with a spatial hash, and each
+    polyline is grown from its first path through unused paths ending at its
+    ends, which takes linear time. Polylines ending where they start are closed.
+    Closed paths and circles are kept as they are.
+
+    Parameters
+    ----------
+    paths: nested list, Path or PathBatch
+    tolerance: float
+        Maximal distance between joined endpoints
+    keep_groups: bool
+        If true, only paths of the same group are joined, so that the group tree is
+        kept as it is, at the cost of more pen lifts
+
+    Returns
+    -------
+    batch: PathBatch
+        With the groups of paths, each polyline drawn at the position of its first path
+    report: dict
+        Number of paths before and after chaining
+    """
+    batch = paths if isinstance(paths, PathBatch) else PathBatch.from_tree(paths)
+    n = len(batch)
+    starts, ends = get_endpoints(batch)
+    chainable = ~batch.closed & (np.diff(batch.offsets) > 1)
+
+    # endpoint 2 * i is the start of path i, 2 * i + 1 its end, both hashed with style and fold angle
+    vertices = PointIndex(tolerance).add_points(np.column_stack((starts, ends)).reshape(-1, 2))
+    groups = batch.groups if keep_groups else np.zeros(n, dtype=batch.groups.dtype)
+    keys = list(zip(vertices.tolist(), np.repeat(groups, 2).tolist(), np.repeat(batch.styles, 2).tolist(),
+                    np.repeat(batch.fold_angles, 2).tolist()))
+    incident = {}
+    for endpoint in np.flatnonzero(np.repeat(chainable, 2)).tolist():
+        incident.setdefault(keys[endpoint], []).append(endpoint)
+
+    used = np.zeros(n, dtype=bool)
+
+    def extend(endpoint):
+        """ Get list of (path, reversed) leaving from endpoint, marking them as used """
+        chain = []
+        while True:
+            candidates = incident[keys[endpoint]]
+            while candidates and used[candidates[-1] // 2]:
+                candidates.pop()
+            if not candidates:
+                return chain
+            path, is_end = divmod(candidates.pop(), 2)
+            used[path] = True
+            chain.append((path, bool(is_end)))
+            endpoint = 2 * path + 1 - is_end
+
+    # grow polylines from both ends of their first path, in drawing order
+    for endpoints in incident.values():
+        endpoints.reverse()
+    chains, seeds = [], []
+    for path in range(n):
+        if used[path]:
+            continue
+        used[path] = True
+        seeds.append(path)
+        if not chainable[path]:
+            chains.append([(path, False)])
+            continue
+        backward = extend(2 * path)
+        forward = extend(2 * path + 1)
+        chains.append([(other, not is_end) for other, is_end in reversed(backward)] + [(path, False)] + forward)
+
+    order = np.array([path for chain in chains for path, _ in chain], dtype=np.intp)
+    reversed_paths = np.zeros(n, dtype=bool)
+    reversed_paths[order] = [is_end for chain in chains for _, is_end in chain]
+    heads = np.cumsum([0] + [len(chain) for chain in chains[:-1]])
+    chained = reorder(batch, order, reversed_paths)
+
+    # drop first point of every path continuing a polyline, as it is the last point of the previous one
+    counts = np.diff(chained.offsets)
+    continued = np.ones(len(order), dtype=bool)
+    continued[heads] = False
+    keep = np.ones(len(chained.coords), dtype=bool)
+    keep[chained.offsets[:-1][continued]] = False
+    chain_counts = np.add.reduceat(counts - continued, heads) if len(heads) else counts
+    offsets = np.zeros(len(chains) + 1, dtype=np.int64)
+    np.cumsum(chain_counts, out=offsets[1:])
+    coords = chained.coords[keep]
+
+    # polylines ending where they start are closed, without repeating their first point
+    closing = np.array([len(chain) > 2 and keys[2 * chain[0][0] + chain[0][1]] == keys[2 * chain[-1][0] + 1 - chain[-1][1]]
+                        for chain in chains], dtype=bool).reshape(-1)
+    seeds = np.array(seeds, dtype=np.intp)
+    closed = batch.closed[seeds] | closing
+    if closing.any():
+        keep = np.ones(len(coords), dtype=bool)
+        keep[offsets[1:][closing] - 1] = False
+        coords = coords[keep]
+        offsets[1:] -= np.cumsum(closing)
+
+    # each polyline is drawn at the position of the path it was grown from, its smallest index
+    group_starts = np.searchsorted(seeds, batch.group_starts)
+    return (PathBatch(coords, offsets, batch.styles[seeds], closed, batch.fold_angles[seeds], batch.radii[seeds],
+                      batch.groups[seeds], batch.group_parents, group_starts),
+            {'before': n, 'after': len(chains)})
+
+
+def optimize_travel(paths, origin=(0., 0.), window=32, max_passes=8):
+    """ Reorder and reverse strokes to reduce pen up travel, one layer per style
+
+    Strokes are split in layers of the same style, as plotters and laser cutters
+    usually process each color separately, in order of first appearance. Each
+    layer is ordered with a nearest neighbour heuristic, then improved by 2-opt
+    moves, both starting from origin.
+
+    Parameters
+    ----------
+    paths: nested list, Path or PathBatch
+    origin: 2 sized tuple
+        Position of the tool before each layer
+    window, max_passes: int
+        See improve_two_opt
+
+    Returns
+    -------
+    batch: PathBatch
+        One group per style, containing its strokes in optimized order
+    report: dict
+        Maps each style to its travel distance before and after optimization
+    """
+    batch = paths if isinstance(paths, PathBatch) else PathBatch.from_tree(paths)
+    starts, ends = get_endpoints(batch)
+
+    _, first_paths = np.unique(batch.styles, return_index=True)
+    layer_styles = batch.styles[np.sort(first_paths)]
+
+    orders, reversed_paths = [], np.zeros(len(batch), dtype=bool)
+    report = {}
+    for style in layer_styles.tolist():
+        layer = np.flatnonzero(batch.styles == style)
+        layer_order, layer_reversed = order_nearest_neighbour(starts[layer], ends[layer], origin)
+        layer_order, layer_reversed = improve_two_opt(starts[layer], ends[layer], layer_order, layer_reversed,
+                                                      origin, window, max_passes)
+        orders.append(layer[layer_order])
+        # closed paths start and end at the same point, their direction does not matter
+        reversed_paths[layer] = layer_reversed & ~batch.closed[layer]
+        report[chr(style)] = {
+            'before': get_travel(batch, layer, origin=origin),
+            'after': get_travel(batch, layer[layer_order], reversed_paths, origin),
+        }
+
+    sizes = [len(layer_order) for layer_order in orders]
+    order = np.concatenate(orders) if orders else np.zeros(0, dtype=np.intp)
+    groups = np.repeat(np.arange(1, len(orders) + 1), sizes)
+    group_starts = np.concatenate(([0, 0], np.cumsum(sizes)[:-1]))[:len(orders) + 1]
+    return reorder(batch, order, reversed_paths, groups, [-1] + [0] * len(orders), group_starts), report
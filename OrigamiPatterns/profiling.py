@@ -0,0 +1,152 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Instrumentation of pattern generation: stage timers, counters and peak memory
+
+Records are written as JSON lines, one per finished stage and one with the
+counters of the run, to stderr or appended to a file. When disabled, stages are
+a shared no-op context manager, so instrumented code runs almost as fast as
+without it.
+"""
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+PROFILE_ENV = 'ORIGAMI_PATTERNS_PROFILE'
+
+# shared by all stages of disabled profilers
+NULL_STAGE = contextlib.nullcontext()
+
+
+class Profiler:
+    """ Collects timings, counters and peak memory of named stages
+
+    Attributes
+    ----------
+    enabled: bool
+    counters: dict
+        Maps counter name to its value, emitted by emit_counters
+    label: str
+        Added to every record, e.g. name of the pattern
+
+    Methods
+    -------
+
+    from_target(cls, target=None, label='', trace_memory=True)
+        Create profiler writing to target, or to the one set in environment
+
+    stage(self, name)
+        Context manager timing the code it wraps
+
+    record_stage(self, name, elapsed)
+        Emit timing of a stage measured by the caller
+
+    count(self, name, value)
+        Set counter
+
+    emit_counters(self)
+        Emit counters in a single record
+
+    close(self)
+        Stop memory tracing started by this profiler and close output file
+    """
+
+    def __init__(self, output=None, label='', trace_memory=True):
+        """ Constructor
+
+        Parameters
+        ----------
+        output: text file or None
+            Where records are written. If None, profiler is disabled
+        label: str
+        trace_memory: bool
+            If true, peak memory of each stage is measured with tracemalloc, which
+            slows down allocations of the profiled code
+        """
+        self.output = output
+        self.enabled = output is not None
+        self.label = label
+        self.counters = {}
+        self._close_output = False
+        self._stop_tracing = False
+        if self.enabled and trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._stop_tracing = True
+        self.trace_memory = self.enabled and trace_memory
+
+    @classmethod
+    def from_target(cls, target=None, label='', trace_memory=True):
+        """ Create profiler writing JSON lines to target
+
+        Parameters
+        ----------
+        target: str or None
+            '-' for stderr, or filename records are appended to. If empty or None,
+            the value of the ORIGAMI_PATTERNS_PROFILE environment variable is used,
+            and the profiler is disabled if it is not set either
+        label, trace_memory:
+            See constructor
+        """
+        target = target or os.environ.get(PROFILE_ENV)
+        if not target:
+            return cls()
+        if target == '-':
+            return cls(sys.stderr, label, trace_memory)
+        profiler = cls(open(target, 'a'), label, trace_memory)
+        profiler._close_output = True
+        return profiler
+
+    def stage(self, name):
+        """ Get context manager emitting elapsed time and peak memory of the code it wraps """
+        if not self.enabled:
+            return NULL_STAGE
+        return self._stage(name)
+
+    @contextlib.contextmanager
+    def _stage(self, name):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+            self.record_stage(name, elapsed, peak)
+
+    def record_stage(self, name, elapsed, peak_memory=None):
+        """ Emit timing of a stage measured by the caller, e.g. before the profiler existed """
+        if not self.enabled:
+            return
+        record = {'stage': name, 'time': elapsed}
+        if peak_memory is not None:
+            record['peak_memory'] = peak_memory
+        self._emit(record)
+
+    def count(self, name, value):
+        """ Set counter, e.g. number of generated points """
+        if self.enabled:
+            self.counters[name] = value
+
+    def emit_counters(self):
+        """ Emit all counters in a single record """
+        if self.enabled:
+            self._emit({'counters': self.counters})
+
+    def _emit(self, record):
+        if self.label:
+            record = dict(label=self.label, **record)
+        self.output.write(json.dumps(record) + '\n')
+        self.output.flush()
+
+    def close(self):
+        """ Stop memory tracing started by this profiler and close output file """
+        if self._stop_tracing:
+            tracemalloc.stop()
+            self._stop_tracing = False
+        if self._close_output:
+            self.output.close()
+            self._close_output = False
+        self.enabled = self.trace_memory = False
@@ -0,0 +1,226 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Spatial indices of points: merging points closer than a tolerance, and nearest neighbour queries
+"""
+from math import floor, sqrt
+import numpy as np
+
+
+class PointIndex:
+    """ Grid-hashed index of unique points
+
+    Space is divided into square cells of side "tolerance". A new point is merged
+    with a point already in the index if their distance is at most "tolerance",
+    which only needs to be checked against points of the 3x3 neighbouring cells,
+    so that adding n points takes O(n) expected time.
+
+    Attributes
+    ----------
+    tolerance: float
+        Maximal distance between merged points. If 0, only identical points are merged
+    cells: dict
+        Maps (i, j) cell to the indices of the unique points inside it
+
+    Methods
+    -------
+
+    add(self, point)
+        Add point to index, returning its index or the one of the point it was merged with
+
+    add_points(self, points)
+        Add several points, returning their indices as an array
+
+    deduplicate(cls, points, tolerance=1e-6)
+        Return unique points, in order of first occurrence
+
+    get_coords(self)
+        Return (N, 2) array of unique points
+
+    get_points(self)
+        Return list of unique points as tuples
+    """
+
+    def __init__(self, tolerance=1e-6):
+        if tolerance < 0:
+            raise ValueError('tolerance must be non negative, not {}'.format(tolerance))
+        self.tolerance = float(tolerance)
+        self.cells = {}
+        self._points = []
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, x, y):
+        """ Get cell containing point """
+        if self.tolerance == 0:
+            return x, y
+        return floor(x / self.tolerance), floor(y / self.tolerance)
+
+    def add(self, point):
+        """ Add point to index
+
+        Parameters
+        ----------
+        point: 2 sized tuple
+
+        Returns
+        -------
+        index: int
+            Index of the first added point closer than tolerance, or of point itself
+            if there is none
+        """
+        x, y = float(point[0]), float(point[1])
+        i, j = cell = self._cell(x, y)
+
+        if self.tolerance == 0:
+            indices = self.cells.get(cell)
+            if indices is not None:
+                return indices[0]
+        else:
+            tolerance2 = self.tolerance * self.tolerance
+            for neighbour in ((i, j), (i - 1, j - 1), (i - 1, j), (i - 1, j + 1), (i, j - 1),
+                              (i, j + 1), (i + 1, j - 1), (i + 1, j), (i + 1, j + 1)):
+                for index in self.cells.get(neighbour, ()):
+                    px, py = self._points[index]
+                    if (px - x) * (px - x) + (py - y) * (py - y) <= tolerance2:
+                        return index
+
+        index = len(self._points)
+        self._points.append((x, y))
+        self.cells.setdefault(cell, []).append(index)
+        return index
+
+    def add_points(self, points):
+        """ Add several points to index
+
+        Parameters
+        ----------
+        points: (N, 2) array or list of 2 sized tuples
+
+        Returns
+        -------
+        indices: (N,) int array
+            Index of each point, see add
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2).tolist()
+        return np.array([self.add(point) for point in points], dtype=np.intp)
+
+    @classmethod
+    def deduplicate(cls, points, tolerance=1e-6):
+        """ Get unique points, merging points closer than tolerance
+
+        Parameters
+        ----------
+        points: (N, 2) array or list of 2 sized tuples
+        tolerance: float
+
+        Returns
+        -------
+        points: list of 2 sized tuples
+            First occurrence of each group of merged points, in the original order
+        """
+        index = cls(tolerance)
+        index.add_points(points)
+        return index.get_points()
+
+    def get_coords(self):
+        """ Get (N, 2) array of unique points """
+        return np.array(self._points, dtype=float).reshape(-1, 2)
+
+    def get_points(self):
+        """ Get list of unique points as tuples """
+        return list(self._points)
+
+
+class PointGrid:
+    """ Grid-hashed set of points, supporting removal and nearest neighbour queries
+
+    Points are given once, at creation, and identified by their index. Queries
+    visit rings of cells of increasing size around the query point, until no
+    closer point can be found, which takes constant expected time for evenly
+    spread points.
+
+    Attributes
+    ----------
+    points: list of 2 sized tuples
+    cell_size: float
+    cells: dict
+        Maps (i, j) cell to the set of indices of the points still inside it
+
+    Methods
+    -------
+
+    remove(self, index)
+        Remove point from the grid
+
+    nearest(self, point)
+        Get index of the nearest point still in the grid
+    """
+
+    def __init__(self, points, cell_size=None):
+        """ Constructor
+
+        Parameters
+        ----------
+        points: (N, 2) array or list of 2 sized tuples
+        cell_size: float or None
+            By default, chosen to have about two points per cell for evenly spread points
+        """
+        coords = np.asarray(points, dtype=float).reshape(-1, 2)
+        if cell_size is None:
+            extent = np.ptp(coords, axis=0).max() if len(coords) else 0.
+            cell_size = extent / sqrt(max(len(coords) / 2, 1)) or 1.
+        self.cell_size = float(cell_size)
+        self.points = list(map(tuple, coords.tolist()))
+        self.cells = {}
+        for index, cell in enumerate(map(tuple, np.floor(coords / self.cell_size).astype(np.int64).tolist())):
+            self.cells.setdefault(cell, set()).add(index)
+        self._size = len(self.points)
+
+    def __len__(self):
+        return self._size
+
+    def remove(self, index):
+        """ Remove point from the grid """
+        x, y = self.points[index]
+        cell = (floor(x / self.cell_size), floor(y / self.cell_size))
+        indices = self.cells[cell]
+        indices.remove(index)
+        if not indices:
+            del self.cells[cell]
+        self._size -= 1
+
+    def nearest(self, point):
+        """ Get index of the nearest point still in the grid, or -1 if it is empty """
+        if not self.cells:
+            return -1
+        x, y = float(point[0]), float(point[1])
+        i0, j0 = floor(x / self.cell_size), floor(y / self.cell_size)
+        best, best_distance2 = -1, float('inf')
+
+        r = 0
+        while True:
+            if (2 * r + 1)**2 > 4 * len(self.cells):
+                # ring larger than the grid itself: check all remaining cells at once
+                ring = [indices for (i, j), indices in self.cells.items() if max(abs(i - i0), abs(j - j0)) >= r]
+            elif r == 0:
+                ring = [self.cells.get((i0, j0), ())]
+            else:
+                ring = [self.cells.get((i0 + di, j0 + dj), ())
+                        for di in range(-r, r + 1) for dj in (-r, r)]
+                ring += [self.cells.get((i0 + di, j0 + dj), ())
+                         for di in (-r, r) for dj in range(-r + 1, r)]
+
+            for indices in ring:
+                for index in indices:
+                    px, py = self.points[index]
+                    distance2 = (px - x) * (px - x) + (py - y) * (py - y)
+                    if distance2 < best_distance2 or (distance2 == best_distance2 and index < best):
+                        best, best_distance2 = index, distance2
+
+            # points outside of rings checked so far are at least r cells away
+            if best >= 0 and best_distance2 <= (r * self.cell_size)**2:
+                return best
+            if (2 * r + 1)**2 > 4 * len(self.cells):
+                return best
+            r += 1
@@ -1,17 +1,112 @@
 #! /usr/bin/env python
 # -*- coding: utf-8 -*-
-import math
 import numpy as np
 
 import inkex
 
-from path import Path
+from path import Path, PathBatch, PathInstance
 from pattern import Pattern
 
 # TODO:
 # Add fractional column number option
 
 
+def generate_lattice(lines, columns, length, phase_shift=True, first_line='waterbomb', last_line='waterbomb'):
+    """ Compute all strokes of a Waterbomb tesselation at once, as arrays
+
+    Lines are alternated (and valleys inverted every two lines) to minimize laser
+    cutter movements, in the same order as strokes were created one by one.
+
+    Parameters
+    ----------
+    lines, columns: int
+    length: float
+        Side of a cell
+    phase_shift: bool
+        Shifts odd lines by half a cell
+    first_line, last_line: str
+        'waterbomb' or 'magic_ball'
+
+    Returns
+    -------
+    lattice: dict of numpy.ndarray
+        'hgrid': (lines - 1, 2, 2) horizontal mountain creases
+        'vgrid': (2*columns - 1, S, 2, 2) vertical creases, S being 1, or 2 or 3 when
+            magic ball lines add a valley to each of them; 'vgrid_styles' has shape (2*columns - 1, S)
+        'valleys': (2*lines, 2*columns + 1, 2) zigzag lines; 'valley_styles' and 'valley_senses' have
+            shape (2*lines,), senses being true for lines starting with a point at their top
+        'vertices': (V, 2) points, line by line
+    """
+    first_magic = first_line == 'magic_ball'
+    last_magic = last_line == 'magic_ball'
+    width, height = length * columns, length * lines
+
+    # horizontal and vertical grids, inverting even strokes as in Path.generate_hgrid and generate_vgrid
+    i = np.arange(1, lines)[:, np.newaxis]
+    y = 0 + i * (height / lines)
+    hgrid = np.stack((np.hstack((np.zeros_like(y), y)), np.hstack((np.full_like(y, width), y))), axis=1)
+    hgrid[i[:, 0] % 2 == 0] = hgrid[i[:, 0] % 2 == 0, ::-1]
+
+    i = np.arange(1, 2 * columns)
+    x = 0 + i * (width / (2 * columns))
+
+    def vertical(y_start, y_end):
+        strokes = np.stack((np.column_stack((x, np.full_like(x, y_start))),
+                            np.column_stack((x, np.full_like(x, y_end)))), axis=1)
+        strokes[i % 2 == 0] = strokes[i % 2 == 0, ::-1]
+        return strokes
+
+    grid_v = vertical(length / 2 if first_magic else 0, height - (length / 2 if last_magic else 0))
+    valley_a = vertical(0, length / 2)
+    valley_b = valley_a + (0, (lines - 0.5) * length)
+
+    # strokes of each vertical line, in the order they are drawn: even lines downwards, odd ones upwards
+    even = (np.arange(len(x)) % 2 == 0)[:, np.newaxis, np.newaxis]
+    if first_magic and last_magic:
+        vgrid = np.stack((np.where(even, valley_a, valley_b), grid_v, np.where(even, valley_b, valley_a)), axis=1)
+        vgrid_styles = np.array(['v', 'm', 'v'])
+    elif first_magic:
+        vgrid = np.stack((np.where(even, valley_a, grid_v), np.where(even, grid_v, valley_a)), axis=1)
+        vgrid_styles = np.where(even[:, :, 0], ['v', 'm'], ['m', 'v'])
+    elif last_magic:
+        vgrid = np.stack((np.where(even, grid_v, valley_b), np.where(even, valley_b, grid_v)), axis=1)
+        vgrid_styles = np.where(even[:, :, 0], ['m', 'v'], ['v', 'm'])
+    else:
+        vgrid = grid_v[:, np.newaxis]
+        vgrid_styles = np.array(['m'])
+    vgrid_styles = np.broadcast_to(vgrid_styles, vgrid.shape[:2])
+
+    # zigzag valleys, pointing up or down according to parity of the line and options
+    k = np.arange(2 * columns + 1)
+    rows = np.arange(2 * lines)
+    senses = ((rows % 2 + rows) / 2 % 2 != 0) ^ bool(phase_shift)
+    senses[0] ^= first_magic
+    senses[-1] ^= last_magic
+    zigzag_y = np.where(senses[:, np.newaxis], k % 2, 1 - k % 2) * length / 2 + (rows * length / 2)[:, np.newaxis]
+    valleys = np.stack((np.broadcast_to(k * length / 2, zigzag_y.shape), zigzag_y), axis=-1)
+    valleys[rows % 2 == 1] = valleys[rows % 2 == 1, ::-1]
+    valley_styles = np.full(2 * lines, 'v')
+    if first_magic:
+        valley_styles[0] = 'm'
+    if last_magic:
+        valley_styles[-1] = 'm'
+
+    # vertices on every half cell line: all half cells on even lines, alternating cell corners and centers otherwise
+    line_types = [(k / 2.) * length, np.arange(columns + 1) * length, (np.arange(columns) + 0.5) * length]
+    vertex_lines = np.arange(2 * lines + 1)
+    types = np.where((vertex_lines // 2 + phase_shift) % 2 == 0, 1, 2)
+    types[vertex_lines % 2 == 0] = 0
+    if first_magic:
+        types[1] = 0
+    if last_magic:
+        types[-2] = 0
+    vertices = np.concatenate([np.column_stack((line_types[t], np.full(len(line_types[t]), 0 + 0.5 * j * length)))
+                               for j, t in enumerate(types.tolist())])
+
+    return {'hgrid': hgrid, 'vgrid': vgrid, 'vgrid_styles': vgrid_styles, 'valleys': valleys,
+            'valley_styles': valley_styles, 'valley_senses': senses, 'vertices': vertices}
+
+
 class Waterbomb(Pattern):
 
     def __init__(self):
@@ -39,64 +134,18 @@ class Waterbomb(Pattern):
         pattern_first_line = self.options.pattern_first_line
         pattern_last_line = self.options.pattern_last_line
 
-        # create vertices
-        vertex_line_types = [[Path(((i / 2.) * length, 0), style='p', radius=vertex_radius) for i in range(2*cols + 1)],
-                             [Path((i * length, 0), style='p', radius=vertex_radius) for i in range(cols + 1)],
-                             [Path(((i + 0.5) * length, 0), style='p', radius=vertex_radius) for i in range(cols)]]
-
-        vertices = []
-        for i in range(2*lines + 1):
-            if i % 2 == 0 or (pattern_first_line == 'magic_ball' and i == 1) or (pattern_last_line == 'magic_ball' and i == 2*lines - 1):
-                type = 0
-            elif(int(i/2 + phase_shift)) % 2 == 0:
-                type = 1
-            else:
-                type = 2
-            vertices = vertices + Path.list_add(vertex_line_types[type], (0, 0.5*i*length))
-
-        # create a list for the horizontal creases and another for the vertical creases
-        # alternate strokes to minimize laser cutter path
-        corr_fist_line = length/2 if pattern_first_line == 'magic_ball' else 0
-        corr_last_line = length/2 if pattern_last_line == 'magic_ball' else 0
-        grid = [Path.generate_hgrid([0, length*cols],    [0,      length*lines],  lines, 'm'),
-                Path.generate_vgrid([0, length*cols], [corr_fist_line, length*lines-corr_last_line], 2*cols, 'm')]
-
-        vgrid_a = Path.generate_vgrid([0, length * cols], [0, length / 2], 2 * cols, 'v')
-        vgrid_b = Path.list_add(vgrid_a, (0, (lines - 0.5) * length))
-        if pattern_first_line == 'magic_ball' and pattern_last_line == 'magic_ball':
-            grid[1] = [[vgrid_a[i], grid[1][i], vgrid_b[i]] if i % 2 == 0 else
-                       [vgrid_b[i], grid[1][i], vgrid_a[i]] for i in range(len(grid[1]))]
-        elif pattern_first_line == 'magic_ball':
-            grid[1] = [[vgrid_a[i], grid[1][i]] if i % 2 == 0 else
-                       [grid[1][i], vgrid_a[i]] for i in range(len(grid[1]))]
-        elif pattern_last_line == 'magic_ball':
-            grid[1] = [[grid[1][i], vgrid_b[i]] if i % 2 == 0 else
-                       [vgrid_b[i], grid[1][i]] for i in range(len(grid[1]))]
-
-        # create generic valley Path lines, one pointing up and other pointing down
-        valley_types = [Path([(i * length / 2, (1 - i % 2) * length / 2) for i in range(2 * cols + 1)], 'v'),
-                        Path([(    i*length/2,         (i % 2)*length/2) for i in range(2 * cols + 1)], 'v')]
-
-        # define which lines must be of which type, according to parity and options
-        senses = np.array([bool((i % 2+i)/2 % 2) for i in range(2*lines)])
-        senses = 1*senses # converts bool array to 0's and 1's
-        if phase_shift:
-            senses = np.invert(senses)
-        if pattern_first_line == "magic_ball":
-            senses[0] = ~senses[0]
-        if pattern_last_line == "magic_ball":
-            senses[-1] = ~senses[-1]
-        valleys = [valley_types[senses[i]] + (0, i * length / 2) for i in range(2*lines)]
-
-        # convert first and last lines to mountains if magic_ball
-        if pattern_first_line == "magic_ball":
-            valleys[0].style = 'm'
-        if pattern_last_line == "magic_ball":
-            valleys[-1].style = 'm'
-
-        # invert every two lines to minimize laser cutter movements
-        for i in range(1, 2*lines, 2):
-            valleys[i].invert()
+        lattice = generate_lattice(lines, cols, length, phase_shift, pattern_first_line, pattern_last_line)
+
+        # vertical creases are grouped with the valleys closing them in magic ball lines
+        vgrid = lattice['vgrid']
+        grid = [PathBatch.from_array(lattice['hgrid'], 'm'),
+                PathBatch.from_array(vgrid.reshape(-1, 2, 2), lattice['vgrid_styles'].reshape(-1),
+                                     sublist_size=vgrid.shape[1])]
+        if self.options.use_symbols:
+            valleys = self.generate_valley_instances(lattice, lines, cols, length)
+        else:
+            valleys = PathBatch.from_array(lattice['valleys'], lattice['valley_styles'])
+        vertices = PathBatch.from_array(lattice['vertices'][:, np.newaxis], 'p', radii=vertex_radius)
 
         self.edge_points = [(0*length*cols, 0*length*lines),   # top left
                        (1*length*cols, 0*length*lines),   # top right
@@ -105,6 +154,27 @@ class Waterbomb(Pattern):
 
         self.path_tree = [grid, valleys, vertices]
 
+    @staticmethod
+    def generate_valley_instances(lattice, lines, cols, length):
+        """ Get valley lines as instances of the generic ones, so that they are drawn as <use> elements
+        """
+        # generic lines pointing up and down, inverted on odd lines to minimize laser cutter movements
+        k = np.arange(2 * cols + 1)
+        zigzags = [np.column_stack((k * length / 2, (1 - k % 2) * length / 2)),
+                   np.column_stack((k * length / 2, (k % 2) * length / 2))]
+        valley_types = [[Path(zigzag.tolist(), 'v') for zigzag in zigzags],
+                        [Path(zigzag[::-1].tolist(), 'v') for zigzag in zigzags]]
+
+        senses = lattice['valley_senses'].tolist()
+        valleys = [PathInstance(valley_types[i % 2][senses[i]], Path.translation((0, i * length / 2)))
+                   for i in range(2 * lines)]
+
+        # first and last lines are mountains for magic ball
+        for i in np.flatnonzero(lattice['valley_styles'] == 'm'):
+            valleys[i] = valleys[i].materialize()
+            valleys[i].style = 'm'
+        return valleys
+
 
 if __name__ == '__main__':
 
@@ -0,0 +1,234 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Benchmarks of every pattern at increasing sizes
+
+Each case is generated headlessly (see OrigamiPatterns/generate.py), timing
+separately generation of the geometry, drawing to the document and its
+serialization, and measuring peak memory of each of these steps with
+tracemalloc in an extra run, as tracing slows allocations down.
+
+Results can be compared to a baseline JSON file, flagging cases that got
+slower or use more memory than a threshold:
+
+    python benchmarks/run_benchmarks.py --sizes small,medium --baseline benchmarks/baseline.json
+
+and the baseline is updated with --save-baseline.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'OrigamiPatterns'))
+
+from generate import create_pattern  # noqa: E402
+
+SIZES = ('small', 'medium', 'huge')
+STEPS = ('generate', 'draw', 'serialize')
+
+# name: (pattern, fixed arguments, parameters of each size)
+CASES = {
+    'waterbomb': ('waterbomb', [], {
+        'small': {'lines': 8, 'columns': 16},
+        'medium': {'lines': 40, 'columns': 80},
+        'huge': {'lines': 200, 'columns': 400},
+    }),
+    'waterbomb_magic_ball': ('waterbomb', ['--pattern_first_line=magic_ball', '--pattern_last_line=magic_ball'], {
+        'small': {'lines': 8, 'columns': 16},
+        'medium': {'lines': 40, 'columns': 80},
+        'huge': {'lines': 200, 'columns': 400},
+    }),
+    'kresling': ('cylindrical_kresling', ['--measure_type=a', '--parameter_type=angle_ratio'], {
+        'small': {'sides': 6, 'rows': 3},
+        'medium': {'sides': 24, 'rows': 20},
+        'huge': {'sides': 96, 'rows': 100},
+    }),
+    'bendy_straw': ('cylindrical_bendy', [], {
+        'small': {'n': 6, 'lines': 3},
+        'medium': {'n': 24, 'lines': 20},
+        'huge': {'n': 96, 'lines': 100},
+    }),
+    'hypar': ('pleat_hypar', [], {
+        'small': {'sides': 4, 'rings': 7},
+        'medium': {'sides': 8, 'rings': 40},
+        'huge': {'sides': 16, 'rings': 200},
+    }),
+    'pleat_circular': ('pleat_circular', [], {
+        'small': {'sides': 20, 'rings': 15},
+        'medium': {'sides': 80, 'rings': 60},
+        'huge': {'sides': 300, 'rings': 200},
+    }),
+    'masu_box': ('boxes_masu', [], {
+        'small': {},
+    }),
+    'masu_box_traditional': ('boxes_masu_traditional', [], {
+        'small': {},
+    }),
+    'support_ring': ('cylindrical_support_ring', [], {
+        'small': {'sides': 3},
+        'medium': {'sides': 60},
+        'huge': {'sides': 1000},
+    }),
+    'template': ('template', [], {
+        'small': {},
+    }),
+    'cylindrical_template': ('cylindrical_template', [], {
+        'small': {'sides': 6, 'rows': 3},
+        'medium': {'sides': 24, 'rows': 20},
+        'huge': {'sides': 96, 'rows': 100},
+    }),
+}
+
+
+def run_steps(pattern, args, params, trace_memory=False):
+    """ Generate, draw and serialize a pattern once
+
+    Returns
+    -------
+    times: dict
+        Duration of each step, in seconds
+    memory: dict
+        Peak traced memory of each step in bytes, empty if trace_memory is false
+    counters: dict
+        Number of elements and size of the serialized document
+    """
+    times, memory = {}, {}
+    effect = create_pattern(pattern, args, **params)
+
+    def step(name, function):
+        if trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = function()
+        times[name] = time.perf_counter() - start
+        if trace_memory:
+            memory[name] = tracemalloc.get_traced_memory()[1]
+        return result
+
+    def generate():
+        effect.check_simulation_mode()
+        effect.check_bool_only()
+        effect.create_styles_dict()
+        effect.generate_geometry()
+
+    step('generate', generate)
+    step('draw', effect.draw)
+    svg = step('serialize', effect.svg.tostring)
+    counters = {'elements': sum(1 for _ in effect.topgroup.iterdescendants()), 'bytes': len(svg)}
+    return times, memory, counters
+
+
+def run_case(pattern, args, params, repeat=3):
+    """ Benchmark a case, keeping the best time of each step over repeat runs """
+    best = {}
+    for _ in range(repeat):
+        gc.collect()
+        times, _, counters = run_steps(pattern, args, params)
+        for name, elapsed in times.items():
+            best[name] = min(best.get(name, elapsed), elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        _, memory, _ = run_steps(pattern, args, params, trace_memory=True)
+    finally:
+        tracemalloc.stop()
+
+    return {'pattern': pattern, 'args': args, 'params': params, 'time': best, 'memory': memory,
+            'counters': counters}
+
+
+def compare(results, baseline, threshold=0.25, min_time=0.005):
+    """ Get regressions of results with respect to baseline
+
+    Parameters
+    ----------
+    results, baseline: dict
+        Map case ids to results of run_case
+    threshold: float
+        Relative increase of time or memory flagged as a regression
+    min_time: float
+        Increases of time smaller than this many seconds are ignored, as noise
+
+    Returns
+    -------
+    regressions: list of str
+        Description of each regression
+    """
+    regressions = []
+    for case_id, result in sorted(results.items()):
+        if case_id not in baseline:
+            continue
+        reference = baseline[case_id]
+        for kind, minimum in (('time', min_time), ('memory', 0)):
+            for name, value in result[kind].items():
+                old = reference.get(kind, {}).get(name)
+                if old is None:
+                    continue
+                if value > old * (1 + threshold) and value - old > minimum:
+                    regressions.append('{} {} {}: {:.4g} -> {:.4g} ({:+.0%})'.format(
+                        case_id, kind, name, old, value, value / old - 1 if old else float('inf')))
+    return regressions
+
+
+def main(argv=None):
+    """ Command line entry point """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='small,medium',
+                        help='comma separated sizes among {} (default: small,medium)'.format(', '.join(SIZES)))
+    parser.add_argument('--cases', default=None, help='comma separated cases (default: all), among ' +
+                        ', '.join(CASES))
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each case, best time is kept')
+    parser.add_argument('-o', '--output', default=None, help='write results to this JSON file')
+    parser.add_argument('--baseline', default=None, help='compare results to this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative increase flagged as regression (default: 0.25)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='merge results into baseline file instead of comparing them')
+    options = parser.parse_args(argv)
+
+    sizes = options.sizes.split(',')
+    cases = options.cases.split(',') if options.cases else list(CASES)
+    for name in [size for size in sizes if size not in SIZES] + [case for case in cases if case not in CASES]:
+        parser.error('unknown size or case {!r}'.format(name))
+
+    results = {}
+    for case in cases:
+        pattern, args, case_sizes = CASES[case]
+        for size in sizes:
+            if size not in case_sizes:
+                continue
+            case_id = '{}/{}'.format(case, size)
+            results[case_id] = result = run_case(pattern, args, case_sizes[size], options.repeat)
+            sys.stderr.write('{:<32} {}  peak {:.1f} MB  {} elements\n'.format(
+                case_id, '  '.join('{} {:.4f}s'.format(name, result['time'][name]) for name in STEPS),
+                max(result['memory'].values()) / 2**20, result['counters']['elements']))
+
+    if options.output:
+        with open(options.output, 'w') as output:
+            json.dump(results, output, indent=1, sort_keys=True)
+
+    if options.baseline and options.save_baseline:
+        baseline = {}
+        if os.path.exists(options.baseline):
+            with open(options.baseline) as stream:
+                baseline = json.load(stream)
+        baseline.update(results)
+        with open(options.baseline, 'w') as output:
+            json.dump(baseline, output, indent=1, sort_keys=True)
+
+    elif options.baseline:
+        with open(options.baseline) as stream:
+            regressions = compare(results, json.load(stream), options.threshold)
+        for regression in regressions:
+            sys.stderr.write('REGRESSION ' + regression + '\n')
+        sys.stderr.write('{} regressions in {} cases\n'.format(len(regressions), len(results)))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Golden output regression harness
+
+Every case of a matrix of parameters per pattern is generated headlessly, and
+its complete path tree (with edges and vertices) is reduced to a canonical form
+independent of how it was built: strokes are flattened, coordinates rounded,
+each stroke put in a canonical direction and starting point, and strokes
+sorted. These snapshots, stored in regression/snapshots/, are compared within a
+tolerance to the output of the current code, so that engines rewritten for
+performance can be checked to produce the same geometry:
+
+    python regression/golden.py check
+    python regression/golden.py check --extra-args=--use_cache=true
+    python regression/golden.py update     # after intended changes of the geometry
+"""
+import argparse
+import json
+import os
+import shlex
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'OrigamiPatterns'))
+
+from generate import create_pattern  # noqa: E402
+from path import PathBatch  # noqa: E402
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+DECIMALS = 6
+
+# name: (pattern, arguments)
+CASES = {
+    'waterbomb': ('waterbomb', []),
+    'waterbomb_magic_ball': ('waterbomb', ['--pattern_first_line=magic_ball', '--pattern_last_line=magic_ball',
+                                           '--phase_shift=false', '--lines=5', '--columns=7']),
+    'waterbomb_first_magic_ball': ('waterbomb', ['--pattern_first_line=magic_ball', '--lines=3', '--columns=4']),
+    'waterbomb_last_magic_ball': ('waterbomb', ['--pattern_last_line=magic_ball', '--lines=3', '--columns=4',
+                                                '--phase_shift=false']),
+    'waterbomb_large': ('waterbomb', ['--lines=24', '--columns=30']),
+    'kresling': ('cylindrical_kresling', ['--measure_type=a', '--parameter_type=angle_ratio']),
+    'kresling_mirrowed': ('cylindrical_kresling', ['--measure_type=a', '--parameter_type=angle_ratio',
+                                                   '--pattern=mirrowed', '--rows=4', '--sides=7',
+                                                   '--extra_column=true']),
+    'kresling_slots': ('cylindrical_kresling', ['--measure_type=l', '--parameter_type=lambdatheta', '--rows=3',
+                                                '--add_base_slot=true', '--add_middle_slot=true']),
+    'kresling_large': ('cylindrical_kresling', ['--measure_type=a', '--parameter_type=angle_ratio', '--rows=12',
+                                                '--sides=18']),
+    'bendy_straw': ('cylindrical_bendy', []),
+    'bendy_straw_origami_bent': ('cylindrical_bendy', ['--pattern_type=origami_bent', '--n=8', '--lines=4',
+                                                       '--add_base_slot=true', '--add_distance_slot=true',
+                                                       '--vertex_base_outer_bool=true',
+                                                       '--vertex_base_inner_bool=true',
+                                                       '--vertex_radius_outer_bool=true',
+                                                       '--vertex_radius_inner_bool=true']),
+    'bendy_straw_kirigami2': ('cylindrical_bendy', ['--pattern_type=kirigami2', '--base_height=0', '--distance=0']),
+    'bendy_straw_kirigami1': ('cylindrical_bendy', ['--pattern_type=kirigami1', '--parameter_type=heights',
+                                                    '--add_attachment=true']),
+    'bendy_straw_origami2': ('cylindrical_bendy', ['--pattern_type=origami2', '--vertex_radius_inner_bool=true']),
+    'old_bendy_straw': ('old_bendy', ['--pattern_type=origami_bent', '--n=8', '--lines=4', '--add_base_slot=true',
+                                      '--add_distance_slot=true']),
+    'pleat_circular': ('pleat_circular', []),
+    'pleat_circular_simulation': ('pleat_circular', ['--simulation_mode=true', '--sides=9', '--rings=6']),
+    'hypar': ('pleat_hypar', []),
+    'hypar_alternate_asymmetric': ('pleat_hypar', ['--pattern=alternate_asymmetric', '--sides=6',
+                                                   '--simplify_center=true']),
+    'hypar_classic': ('pleat_hypar', ['--pattern=classic']),
+    'masu_box': ('boxes_masu', []),
+    'masu_box_delta': ('boxes_masu', ['--simulation_mode=true', '--width_delta_bool=true', '--width_delta=2']),
+    'masu_box_traditional': ('boxes_masu_traditional', []),
+    'support_ring': ('cylindrical_support_ring', []),
+    'support_ring_inverted': ('cylindrical_support_ring', ['--inverted=true', '--single_stroke=false',
+                                                           '--sides=5']),
+    'support_ring_circular': ('cylindrical_support_ring', ['--radius_type=circular']),
+    'template': ('template', []),
+    'template2': ('template', ['--pattern=template2', '--angle=30']),
+    'cylindrical_template': ('cylindrical_template', ['--angle=10', '--rows=4']),
+    'old_kresling_full': ('old_kresling_full', ['--measure_type=a', '--parameter_type=angle_ratio', '--lines=3',
+                                                '--mirror_cells=true', '--add_attachment=true']),
+}
+
+
+def canonical_stroke(points, closed):
+    """ Get points of a stroke in canonical order
+
+    Open strokes are reversed if their last point is smaller than their first
+    one, closed strokes start at their smallest point and go towards its
+    smallest neighbour.
+    """
+    points = [tuple(point) for point in points]
+    if closed and len(points) > 1:
+        start = points.index(min(points))
+        points = points[start:] + points[:start]
+        if points[-1] < points[1]:
+            points = points[:1] + points[:0:-1]
+    elif points[-1] < points[0]:
+        points = points[::-1]
+    return points
+
+
+def snapshot(effect):
+    """ Get canonical form of the geometry generated by a pattern
+
+    Parameters
+    ----------
+    effect: Pattern
+        After generate_geometry
+
+    Returns
+    -------
+    snapshot: dict
+        Sorted list of strokes [style, closed, fold angle, radius, points] and translation
+    """
+    batch = PathBatch.from_tree(effect.get_complete_path_tree())
+    # adding 0. turns -0. into 0.
+    coords = (np.round(batch.coords, DECIMALS) + 0.).tolist()
+    offsets = batch.offsets.tolist()
+    strokes = []
+    for i in range(len(batch)):
+        points = coords[offsets[i]:offsets[i + 1]]
+        closed = bool(batch.closed[i])
+        radius = round(float(batch.radii[i]), DECIMALS) if len(points) == 1 else None
+        strokes.append([chr(batch.styles[i]), closed, round(float(batch.fold_angles[i]), DECIMALS), radius,
+                        [list(point) for point in canonical_stroke(points, closed)]])
+    strokes.sort(key=lambda stroke: (stroke[0], stroke[1], stroke[2], stroke[3] or 0., stroke[4]))
+    return {'strokes': strokes, 'translate': [round(float(value), DECIMALS) for value in effect.translate]}
+
+
+def generate_snapshot(pattern, args):
+    """ Generate geometry of a case and get its snapshot """
+    effect = create_pattern(pattern, args)
+    effect.check_simulation_mode()
+    effect.check_bool_only()
+    effect.create_styles_dict()
+    effect.generate_geometry()
+    return snapshot(effect)
+
+
+def compare(expected, actual, tolerance=10.**-(DECIMALS - 1)):
+    """ Get differences between two snapshots
+
+    Returns
+    -------
+    differences: list of str
+        Empty if snapshots are equal, coordinates differing by less than tolerance
+    """
+    if expected['translate'] != actual['translate']:
+        return ['translate {} != {}'.format(expected['translate'], actual['translate'])]
+    if len(expected['strokes']) != len(actual['strokes']):
+        return ['{} strokes instead of {}'.format(len(actual['strokes']), len(expected['strokes']))]
+
+    differences = []
+    for i, (old, new) in enumerate(zip(expected['strokes'], actual['strokes'])):
+        if old[:4] != new[:4] or len(old[4]) != len(new[4]) or \
+                not np.allclose(old[4], new[4], rtol=0., atol=tolerance):
+            differences.append('stroke {}: {} != {}'.format(i, json.dumps(old), json.dumps(new)))
+    return differences
+
+
+def main(argv=None):
+    """ Command line entry point """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=('check', 'update'), nargs='?', default='check')
+    parser.add_argument('--cases', default=None, help='comma separated cases (default: all), among ' +
+                        ', '.join(CASES))
+    parser.add_argument('--extra-args', default='',
+                        help='arguments added to every case, e.g. to select another engine')
+    options = parser.parse_args(argv)
+
+    cases = options.cases.split(',') if options.cases else list(CASES)
+    for case in cases:
+        if case not in CASES:
+            parser.error('unknown case {!r}'.format(case))
+
+    failed = 0
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    for case in cases:
+        pattern, args = CASES[case]
+        filename = os.path.join(SNAPSHOT_DIR, case + '.json')
+        try:
+            actual = generate_snapshot(pattern, args + shlex.split(options.extra_args))
+        except Exception as error:  # a failing case must not stop the whole check
+            failed += 1
+            sys.stderr.write('{}: ERROR {!r}\n'.format(case, error))
+            continue
+
+        if options.command == 'update':
+            with open(filename, 'w') as output:
+                json.dump(actual, output, separators=(',', ':'))
+                output.write('\n')
+            continue
+
+        if not os.path.exists(filename):
+            failed += 1
+            sys.stderr.write('{}: no snapshot, run update first\n'.format(case))
+            continue
+        with open(filename) as stream:
+            differences = compare(json.load(stream), actual)
+        if differences:
+            failed += 1
+            sys.stderr.write('{}: FAILED\n'.format(case))
+            for difference in differences[:10]:
+                sys.stderr.write('    ' + difference + '\n')
+            if len(differences) > 10:
+                sys.stderr.write('    ... {} more differences\n'.format(len(differences) - 10))
+
+    if options.command == 'check':
+        sys.stderr.write('{} of {} cases failed\n'.format(failed, len(cases)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,22 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Tests of the command line tools generating patterns without Inkscape
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'OrigamiPatterns'))
+
+from generate import main  # noqa: E402
+
+
+def test_sweep_reports_invalid_variant(tmp_path):
+    # 'x' is rejected by the argument parser of the pattern with SystemExit
+    assert main(['sweep', 'waterbomb', '--grid', 'lines=2,x', '--output', str(tmp_path), '--jobs', '1']) == 1
+
+    with open(os.path.join(tmp_path, 'sweep_report.json')) as report:
+        results = json.load(report)
+    assert [result['params'] for result in results] == [{'lines': '2'}, {'lines': 'x'}]
+    assert ['error' in result for result in results] == [False, True]
+    assert os.path.exists(results[0]['output'])
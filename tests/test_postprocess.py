@@ -0,0 +1,37 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+""" Tests of the post-processing stages of path trees
+"""
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'OrigamiPatterns'))
+
+from generate import generate_path_tree  # noqa: E402
+from path import PathBatch  # noqa: E402
+from postprocess import chain_paths  # noqa: E402
+
+
+def get_segments(batch):
+    """ Get set of (style, fold angle, segment) of batch, independently of stroke direction """
+    segments = set()
+    for i in range(len(batch)):
+        points = np.round(batch.coords[batch.offsets[i]:batch.offsets[i + 1]], 6).tolist()
+        if batch.closed[i]:
+            points.append(points[0])
+        for p, q in zip(points[:-1], points[1:]):
+            segments.add((int(batch.styles[i]), float(batch.fold_angles[i]), tuple(sorted((tuple(p), tuple(q))))))
+    return segments
+
+
+def test_chain_paths_joins_kresling_rows():
+    batch = PathBatch.from_tree(generate_path_tree('cylindrical_kresling', measure_type='a', rows=3, sides=6))
+    chained, report = chain_paths(batch)
+    grouped, grouped_report = chain_paths(batch, keep_groups=True)
+
+    # each row is its own group of alternating mountains and valleys, chained with the next rows
+    assert report['before'] == len(batch)
+    assert report['after'] == len(chained) < grouped_report['after'] <= len(batch)
+    assert get_segments(chained) == get_segments(batch)
+    assert get_segments(grouped) == get_segments(batch)